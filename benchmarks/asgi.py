@@ -0,0 +1,92 @@
+"""
+Throughput of the post listing under concurrency, WSGI vs ASGI.
+
+    python -m benchmarks.asgi --requests 2000 --concurrency 100
+
+* `wsgi-sync`:  DRF viewset through the WSGI handler, one thread per
+  in-flight request (as a threaded WSGI server would).
+* `asgi-sync`:  the same DRF viewset through the ASGI handler, every request
+  crosses the sync-to-async bridge.
+* `asgi-async`: the native async view through the ASGI handler.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_wsgi(path, requests, concurrency):
+    from django.test import Client
+
+    def fetch(_):
+        return Client().get(path).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        statuses = list(pool.map(fetch, range(requests)))
+    return time.perf_counter() - start, statuses
+
+
+def run_asgi(path, requests, concurrency):
+    from django.test import AsyncClient
+
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with semaphore:
+                response = await client.get(path)
+                return response.status_code
+
+        return await asyncio.gather(*(fetch() for _ in range(requests)))
+
+    start = time.perf_counter()
+    statuses = asyncio.run(main())
+    return time.perf_counter() - start, statuses
+
+
+def main(argv=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
+    import django
+    django.setup()
+
+    from core.cache import get_response_cache
+    from core.models import Blog
+
+    from benchmarks import harness, seed
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--posts-per-blog', type=int, default=200)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    results = {}
+    with harness.test_database():
+        seed.seed(users=1, blogs_per_user=1, posts_per_blog=args.posts_per_blog, content_words=300)
+        blog = Blog.objects.get()
+        modes = [
+            ('wsgi-sync', run_wsgi, f'/api/blogs/{blog.pk}/posts/'),
+            ('asgi-sync', run_asgi, f'/api/blogs/{blog.pk}/posts/'),
+            ('asgi-async', run_asgi, f'/api/async/blogs/{blog.pk}/posts/'),
+        ]
+        for name, runner, path in modes:
+            get_response_cache().clear()
+            elapsed, statuses = runner(path, args.requests, args.concurrency)
+            errors = sum(status != 200 for status in statuses)
+            results[name] = {'seconds': elapsed, 'requests_per_second': args.requests / elapsed, 'errors': errors}
+            print(f'{name:12} {args.requests / elapsed:10.1f} req/s  {errors} errors')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Cost of authenticating a request, per scheme, on a cheap endpoint.
+
+    python -m benchmarks.auth --iterations 50
+
+* `basic`:          HTTP Basic, every request hashes the password (the
+  behaviour of DRF's BasicAuthentication).
+* `basic-cached`:   HTTP Basic with verified credentials cached.
+* `token-uncached`: API token, one indexed lookup per request.
+* `token`:          API token with the in-process token cache.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+
+
+def main(argv=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
+    import django
+    django.setup()
+
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    from core.authentication import get_credential_cache, get_token_cache
+    from core.models import ApiToken, Blog
+
+    from benchmarks import harness, seed
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    results = {}
+    with harness.test_database():
+        profile = seed.seed(users=1, blogs_per_user=1, posts_per_blog=10, content_words=50)[0]
+        profile.user.set_password('benchmark')
+        profile.user.save()
+        token, key = ApiToken.generate(profile=profile, name='benchmark', scopes=[ApiToken.READ])
+        token.save()
+        basic = 'Basic ' + base64.b64encode(f'{profile.user.username}:benchmark'.encode()).decode()
+        # Cached responses, so the request is little more than authentication.
+        scenario = harness.Scenario('auth', 'get', f'/api/blogs/{Blog.objects.get().pk}/', warm_cache=True)
+
+        schemes = [
+            ('basic', basic, {'BASIC_AUTH_CACHE_TTL': 0}),
+            ('basic-cached', basic, {}),
+            ('token-uncached', f'Token {key}', {'TOKEN_AUTH_CACHE_TTL': 0}),
+            ('token', f'Token {key}', {}),
+        ]
+        for name, header, overrides in schemes:
+            get_credential_cache().clear()
+            get_token_cache().clear()
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=header)
+            with override_settings(**overrides):
+                results[name] = harness.measure(scenario, client=client, iterations=args.iterations)
+            latency = results[name]['latency_ms']
+            print(f"{name:15} p50 {latency['p50']:8.2f}ms  p99 {latency['p99']:8.2f}ms  queries {results[name]['queries']:3}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
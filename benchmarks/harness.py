@@ -0,0 +1,137 @@
+"""
+In-process measurement of API endpoints: latency distribution, queries per
+request and peak Python allocations.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from rest_framework.test import APIClient
+
+from core.cache import get_response_cache
+
+
+class Scenario:
+    def __init__(self, name, method, path, data=None, warm_cache=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.warm_cache = warm_cache
+
+    def request(self, client):
+        # `data` may be a callable so writes can create distinct objects.
+        data = self.data() if callable(self.data) else self.data
+        return getattr(client, self.method)(self.path, data=data, format='json')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def measure(scenario, client=None, iterations=50):
+    """
+    Run `scenario` `iterations` times and summarize it. Reads hit a cold
+    response cache unless the scenario asks for a warm one.
+    """
+    client = client or APIClient()
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        if not scenario.warm_cache:
+            get_response_cache().clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario.request(client)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            raise AssertionError(f'{scenario.name}: {scenario.method.upper()} {scenario.path} -> {response.status_code}')
+        queries.append(len(captured))
+
+    # Allocations are measured separately, tracing slows every request down.
+    if not scenario.warm_cache:
+        get_response_cache().clear()
+    tracemalloc.start()
+    scenario.request(client)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'latency_ms': {
+            'min': min(timings),
+            'mean': statistics.fmean(timings),
+            'p50': percentile(timings, 0.50),
+            'p90': percentile(timings, 0.90),
+            'p99': percentile(timings, 0.99),
+            'max': max(timings),
+        },
+        'queries': max(queries),
+        'peak_alloc_bytes': peak,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Regressions of `report` against `baseline`: p50/p99 latency or peak
+    allocations more than `tolerance` above the baseline, or any extra query.
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        for key in ('p50', 'p99'):
+            if result['latency_ms'][key] > base['latency_ms'][key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result['latency_ms'][key]:.2f}ms > {base['latency_ms'][key]:.2f}ms")
+        if result['queries'] > base['queries']:
+            regressions.append(f"{name}: {result['queries']} queries > {base['queries']}")
+        if result['peak_alloc_bytes'] > base['peak_alloc_bytes'] * (1 + tolerance):
+            regressions.append(f"{name}: peak alloc {result['peak_alloc_bytes']} > {base['peak_alloc_bytes']}")
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+
+
+@contextmanager
+def unthrottled():
+    """
+    Lift the API rate limits, benchmarks measure the endpoints behind them.
+    """
+    rates = dict.fromkeys(settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}))
+    with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+        yield
+
+
+@contextmanager
+def test_database():
+    """
+    Run the benchmark against a throw-away, unthrottled test database.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with unthrottled():
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
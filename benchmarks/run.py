@@ -0,0 +1,80 @@
+"""
+Standalone benchmark runner.
+
+    python -m benchmarks.run --scale small --output report.json
+    python -m benchmarks.run --baseline report.json
+
+Seeds a throw-away test database, drives the API in-process and writes a
+JSON report. With `--baseline` it exits non-zero on regressions.
+"""
+import argparse
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+
+
+def main(argv=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    from benchmarks import harness, seed, scenarios
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(seed.SCALES), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--blogs-per-user', type=int)
+    parser.add_argument('--posts-per-blog', type=int)
+    parser.add_argument('--content-words', type=int)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--only', action='append', help='Run only the named scenario, may be repeated.')
+    parser.add_argument('--output', default='benchmark-report.json')
+    parser.add_argument('--baseline', help='Report to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    scale = dict(seed.SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    with harness.test_database():
+        seed.seed(**scale)
+        user, scenario_list = scenarios.api_scenarios()
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        results = {}
+        for scenario in scenario_list:
+            if args.only and scenario.name not in args.only:
+                continue
+            results[scenario.name] = harness.measure(scenario, client=client, iterations=args.iterations)
+            latency = results[scenario.name]['latency_ms']
+            print(
+                f"{scenario.name:20} p50 {latency['p50']:8.2f}ms  p99 {latency['p99']:8.2f}ms  "
+                f"queries {results[scenario.name]['queries']:3}  peak {results[scenario.name]['peak_alloc_bytes']:>10}B"
+            )
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'scale': scale,
+        'results': results,
+    }
+    harness.write_report(report, args.output)
+
+    if args.baseline:
+        regressions = harness.compare(report, harness.load_report(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+from itertools import count
+
+from core.models import Blog, Post
+
+from benchmarks.harness import Scenario
+
+
+def api_scenarios():
+    """
+    Scenarios for the seeded data set: list, retrieve and create of blogs
+    and posts, as seen by the owner of the first blog.
+    """
+    blog = Blog.objects.select_related('owner__user').order_by('pk').first()
+    post = Post.objects.filter(blog=blog).order_by('pk').first()
+    numbers = count()
+
+    return blog.owner.user, [
+        Scenario('blog-list', 'get', '/api/blogs/'),
+        Scenario('blog-retrieve', 'get', f'/api/blogs/{blog.pk}/'),
+        Scenario('post-list', 'get', f'/api/blogs/{blog.pk}/posts/'),
+        Scenario('post-list-cached', 'get', f'/api/blogs/{blog.pk}/posts/', warm_cache=True),
+        Scenario('post-list-content', 'get', f'/api/blogs/{blog.pk}/posts/?fields=pk,title,content'),
+        Scenario('post-retrieve', 'get', f'/api/blogs/{blog.pk}/posts/{post.pk}/'),
+        Scenario(
+            'post-create', 'post', f'/api/blogs/{blog.pk}/posts/',
+            data=lambda: {'title': f'benchmark {next(numbers)}', 'content': post.content},
+        ),
+    ]
@@ -0,0 +1,49 @@
+"""
+Realistic data for benchmarks, generated with model_bakery.
+"""
+import random
+
+from model_bakery import baker
+
+from core import bulk
+from core.models import Blog, UserProfile
+
+
+SCALES = {
+    'small': {'users': 5, 'blogs_per_user': 2, 'posts_per_blog': 50, 'content_words': 200},
+    'medium': {'users': 20, 'blogs_per_user': 3, 'posts_per_blog': 500, 'content_words': 800},
+    'large': {'users': 50, 'blogs_per_user': 4, 'posts_per_blog': 5000, 'content_words': 1500},
+}
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore '
+    'et dolore magna aliqua python django rest api blog post markdown cache index query'
+).split()
+
+
+def markdown_body(words, rng):
+    paragraphs = []
+    remaining = words
+    while remaining > 0:
+        size = min(remaining, rng.randint(40, 120))
+        paragraphs.append(' '.join(rng.choice(WORDS) for _ in range(size)))
+        remaining -= size
+    return '# ' + ' '.join(rng.sample(WORDS, 4)) + '\n\n' + '\n\n'.join(paragraphs)
+
+
+def seed(users, blogs_per_user, posts_per_blog, content_words, seed=0):
+    """
+    Create `users` profiles owning `blogs_per_user` blogs each, with
+    `posts_per_blog` posts of roughly `content_words` words. Returns the
+    created profiles.
+    """
+    rng = random.Random(seed)
+    profiles = baker.make(UserProfile, _quantity=users)
+    for profile in profiles:
+        for blog in baker.make(Blog, owner=profile, _quantity=blogs_per_user):
+            items = [
+                (index, {'title': ' '.join(rng.sample(WORDS, 5)), 'content': markdown_body(content_words, rng)})
+                for index in range(posts_per_blog)
+            ]
+            bulk.create_posts(blog, items, chunk_size=500)
+    return profiles
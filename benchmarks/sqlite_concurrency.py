@@ -0,0 +1,111 @@
+"""
+Reader throughput on SQLite while posts are being written, default
+rollback-journal profile vs the tuned WAL profile (`DB_SQLITE_TUNED=1`).
+
+    python -m benchmarks.sqlite_concurrency --seconds 5 --readers 8
+
+Each profile runs in its own process against a fresh database file: one
+thread keeps creating posts while the reader threads list them.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+PROFILES = {'default': '0', 'tuned': '1'}
+
+
+def worker(seconds, readers):
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import OperationalError, connection
+    from model_bakery import baker
+
+    from core.models import Blog, Post, UserProfile
+
+    call_command('migrate', verbosity=0)
+    blog = baker.make(Blog, owner=baker.make(UserProfile))
+    baker.make(Post, blog=blog, content='lorem ipsum ' * 200, _quantity=50)
+    connection.close()
+
+    counts = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def write():
+        while time.monotonic() < deadline:
+            try:
+                Post.objects.create(blog=blog, title='benchmark', content='lorem ipsum ' * 200)
+                count('writes')
+            except OperationalError:
+                count('write_errors')
+        connection.close()
+
+    def read():
+        while time.monotonic() < deadline:
+            try:
+                list(Post.objects.filter(blog=blog).defer('content', 'content_html').order_by('-created_at')[:20])
+                count('reads')
+            except OperationalError:
+                count('read_errors')
+        connection.close()
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counts['reads_per_second'] = counts['reads'] / seconds
+    counts['writes_per_second'] = counts['writes'] / seconds
+    print(json.dumps(counts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker(args.seconds, args.readers)
+        return 0
+
+    results = {}
+    for name, tuned in PROFILES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'blog.settings',
+                'DB_ENGINE': 'sqlite3',
+                'DB_NAME': os.path.join(directory, 'benchmark.sqlite3'),
+                'DB_SQLITE_TUNED': tuned,
+            }
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.sqlite_concurrency', '--worker',
+                 '--seconds', str(args.seconds), '--readers', str(args.readers)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+        result = results[name]
+        print(
+            f"{name:8} reads {result['reads_per_second']:9.1f}/s  writes {result['writes_per_second']:7.1f}/s  "
+            f"errors {result['read_errors']} read, {result['write_errors']} write"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
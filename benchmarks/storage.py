@@ -0,0 +1,88 @@
+"""
+Storage size and read/write cost of `Post.content` per compression setting.
+
+    python -m benchmarks.storage --posts 2000 --content-words 800
+
+* `plain`:     no compression, UTF-8 as stored before compression existed.
+* `zlib`:      zlib without a dictionary.
+* `zlib-dict`: zlib with a dictionary trained on the seeded posts.
+* `zstd`, `zstd-dict`: the same with zstd, when zstandard is installed.
+
+Every setting rewrites all posts (`write`) and reads their content back
+(`read`), timings are per post.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def main(argv=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
+    import django
+    django.setup()
+
+    from django.db.models import Sum
+    from django.db.models.functions import Length
+    from django.test.utils import override_settings
+
+    from core import compression
+    from core.models import Post
+
+    from benchmarks import harness, seed
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--content-words', type=int, default=800)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    settings_list = [('plain', None, False), ('zlib', 'zlib', False), ('zlib-dict', 'zlib', True)]
+    if compression.zstandard is not None:
+        settings_list += [('zstd', 'zstd', False), ('zstd-dict', 'zstd', True)]
+
+    results = {}
+    with harness.test_database(), tempfile.TemporaryDirectory() as root:
+        seed.seed(users=1, blogs_per_user=1, posts_per_blog=args.posts, content_words=args.content_words)
+        posts = list(Post.objects.only('pk', 'content').order_by('pk'))
+        text_bytes = sum(len(post.content.encode()) for post in posts)
+        sample = [post.content for post in posts[::max(len(posts) // 500, 1)]]
+
+        for name, algorithm, use_dictionary in settings_list:
+            # Dictionaries are trained per algorithm, the others get an empty directory.
+            directory = os.path.join(root, name)
+            if use_dictionary:
+                compression.write_dictionary(directory, compression.train_dictionary(sample, algorithm=algorithm))
+            with override_settings(CONTENT_COMPRESSION=algorithm, CONTENT_DICTIONARY_DIR=directory):
+                started = time.perf_counter()
+                Post.objects.bulk_update(posts, ['content'], batch_size=500)
+                write = time.perf_counter() - started
+
+                started = time.perf_counter()
+                for _ in Post.objects.values_list('content', flat=True).iterator(chunk_size=500):
+                    pass
+                read = time.perf_counter() - started
+
+                stored = Post.objects.aggregate(size=Sum(Length('content')))['size']
+            results[name] = {
+                'stored_bytes': stored,
+                'ratio': round(stored / text_bytes, 4),
+                'write_us_per_post': round(write / len(posts) * 1e6, 2),
+                'read_us_per_post': round(read / len(posts) * 1e6, 2),
+            }
+            result = results[name]
+            print(
+                f"{name:10} {result['stored_bytes']:>12}B  ratio {result['ratio']:6.3f}  "
+                f"write {result['write_us_per_post']:8.2f}us  read {result['read_us_per_post']:8.2f}us"
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+pytest-benchmark versions of the runner scenarios, skipped unless the
+plugin is installed. Run with `pytest benchmarks --benchmark-only`.
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from rest_framework.test import APIClient  # noqa: E402
+
+from benchmarks import harness, scenarios, seed  # noqa: E402
+
+
+@pytest.fixture
+def api(db):
+    seed.seed(**seed.SCALES['small'])
+    user, scenario_list = scenarios.api_scenarios()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with harness.unthrottled():
+        yield client, {scenario.name: scenario for scenario in scenario_list}
+
+
+@pytest.mark.parametrize('name', ['blog-list', 'post-list', 'post-list-cached', 'post-retrieve', 'post-create'])
+def test_endpoint(benchmark, api, name):
+    client, scenario_list = api
+    scenario = scenario_list[name]
+
+    def run():
+        if not scenario.warm_cache:
+            harness.get_response_cache().clear()
+        response = scenario.request(client)
+        assert response.status_code < 400
+
+    benchmark(run)
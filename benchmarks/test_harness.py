@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.harness import Scenario, compare, measure, percentile
+
+
+def result(p50=1.0, p99=2.0, queries=1, peak=100):
+    return {'latency_ms': {'p50': p50, 'p99': p99}, 'queries': queries, 'peak_alloc_bytes': peak}
+
+
+class TestPercentile:
+    def test_picks_nearest_rank(self):
+        values = list(range(1, 101))
+
+        assert percentile(values, 0.5) == 51
+        assert percentile(values, 0.99) == 99
+        assert percentile([3], 0.99) == 3
+
+
+class TestCompare:
+    def test_within_tolerance_is_not_a_regression(self):
+        report = {'results': {'a': result(p50=1.1)}}
+        baseline = {'results': {'a': result()}}
+
+        assert compare(report, baseline, tolerance=0.2) == []
+
+    def test_slower_and_extra_queries_are_regressions(self):
+        report = {'results': {'a': result(p99=3.0, queries=2)}}
+        baseline = {'results': {'a': result()}}
+
+        regressions = compare(report, baseline, tolerance=0.2)
+
+        assert len(regressions) == 2
+
+    def test_new_scenarios_are_ignored(self):
+        assert compare({'results': {'a': result()}}, {'results': {}}) == []
+
+
+@pytest.mark.django_db
+class TestMeasure:
+    def test_reports_latency_queries_and_allocations(self):
+        summary = measure(Scenario('blog-list', 'get', '/api/blogs/'), iterations=3)
+
+        assert summary['iterations'] == 3
+        assert summary['latency_ms']['p50'] > 0
+        assert summary['queries'] == 2
+        assert summary['peak_alloc_bytes'] > 0
+
+    def test_failing_request_raises(self):
+        with pytest.raises(AssertionError):
+            measure(Scenario('missing', 'get', '/api/blogs/0/'), iterations=1)
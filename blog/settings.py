@@ -49,12 +49,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PrimaryPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,12 +86,64 @@ WSGI_APPLICATION = 'blog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Configured from the environment, defaults to the local SQLite file.
+#   DB_ENGINE             'sqlite3' (default) or 'postgresql'
+#   DB_NAME               database name, or file path for SQLite
+#   DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+#   DB_CONN_MAX_AGE       seconds to keep connections open, 0 closes them per request
+#   DB_CONN_HEALTH_CHECKS '1' to check persistent connections before reuse
+#   DB_REPLICAS           comma separated replica hosts (file paths for SQLite),
+#                         reads are routed to them by core.db_routers
+#   DB_SQLITE_TUNED       '1' to run SQLite in WAL mode with the pragmas below,
+#                         lets readers proceed while a post is being written
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'sqlite3':
+    DB_PRIMARY = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
     }
-}
+    DB_REPLICA_KEY = 'NAME'
+    if os.environ.get('DB_SQLITE_TUNED', '0') == '1':
+        DB_PRIMARY['ENGINE'] = 'core.backends.sqlite3'
+        DB_PRIMARY['OPTIONS'] = {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-32000;'
+                'PRAGMA temp_store=MEMORY'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            # Seconds to wait for a lock (busy timeout) before failing.
+            'timeout': 20,
+        }
+else:
+    DB_PRIMARY = {
+        'ENGINE': f'django.db.backends.{DB_ENGINE}',
+        'NAME': os.environ.get('DB_NAME', 'blog'),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+    }
+    DB_REPLICA_KEY = 'HOST'
+
+DB_PRIMARY['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 0))
+DB_PRIMARY['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', '0') == '1'
+
+DATABASES = {'default': DB_PRIMARY}
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(','))):
+    DATABASES[f'replica{index}'] = {**DB_PRIMARY, DB_REPLICA_KEY: replica.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+# After a write the client reads from the primary for this many seconds,
+# so it sees its own writes even when the replicas lag behind.
+DB_REPLICA_PIN_SECONDS = 5
 
 
 # Password validation
@@ -137,15 +192,69 @@ AUTH_USER_MODEL = 'core.User'
 
 
 REST_FRAMEWORK = {
+    # orjson when installed, the stdlib encoder otherwise.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
+        'core.permissions.HasTokenScope',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.BasicAuthentication',
+        'core.authentication.ApiTokenAuthentication',
+        'core.authentication.CachedBasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    ]
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ReadThrottle',
+        'core.throttling.WriteThrottle',
+    ],
+    # Reverse proxies in front of the app. Throttles key anonymous clients on
+    # the address that many hops back in X-Forwarded-For, with 0 on
+    # REMOTE_ADDR so a client cannot pick its own bucket with the header.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    # Per user (`*_user`) or per client address (`*_anon`), None disables a scope.
+    'DEFAULT_THROTTLE_RATES': {
+        'read_user': '1200/min',
+        'read_anon': '300/min',
+        'write_user': '120/min',
+        'write_anon': '30/min',
+        # Failed Basic auth attempts per client address.
+        'auth_failure': '10/min',
+    },
 }
 
+# gzip / brotli (with the optional brotli package) for these media types,
+# from RESPONSE_COMPRESSION_MIN_SIZE bytes. Cached responses are compressed
+# once per encoding with the slower RESPONSE_COMPRESSION_CACHED_LEVELS.
+# Never add text/html here, pages carry CSRF tokens (BREACH).
+RESPONSE_COMPRESSION_TYPES = [
+    'application/json', 'application/x-ndjson', 'text/csv',
+    'application/rss+xml', 'application/atom+xml', 'application/feed+json',
+]
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+RESPONSE_COMPRESSION_LEVELS = {'br': 4, 'gzip': 6}
+RESPONSE_COMPRESSION_CACHED_LEVELS = {'br': 9, 'gzip': 9}
+
+# Sliding-window counters of the throttles, in this process by default.
+# 'core.throttling.CacheCounter' with {'alias': ...} shares them through CACHES.
+THROTTLE_COUNTER = {
+    'BACKEND': 'core.throttling.LocalCounter',
+    'OPTIONS': {
+        'max_keys': 100000,
+    },
+}
+
+# Successful Basic auth verifications are remembered this many seconds.
+BASIC_AUTH_CACHE_TTL = 60
+BASIC_AUTH_CACHE_SIZE = 10000
+
+# API tokens that were looked up are remembered this many seconds, deleted
+# tokens may stay usable in other processes for up to that long.
+TOKEN_AUTH_CACHE_TTL = 300
+TOKEN_AUTH_CACHE_SIZE = 10000
+
 # add frame settings for django3.0+ like this：
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
@@ -182,4 +291,93 @@ MDEDITOR_CONFIGS = {
 
 # enabling media uploads
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads')
-MEDIA_URL = '/media/'
\ No newline at end of file
+MEDIA_URL = '/media/'
+
+# Editor uploads are downscaled to these widths (never upscaled) and also
+# converted to WebP by a background job.
+IMAGE_VARIANT_WIDTHS = [480, 960, 1600]
+IMAGE_QUALITY = 82
+
+# Home timelines keep the latest TIMELINE_LENGTH posts of followed blogs.
+# Posts of blogs with more than TIMELINE_FANOUT_LIMIT followers are merged
+# in on read instead of being copied into every follower's timeline.
+TIMELINE_LENGTH = 500
+TIMELINE_FANOUT_LIMIT = 10000
+
+# Post content is stored compressed, see `core.compression`. 'zstd' needs
+# the zstandard package, None stores plain UTF-8. Dictionaries trained with
+# `train_content_dictionary` live in CONTENT_DICTIONARY_DIR and must ship
+# with the code to every server.
+CONTENT_COMPRESSION = 'zlib'
+CONTENT_COMPRESSION_LEVEL = 6
+CONTENT_COMPRESSION_MIN_SIZE = 256
+CONTENT_DICTIONARY_DIR = os.path.join(BASE_DIR, 'dictionaries')
+
+# Post edits are stored as compressed line diffs with a full snapshot at
+# least every REVISION_SNAPSHOT_INTERVAL revisions. `compact_revisions`
+# squashes revisions older than REVISION_COMPACT_AFTER_DAYS beyond the
+# latest REVISION_KEEP of each post.
+REVISION_SNAPSHOT_INTERVAL = 20
+REVISION_KEEP = 50
+REVISION_COMPACT_AFTER_DAYS = 90
+
+# Number of latest posts in the RSS, Atom and JSON feeds.
+FEED_SIZE = 20
+
+# Per-request timings, see `core.metrics`. Queries slower than
+# METRICS_SLOW_QUERY_MS are logged to `core.metrics.slow_queries`, /metrics
+# answers staff users and requests with `Authorization: Bearer <METRICS_TOKEN>`
+# (e.g. the Prometheus scraper). Client addresses are not trusted, behind a
+# local reverse proxy every request comes from the loopback address.
+METRICS_ENABLED = True
+METRICS_SLOW_QUERY_MS = 100
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# One JSON line per request on `core.metrics` at INFO, off unless
+# METRICS_LOG_LEVEL=INFO. Slow queries are warnings on its child.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('METRICS_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
+# Background jobs, see `core.tasks`. JOBS_EAGER runs them inline instead.
+JOBS_EAGER = False
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1
+JOB_MAX_ATTEMPTS = 5
+# Retry delays double from JOB_RETRY_BACKOFF up to JOB_RETRY_BACKOFF_MAX seconds.
+JOB_RETRY_BACKOFF = 2
+JOB_RETRY_BACKOFF_MAX = 600
+# Running jobs not finished after this many seconds are taken over by another worker.
+JOB_LOCK_TIMEOUT = 300
+
+# API pagination, clients may ask for up to API_MAX_PAGE_SIZE items
+# with the `page_size` query parameter.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# Batch post endpoint, items per request and per write transaction.
+API_MAX_BULK_SIZE = 5000
+API_BULK_CHUNK_SIZE = 500
+
+# Cache of rendered API responses, see core.cache. Use
+# 'core.cache.DjangoCache' with OPTIONS {'alias': ...} to share it
+# between processes through one of the CACHES (file based, Redis, ...).
+RESPONSE_CACHE = {
+    'BACKEND': 'core.cache.LRUCache',
+    'OPTIONS': {
+        'max_entries': 1000,
+        'max_bytes': 32 * 1024 * 1024,
+    },
+}
@@ -15,15 +15,22 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.views import ImageUploadView, metrics_view, serve_media
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('core.urls')),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
+    # Takes precedence over the editor's own upload view.
+    path('mdeditor/uploads/', ImageUploadView.as_view(), name='uploads'),
     path('mdeditor/', include('mdeditor.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('metrics', metrics_view, name='metrics'),
+]
+
+if settings.DEBUG:
+    urlpatterns.append(re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.*)$', serve_media))
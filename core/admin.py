@@ -1,9 +1,11 @@
 from django.contrib import admin
 
-from core.models import Blog, Post, User, UserProfile
+from core.models import ApiToken, Blog, Job, Post, User, UserProfile
 
 # Register your models here.
 admin.site.register(User)
 admin.site.register(UserProfile)
 admin.site.register(Blog)
-admin.site.register(Post)
\ No newline at end of file
+admin.site.register(Post)
+admin.site.register(Job)
+admin.site.register(ApiToken)
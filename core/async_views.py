@@ -0,0 +1,179 @@
+"""
+ASGI-native read endpoints for blogs and posts.
+
+Plain async Django views on the async ORM, so reads do not hold a thread in
+the sync-to-async bridge under an ASGI server. They are read only, writes
+stay on the DRF viewsets. Callers are authenticated, checked and throttled
+like on the viewsets (`api_access`), and blog owners see their drafts and
+scheduled posts here too. Pagination is keyset based with opaque cursors.
+"""
+import base64
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException
+from rest_framework.views import APIView
+
+from core.models import Blog, Post
+from core.permissions import HasTokenScope
+from core.serializers import BlogSerializer, PostSerializer, PostSummarySerializer, requested_fields
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise InvalidCursor
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', settings.API_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.API_PAGE_SIZE
+    return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+
+def next_url(request, cursor):
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+class AccessCheck(APIView):
+    """
+    Authentication, permission checks and throttles of the DRF viewsets, run
+    ahead of the async views, so reads here count against the same buckets.
+    `IsBlogOwnerOrReadOnly` allows every read, owners are told apart by the
+    views themselves.
+    """
+    permission_classes = [HasTokenScope]
+
+    def check(self, request):
+        """
+        Returns a rendered error response, or None when the request may go on.
+        """
+        self.request, self.args, self.kwargs = request, (), {}
+        self.headers = self.default_response_headers
+        try:
+            self.initial(request)
+        except APIException as exc:
+            return self.finalize_response(request, self.handle_exception(exc)).render()
+        return None
+
+
+def api_access(view):
+    """
+    Call `view` with a DRF request for the authenticated caller.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        check = AccessCheck()
+        drf_request = check.initialize_request(request)
+        response = await sync_to_async(check.check)(drf_request)
+        if response is not None:
+            return response
+        return await view(drf_request, *args, **kwargs)
+    return wrapper
+
+
+async def is_blog_owner(request, blog_pk):
+    user = request.user
+    return user.is_authenticated and await Blog.objects.filter(pk=blog_pk, owner__user_id=user.pk).aexists()
+
+
+async def paginate(request, queryset, page_size, cursor_values):
+    """
+    Fetch one page plus one row to learn whether there is a next page.
+    """
+    items = [item async for item in queryset[:page_size + 1].aiterator()]
+    cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        cursor = next_url(request, encode_cursor(cursor_values(items[-1])))
+    return items, cursor
+
+
+@require_safe
+@api_access
+async def blog_list(request):
+    page_size = get_page_size(request)
+    queryset = Blog.objects.order_by('pk')
+    if 'cursor' in request.GET:
+        try:
+            (after,) = decode_cursor(request.GET['cursor'])
+            after = int(after)
+        except (InvalidCursor, TypeError, ValueError):
+            raise Http404('Invalid cursor')
+        queryset = queryset.filter(pk__gt=after)
+
+    blogs, cursor = await paginate(request, queryset, page_size, lambda blog: [blog.pk])
+    data = BlogSerializer(blogs, many=True, context={'request': request}).data
+    return JsonResponse({'next': cursor, 'results': data})
+
+
+@require_safe
+@api_access
+async def blog_detail(request, pk):
+    try:
+        blog = await Blog.objects.aget(pk=pk)
+    except Blog.DoesNotExist:
+        raise Http404
+    return JsonResponse(BlogSerializer(blog, context={'request': request}).data)
+
+
+@require_safe
+@api_access
+async def post_list(request, blog_pk):
+    owner_user_id = await Blog.objects.filter(pk=blog_pk).values_list('owner__user_id', flat=True).afirst()
+    if owner_user_id is None:
+        raise Http404
+    fields = requested_fields(request) or set()
+    body_fields = [name for name in ('content', 'content_html') if name not in fields]
+    queryset = Post.objects.filter(blog=blog_pk).defer(*body_fields).order_by('-created_at', '-pk')
+    if not (request.user.is_authenticated and request.user.pk == owner_user_id):
+        queryset = queryset.filter(status=Post.PUBLISHED)
+
+    if 'cursor' in request.GET:
+        try:
+            created_at, pk = decode_cursor(request.GET['cursor'])
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (InvalidCursor, TypeError, ValueError):
+            raise Http404('Invalid cursor')
+        if created_at is None:
+            raise Http404('Invalid cursor')
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    posts, cursor = await paginate(
+        request, queryset, get_page_size(request), lambda post: [post.created_at.isoformat(), post.pk]
+    )
+    serializer_class = PostSerializer if len(body_fields) < 2 else PostSummarySerializer
+    data = serializer_class(posts, many=True, context={'request': request}).data
+    return JsonResponse({'next': cursor, 'results': data})
+
+
+@require_safe
+@api_access
+async def post_detail(request, blog_pk, pk):
+    try:
+        post = await Post.objects.aget(pk=pk, blog=blog_pk)
+    except Post.DoesNotExist:
+        raise Http404
+    if post.status != Post.PUBLISHED and not await is_blog_owner(request, blog_pk):
+        raise Http404
+    return JsonResponse(PostSerializer(post, context={'request': request}).data)
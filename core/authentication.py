@@ -0,0 +1,164 @@
+"""
+Authentication classes that avoid paying a password hash per request.
+"""
+import copy
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, BasicAuthentication
+
+from core.models import ApiToken
+from core.throttling import AuthFailureThrottle
+
+
+class CredentialCache:
+    """
+    Bounded in-process map of verified credentials, entries expire `ttl`
+    seconds after they were stored and the least recently used go first.
+    """
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_credential_cache = None
+_token_cache = None
+
+
+def get_credential_cache():
+    global _credential_cache
+    if _credential_cache is None:
+        _credential_cache = CredentialCache(settings.BASIC_AUTH_CACHE_SIZE, settings.BASIC_AUTH_CACHE_TTL)
+    return _credential_cache
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = CredentialCache(settings.TOKEN_AUTH_CACHE_SIZE, settings.TOKEN_AUTH_CACHE_TTL)
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_credential_caches(setting, **kwargs):
+    global _credential_cache, _token_cache
+    if setting in ('BASIC_AUTH_CACHE_SIZE', 'BASIC_AUTH_CACHE_TTL'):
+        _credential_cache = None
+    if setting in ('TOKEN_AUTH_CACHE_SIZE', 'TOKEN_AUTH_CACHE_TTL'):
+        _token_cache = None
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    HTTP Basic authentication that remembers successful verifications for
+    BASIC_AUTH_CACHE_TTL seconds, and refuses to verify anything for client
+    addresses over the `auth_failure` rate.
+
+    Cache keys are an HMAC of the credentials, never the password itself.
+    An entry also records the user's password hash, so changing the password
+    invalidates it immediately.
+    """
+    def authenticate_credentials(self, userid, password, request=None):
+        throttle = AuthFailureThrottle(request)
+        if not throttle.allow():
+            raise exceptions.Throttled(throttle.wait())
+
+        cache = get_credential_cache()
+        key = hmac.new(settings.SECRET_KEY.encode(), f'{userid}\0{password}'.encode(), hashlib.sha256).hexdigest()
+        cached = cache.get(key)
+        if cached is not None:
+            user_pk, password_hash = cached
+            user = get_user_model()._default_manager.filter(pk=user_pk).first()
+            if user is not None and user.is_active and user.password == password_hash:
+                return (user, None)
+
+        try:
+            user, auth = super().authenticate_credentials(userid, password, request)
+        except exceptions.AuthenticationFailed:
+            throttle.record_failure()
+            raise
+        cache.set(key, (user.pk, user.password))
+        return (user, auth)
+
+
+class ApiTokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Token <key>` (or `Bearer <key>`) with an `ApiToken`.
+
+    Verification is one lookup of the key's SHA-256 on a unique index, that
+    also loads the profile and user. Tokens found are kept for
+    TOKEN_AUTH_CACHE_TTL seconds, so repeated requests need no query at all.
+    Deleting a token drops it from this process' cache at once, other
+    processes notice within the TTL. `request.auth` is the token.
+    """
+    keywords = ('token', 'bearer')
+
+    def authenticate(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if not header or header[0].lower() not in self.keywords:
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        return self.authenticate_credentials(header[1])
+
+    def authenticate_credentials(self, key):
+        key_hash = ApiToken.hash_key(key)
+        cache = get_token_cache()
+        token = cache.get(key_hash)
+        if token is None:
+            token = ApiToken.objects.select_related('profile__user').filter(key_hash=key_hash).first()
+            if token is None:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            cache.set(key_hash, token)
+
+        if token.is_expired():
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        if not token.profile.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # Requests get their own copies, the cached instances are shared.
+        profile = copy.copy(token.profile)
+        user = profile.user = copy.copy(profile.user)
+        user.profile = profile
+        token = copy.copy(token)
+        token.profile = profile
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return 'Token'
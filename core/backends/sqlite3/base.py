@@ -0,0 +1,47 @@
+"""
+SQLite backend with per-connection tuning, backporting the `init_command`
+and `transaction_mode` OPTIONS that Django only offers from 5.1 on.
+
+    'ENGINE': 'core.backends.sqlite3',
+    'OPTIONS': {
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    }
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+TRANSACTION_MODES = ('DEFERRED', 'EXCLUSIVE', 'IMMEDIATE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.init_commands = [
+            command.strip() for command in params.pop('init_command', '').split(';') if command.strip()
+        ]
+        self.transaction_mode = params.pop('transaction_mode', None)
+        if self.transaction_mode is not None:
+            self.transaction_mode = self.transaction_mode.upper()
+            if self.transaction_mode not in TRANSACTION_MODES:
+                raise ImproperlyConfigured(
+                    f"settings.DATABASES['{self.alias}']['OPTIONS']['transaction_mode'] must be one of "
+                    f"{', '.join(TRANSACTION_MODES)}."
+                )
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for command in self.init_commands:
+            conn.execute(command)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so a transaction that
+        # reads before writing waits for the busy timeout instead of failing
+        # with "database is locked" when it later tries to upgrade its lock.
+        if self.transaction_mode is None:
+            return super()._start_transaction_under_autocommit()
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,93 @@
+"""
+Batch writes of posts into a single blog.
+
+`bulk_create` / `bulk_update` skip `Post.save()` and model signals, so the
+derived fields, publication dates, revisions, image references, the search
+and timeline jobs and the blog version and aggregates are maintained here
+instead.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core import images, revisions, tasks, timeline
+from core.models import Blog, Post
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def create_posts(blog, items, chunk_size):
+    """
+    Create posts from `(index, validated_data)` pairs, one transaction per
+    chunk. Returns `{index: post}`.
+    """
+    created = {}
+    for chunk in chunks(items, chunk_size):
+        posts = []
+        for _, data in chunk:
+            post = Post(blog=blog, **data)
+            post.refresh_derived_fields()
+            post.refresh_publication()
+            posts.append(post)
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            images.record_references([(post, '') for post in posts])
+            public = [post for post in posts if post.status == Post.PUBLISHED]
+            if public:
+                tasks.enqueue('search.index_posts', [post.pk for post in public])
+                tasks.enqueue('timeline.fan_out', [post.pk for post in public])
+            Blog.record_post_changes(
+                blog.pk,
+                posts=len(public),
+                words=sum(post.word_count for post in public),
+                created_at=max((post.created_at for post in public), default=None),
+            )
+        created.update((index, post) for (index, _), post in zip(chunk, posts))
+    return created
+
+
+def update_posts(blog, items, chunk_size):
+    """
+    Apply `(index, post, validated_data)` triples, one transaction per chunk.
+    """
+    for chunk in chunks(items, chunk_size):
+        fields = {'updated_at'}
+        posts = []
+        edited = []
+        counts = [0, 0]
+        now = timezone.now()
+        for _, post, data in chunk:
+            old_counts = post.blog_counts(saved=True)
+            for name, value in data.items():
+                setattr(post, name, value)
+            if 'content' in data:
+                post.refresh_derived_fields()
+                fields.update(Post.DERIVED_FIELDS)
+                edited.append((post, post.saved_state.get('content')))
+            if post.refresh_publication():
+                fields.update(('created_at', 'publish_at'))
+            post.updated_at = now
+            new_counts = post.blog_counts()
+            counts = [total + new - old for total, new, old in zip(counts, new_counts, old_counts)]
+            fields.update(data)
+            posts.append(post)
+        with transaction.atomic():
+            Post.objects.bulk_update(posts, sorted(fields))
+            revisions.record([
+                (post, post.saved_state.get('title'), post.saved_state.get('content'))
+                for post in posts if revisions.has_changed(post)
+            ])
+            images.record_references(edited)
+            tasks.enqueue('search.index_posts', [post.pk for post in posts])
+            published = [post for post in posts if post.status == Post.PUBLISHED and not post.was_published]
+            hidden = [post.pk for post in posts if post.status != Post.PUBLISHED and post.was_published]
+            if published:
+                tasks.enqueue('timeline.fan_out', [post.pk for post in published])
+            if hidden:
+                timeline.remove_posts(hidden)
+            Blog.record_post_changes(
+                blog.pk, posts=counts[0], words=counts[1],
+                created_at=max((post.created_at for post in published), default=None), recount_last=bool(hidden),
+            )
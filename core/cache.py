@@ -0,0 +1,177 @@
+"""
+Response cache for read-heavy API endpoints.
+
+Entries are keyed by the same validators `ConditionalGetMixin` computes
+(blog version / modification time), so any write that changes them makes
+the old entries unreachable, and the LRU bound eventually evicts them.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from core import content_encoding
+from core.conditional import ConditionalGetMixin
+
+
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class LRUCache:
+    """
+    In-process cache bounded by both entry count and total payload size,
+    least recently used entries are evicted first.
+    """
+    def __init__(self, max_entries=1000, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        self.stats.record(entry is not None)
+        return entry
+
+    def set(self, key, entry):
+        size = entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= entry_size(self.entries.pop(key))
+            self.entries[key] = entry
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= entry_size(evicted)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def get_stats(self):
+        return {**self.stats.as_dict(), 'entries': len(self.entries), 'bytes': self.size}
+
+
+class DjangoCache:
+    """
+    Stores entries in one of the `CACHES` aliases, e.g. a file based or
+    Redis cache shared between processes. Eviction is left to that cache.
+    """
+    def __init__(self, alias='default', timeout=300):
+        self.alias = alias
+        self.timeout = timeout
+        self.stats = CacheStats()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        self.stats.record(entry is not None)
+        return entry
+
+    def set(self, key, entry):
+        self.cache.set(key, entry, self.timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+    def get_stats(self):
+        return self.stats.as_dict()
+
+
+def entry_size(entry):
+    return len(entry['content']) + sum(len(body) for body in entry.get('encoded', {}).values())
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        config = settings.RESPONSE_CACHE
+        _response_cache = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _response_cache
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    global _response_cache
+    if setting == 'RESPONSE_CACHE':
+        _response_cache = None
+
+
+class CachedResponseMixin(ConditionalGetMixin):
+    """
+    Serves rendered `list` / `retrieve` responses from the response cache.
+    Only JSON responses are cached, the browsable API embeds the current user.
+    """
+    def get_cache_visibility(self):
+        return 'auth' if self.request.user.is_authenticated else 'anon'
+
+    def get_cache_key(self, version):
+        key = '|'.join([
+            type(self).__name__, str(version), self.request.get_full_path(),
+            self.request.accepted_media_type, self.get_cache_visibility(),
+        ])
+        return 'response:' + hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+    def get_fresh_response(self, version, view, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return view(request, *args, **kwargs)
+
+        cache = get_response_cache()
+        key = self.get_cache_key(version)
+        entry = cache.get(key)
+        if entry is not None:
+            response = content_encoding.cached_response(cache, key, entry, request)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.headers['X-Cache'] = 'MISS'
+            response.add_post_render_callback(lambda rendered: self.store_response(cache, key, rendered))
+        return response
+
+    def store_response(self, cache, key, response):
+        """
+        Cache the rendered response and send it in the compressed variant
+        stored with it, if the client accepts one.
+        """
+        entry = {'content': response.content, 'content_type': response.headers['Content-Type']}
+        body, encoding = content_encoding.cached_body(cache, key, entry, self.request, stored=False)
+        if encoding is not None:
+            response.content = body
+            content_encoding.mark_encoded(response, encoding)
@@ -0,0 +1,230 @@
+"""
+Compressed storage of large text columns, see `core.fields.CompressedTextField`.
+
+Stored values start with a one byte codec tag. Values shorter than
+CONTENT_COMPRESSION_MIN_SIZE bytes, or that do not get smaller, are kept as
+UTF-8 after the tag. Compressed values carry the id of the dictionary they
+were compressed with as two more bytes, so dictionaries can be retrained
+while old rows stay readable.
+
+Dictionaries are the files `<id>.dict` in CONTENT_DICTIONARY_DIR, written by
+the `train_content_dictionary` command from posts already stored. They are
+never modified or removed once rows reference them; new values use the
+highest id. zstd needs the optional `zstandard` package.
+"""
+import os
+import re
+import struct
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+RAW = 0
+ZLIB = 1
+ZSTD = 2
+ALGORITHMS = {'zlib': ZLIB, 'zstd': ZSTD}
+
+HEADER = struct.Struct('>BH')
+DICTIONARY_RE = re.compile(r'^(\d+)\.dict$')
+# Deflate only looks back 32 KiB, a larger zlib dictionary is never used.
+MAX_ZLIB_DICTIONARY = 32 * 1024
+
+
+def load_dictionaries(directory):
+    if not directory or not os.path.isdir(directory):
+        return {}
+    dictionaries = {}
+    for name in os.listdir(directory):
+        match = DICTIONARY_RE.match(name)
+        if match:
+            with open(os.path.join(directory, name), 'rb') as file:
+                dictionaries[int(match.group(1))] = file.read()
+    return dictionaries
+
+
+class Codec:
+    def __init__(self, algorithm='zlib', level=6, min_size=256, dictionary_dir=None):
+        if algorithm is not None and algorithm not in ALGORITHMS:
+            raise ImproperlyConfigured(f'Unknown CONTENT_COMPRESSION {algorithm!r}.')
+        if algorithm == 'zstd' and zstandard is None:
+            raise ImproperlyConfigured('CONTENT_COMPRESSION = "zstd" requires the zstandard package.')
+        self.codec = ALGORITHMS.get(algorithm, RAW)
+        self.level = level
+        self.min_size = min_size
+        self.dictionaries = load_dictionaries(dictionary_dir)
+        self.dictionary_id = max(self.dictionaries, default=0)
+        # Compressors primed with a dictionary are copied per value instead of
+        # hashing the dictionary again every time.
+        self.zlib_compressors = {}
+        self.zlib_decompressors = {}
+        self.zstd_dictionaries = {}
+
+    def dictionary(self, dictionary_id):
+        if dictionary_id == 0:
+            return None
+        try:
+            return self.dictionaries[dictionary_id]
+        except KeyError:
+            raise ValueError(f'Compression dictionary {dictionary_id} is missing from CONTENT_DICTIONARY_DIR.')
+
+    def zlib_compressor(self, dictionary_id):
+        if dictionary_id not in self.zlib_compressors:
+            dictionary = self.dictionary(dictionary_id)
+            if dictionary is None:
+                compressor = zlib.compressobj(self.level)
+            else:
+                compressor = zlib.compressobj(self.level, zdict=dictionary[-MAX_ZLIB_DICTIONARY:])
+            self.zlib_compressors[dictionary_id] = compressor
+        return self.zlib_compressors[dictionary_id].copy()
+
+    def zlib_decompressor(self, dictionary_id):
+        if dictionary_id not in self.zlib_decompressors:
+            dictionary = self.dictionary(dictionary_id)
+            if dictionary is None:
+                decompressor = zlib.decompressobj()
+            else:
+                decompressor = zlib.decompressobj(zdict=dictionary[-MAX_ZLIB_DICTIONARY:])
+            self.zlib_decompressors[dictionary_id] = decompressor
+        return self.zlib_decompressors[dictionary_id].copy()
+
+    def zstd_dictionary(self, dictionary_id):
+        if zstandard is None:
+            raise ValueError('Reading zstd compressed values requires the zstandard package.')
+        if dictionary_id not in self.zstd_dictionaries:
+            dictionary = self.dictionary(dictionary_id)
+            if dictionary is not None:
+                dictionary = zstandard.ZstdCompressionDict(dictionary)
+                dictionary.precompute_compress(level=self.level)
+            self.zstd_dictionaries[dictionary_id] = dictionary
+        return self.zstd_dictionaries[dictionary_id]
+
+    def compress(self, text):
+        data = text.encode()
+        if self.codec == RAW or len(data) < self.min_size:
+            return bytes([RAW]) + data
+        if self.codec == ZLIB:
+            compressor = self.zlib_compressor(self.dictionary_id)
+            body = compressor.compress(data) + compressor.flush()
+        else:
+            dictionary = self.zstd_dictionary(self.dictionary_id)
+            body = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary).compress(data)
+        if HEADER.size + len(body) >= 1 + len(data):
+            return bytes([RAW]) + data
+        return HEADER.pack(self.codec, self.dictionary_id) + body
+
+    def decompress(self, value):
+        value = bytes(value)
+        if value[0] == RAW:
+            return value[1:].decode()
+        codec, dictionary_id = HEADER.unpack_from(value)
+        body = value[HEADER.size:]
+        if codec == ZLIB:
+            decompressor = self.zlib_decompressor(dictionary_id)
+            return (decompressor.decompress(body) + decompressor.flush()).decode()
+        if codec == ZSTD:
+            dictionary = self.zstd_dictionary(dictionary_id)
+            return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(body).decode()
+        raise ValueError(f'Unknown compression codec {codec}.')
+
+
+_codec = None
+
+
+def get_codec():
+    global _codec
+    if _codec is None:
+        _codec = Codec(
+            algorithm=settings.CONTENT_COMPRESSION,
+            level=settings.CONTENT_COMPRESSION_LEVEL,
+            min_size=settings.CONTENT_COMPRESSION_MIN_SIZE,
+            dictionary_dir=settings.CONTENT_DICTIONARY_DIR,
+        )
+    return _codec
+
+
+def reset_codec():
+    global _codec
+    _codec = None
+
+
+@receiver(setting_changed)
+def reset_codec_on_setting_change(setting, **kwargs):
+    if setting.startswith('CONTENT_COMPRESSION') or setting == 'CONTENT_DICTIONARY_DIR':
+        reset_codec()
+
+
+def train_dictionary(samples, size=MAX_ZLIB_DICTIONARY, algorithm='zlib'):
+    """
+    Dictionary of at most `size` bytes for the text `samples`.
+    """
+    samples = [sample.encode() for sample in samples]
+    if algorithm == 'zstd':
+        if zstandard is None:
+            raise ImproperlyConfigured('Training a zstd dictionary requires the zstandard package.')
+        return zstandard.train_dictionary(size, samples).as_bytes()
+
+    # zlib has no trainer: keep the lines and words shared by most samples,
+    # most valuable last as deflate reaches the end of the dictionary with
+    # the shortest distances.
+    counts = Counter()
+    for sample in samples:
+        lines = {line for line in sample.splitlines(keepends=True) if len(line) > 3}
+        words = {word + b' ' for word in sample.split() if len(word) > 3}
+        counts.update(lines | words)
+    common = sorted(
+        (count * len(piece), piece) for piece, count in counts.items() if count > 1
+    )
+    pieces = []
+    used = 0
+    for _, piece in reversed(common):
+        if used + len(piece) > size:
+            continue
+        pieces.append(piece)
+        used += len(piece)
+    return b''.join(reversed(pieces))
+
+
+def write_dictionary(directory, dictionary):
+    """
+    Store `dictionary` under the next free id and return the id.
+    """
+    os.makedirs(directory, exist_ok=True)
+    dictionary_id = max(load_dictionaries(directory), default=0) + 1
+    if dictionary_id > 0xFFFF:
+        raise ValueError('No dictionary ids left.')
+    with open(os.path.join(directory, f'{dictionary_id}.dict'), 'xb') as file:
+        file.write(dictionary)
+    return dictionary_id
+
+
+def backfill(queryset, source, target, batch_size=500):
+    """
+    Copy `source` into `target` for every row of `queryset`, by primary key
+    range, one short transaction per batch so the table is never locked for
+    the whole run. Returns the number of rows copied.
+    """
+    copied = 0
+    last_pk = None
+    queryset = queryset.order_by('pk').only('pk', source)
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        with transaction.atomic():
+            rows = list(batch[:batch_size])
+            if not rows:
+                return copied
+            for row in rows:
+                setattr(row, target, getattr(row, source))
+            queryset.model._default_manager.bulk_update(rows, [target])
+        copied += len(rows)
+        last_pk = rows[-1].pk
@@ -0,0 +1,58 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Answers `list` and `retrieve` with `304 Not Modified` when the client's
+    `If-None-Match` / `If-Modified-Since` still match, without touching the
+    queryset or serializer.
+
+    Subclasses implement `get_list_validators()` and `get_object_validators()`,
+    each returning a `(version, last_modified)` pair from one cheap lookup,
+    or `None` to skip conditional handling (e.g. the object does not exist).
+    """
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.get_list_validators(), super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(self.get_object_validators(), super().retrieve, request, *args, **kwargs)
+
+    def get_list_validators(self):
+        raise NotImplementedError
+
+    def get_object_validators(self):
+        raise NotImplementedError
+
+    def get_fresh_response(self, version, view, request, *args, **kwargs):
+        """
+        Full response for a request that did not match, hook for caching.
+        """
+        return view(request, *args, **kwargs)
+
+    def get_etag(self, version):
+        """
+        The representation also depends on the query string (cursor, fields)
+        and the negotiated renderer, so both are part of the tag.
+        """
+        key = '|'.join([str(version), self.request.get_full_path(), self.request.accepted_media_type])
+        return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+    def conditional(self, validators, view, request, *args, **kwargs):
+        if validators is None:
+            return view(request, *args, **kwargs)
+
+        version, last_modified = validators
+        etag = self.get_etag(version)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = self.get_fresh_response(version, view, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            if timestamp is not None:
+                response.headers['Last-Modified'] = http_date(timestamp)
+        return response
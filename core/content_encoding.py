@@ -0,0 +1,133 @@
+"""
+Negotiated gzip / brotli compression of responses.
+
+`CompressionMiddleware` compresses responses of the RESPONSE_COMPRESSION_TYPES
+that are at least RESPONSE_COMPRESSION_MIN_SIZE bytes. Response cache entries
+keep their compressed variants next to the plain body, so a cached response
+is compressed once per encoding instead of on every hit. Brotli needs the
+optional `brotli` package and is preferred when the client accepts both.
+HTML is never compressed, it carries CSRF tokens (BREACH).
+"""
+import gzip
+import re
+import zlib
+
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ENCODINGS = ('br', 'gzip')
+ACCEPT_ENCODING_RE = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def available_encodings():
+    """
+    Supported encodings, most preferred first.
+    """
+    return [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+
+
+def parse_accept_encoding(header):
+    accepted = {}
+    for item in header.split(','):
+        match = ACCEPT_ENCODING_RE.match(item)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) is not None else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = quality
+    return accepted
+
+
+def negotiate(request):
+    """
+    Encoding to use for `request`, None for an uncompressed response.
+    """
+    accepted = parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+    best = None
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def is_compressible(content_type, size):
+    if size is not None and size < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+        return False
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in settings.RESPONSE_COMPRESSION_TYPES
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output, and so cached variants, deterministic.
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding, level):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def mark_encoded(response, encoding):
+    """
+    Headers of a response whose body was compressed with `encoding`. The
+    bytes differ from the identity representation, so a strong ETag
+    becomes weak, like Django's GZipMiddleware does.
+    """
+    response.headers['Content-Encoding'] = encoding
+    etag = response.headers.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+
+
+def cached_body(cache, key, entry, request, stored=True):
+    """
+    `(body, encoding)` of a response cache entry for `request`. A variant
+    in a new encoding is compressed once with RESPONSE_COMPRESSION_CACHED_LEVELS
+    and saved with the entry. `stored=False` saves the entry in any case.
+    """
+    encoding = None
+    if is_compressible(entry['content_type'], len(entry['content'])):
+        encoding = negotiate(request)
+    body = entry['content']
+    if encoding is not None:
+        encoded = entry.get('encoded', {})
+        if encoding in encoded:
+            body = encoded[encoding]
+        else:
+            body = compress(entry['content'], encoding, settings.RESPONSE_COMPRESSION_CACHED_LEVELS[encoding])
+            entry = {**entry, 'encoded': {**encoded, encoding: body}}
+            stored = False
+    if not stored:
+        cache.set(key, entry)
+    return body, encoding
+
+
+def cached_response(cache, key, entry, request):
+    body, encoding = cached_body(cache, key, entry, request)
+    response = HttpResponse(body, content_type=entry['content_type'])
+    if encoding is not None:
+        mark_encoded(response, encoding)
+    return response
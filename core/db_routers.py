@@ -0,0 +1,48 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+@contextmanager
+def pin_to_primary():
+    """
+    Route every read in this context to the primary database.
+    """
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the primary and reads to a random replica from
+    `DATABASE_REPLICAS`. Reads stay on the primary while pinned (see
+    `core.middleware.PrimaryPinningMiddleware`) or inside a transaction,
+    where they must see the transaction's own writes.
+    """
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
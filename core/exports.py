@@ -0,0 +1,59 @@
+"""
+Constant-memory exports of all posts of a blog as NDJSON or CSV.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Post
+
+
+EXPORT_FIELDS = ['pk', 'title', 'content', 'created_at', 'updated_at', 'status']
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """
+    File-like object for `csv.writer` that hands each line back instead of
+    buffering it.
+    """
+    def write(self, value):
+        return value
+
+
+def export_rows(blog_pk, chunk_size=2000, include_drafts=False):
+    queryset = Post.objects.filter(blog=blog_pk)
+    if not include_drafts:
+        queryset = queryset.filter(status=Post.PUBLISHED)
+    queryset = queryset.order_by('created_at', 'pk').values_list(*EXPORT_FIELDS)
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+EXPORTERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+
+def export_blog(blog_pk, export_type='ndjson', chunk_size=2000, include_drafts=False):
+    """
+    Published posts of the blog, or all of them with `include_drafts`.
+    """
+    return EXPORTERS[export_type](export_rows(blog_pk, chunk_size=chunk_size, include_drafts=include_drafts))
@@ -0,0 +1,147 @@
+"""
+RSS 2.0, Atom and JSON Feed documents of the latest posts, per blog and
+across all blogs.
+
+A generated document is stored in the response cache under the same
+validators the API uses (blog version / modification time), so it is only
+regenerated after a post of that blog changed, and polling readers get a
+`304 Not Modified` or a cached document after a single cheap lookup.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from core import content_encoding
+from core.cache import get_response_cache
+from core.models import Blog, Post
+from core.views import all_blogs_validators, blog_validators
+
+
+class JSONFeed(feedgenerator.SyndicationFeed):
+    """
+    JSON Feed 1.1 (https://www.jsonfeed.org/version/1.1/) on top of Django's
+    feed generator interface.
+    """
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def write(self, outfile, encoding):
+        feed = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': self.feed['title'],
+            'home_page_url': self.feed['link'],
+            'feed_url': self.feed['feed_url'],
+            'description': self.feed['description'],
+            'items': [
+                {
+                    'id': item['unique_id'],
+                    'url': item['link'],
+                    'title': item['title'],
+                    'content_html': item['content'],
+                    'summary': item['description'],
+                    'date_published': item['pubdate'].isoformat(),
+                    'date_modified': item['updateddate'].isoformat(),
+                }
+                for item in self.items
+            ],
+        }
+        outfile.write(json.dumps(feed, ensure_ascii=False))
+
+
+class ContentRss201rev2Feed(feedgenerator.Rss201rev2Feed):
+    """
+    RSS with the rendered post body in `content:encoded`, `description`
+    carries the excerpt.
+    """
+    def rss_attributes(self):
+        return {**super().rss_attributes(), 'xmlns:content': 'http://purl.org/rss/1.0/modules/content/'}
+
+    def add_item_elements(self, handler, item):
+        super().add_item_elements(handler, item)
+        handler.addQuickElement('content:encoded', item['content'])
+
+
+class ContentAtom1Feed(feedgenerator.Atom1Feed):
+    def add_item_elements(self, handler, item):
+        super().add_item_elements(handler, item)
+        handler.addQuickElement('content', item['content'], {'type': 'html'})
+
+
+FEED_TYPES = {
+    'rss': ContentRss201rev2Feed,
+    'atom': ContentAtom1Feed,
+    'json': JSONFeed,
+}
+
+
+def build_feed(request, kind, blog=None):
+    """
+    Render the feed document of `blog`, or of all blogs, as `kind`.
+    """
+    posts = Post.objects.published().select_related('blog').defer('content').order_by('-created_at', '-pk')
+    if blog is not None:
+        posts = posts.filter(blog=blog)
+        title, description = blog.name, blog.description or ''
+        link = request.build_absolute_uri(reverse('blogs-detail', args=[blog.pk]))
+    else:
+        title, description = 'All blogs', 'Latest posts across all blogs.'
+        link = request.build_absolute_uri(reverse('blogs-list'))
+
+    feed = FEED_TYPES[kind](
+        title=title, link=link, description=description, feed_url=request.build_absolute_uri(), language='en',
+    )
+    for post in posts[:settings.FEED_SIZE]:
+        url = request.build_absolute_uri(reverse('blog-posts-detail', args=[post.blog_id, post.pk]))
+        feed.add_item(
+            title=post.title, link=url, unique_id=url, description=post.excerpt, content=post.content_html,
+            pubdate=post.created_at, updateddate=post.updated_at, categories=[post.blog.name],
+        )
+    return feed.writeString('utf-8'), feed.content_type
+
+
+def serve_feed(request, kind, validators, blog_pk=None):
+    if kind not in FEED_TYPES:
+        raise Http404('Unknown feed type.')
+    version, last_modified = validators
+    key = '|'.join(['feed', kind, str(blog_pk), str(version), request.get_host()])
+    etag = quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        cache = get_response_cache()
+        entry = cache.get('feed:' + etag)
+        if entry is None:
+            blog = get_object_or_404(Blog, pk=blog_pk) if blog_pk is not None else None
+            content, content_type = build_feed(request, kind, blog)
+            entry = {'content': content.encode(), 'content_type': content_type}
+            cache.set('feed:' + etag, entry)
+            cache_status = 'MISS'
+        else:
+            cache_status = 'HIT'
+        response = content_encoding.cached_response(cache, 'feed:' + etag, entry, request)
+        response.headers['X-Cache'] = cache_status
+    response.headers['ETag'] = etag
+    if timestamp is not None:
+        response.headers['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+@require_safe
+def site_feed(request, kind):
+    return serve_feed(request, kind, all_blogs_validators())
+
+
+@require_safe
+def blog_feed(request, blog_pk, kind):
+    validators = blog_validators(blog_pk)
+    if validators is None:
+        raise Http404('No Blog matches the given query.')
+    return serve_feed(request, kind, validators, blog_pk)
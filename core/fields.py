@@ -0,0 +1,35 @@
+from mdeditor.fields import MDTextField
+
+from core.compression import get_codec
+
+
+class CompressedTextField(MDTextField):
+    """
+    Markdown text stored as a compressed blob, see `core.compression`.
+    Values are plain `str` in Python, the column can only be filtered on
+    `isnull` since its bytes are not the text.
+    """
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def get_lookup(self, lookup_name):
+        if lookup_name != 'isnull':
+            return None
+        return super().get_lookup(lookup_name)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return get_codec().decompress(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return None
+        return get_codec().compress(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(value)
@@ -0,0 +1,177 @@
+"""
+Post-processing of images uploaded through the Markdown editor.
+
+Uploads are stored under a content hash, so identical files are kept once
+and every URL can be cached forever. Resized and WebP variants are produced
+by a background job, `responsive_images` then points rendered posts at them.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+# `<sha256 prefix>.<ext>` for originals, `<hash>-<width>w.<ext>` for variants.
+HASH_LENGTH = 20
+HASHED_NAME_RE = re.compile(rf'^(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?:-(?P<width>\d+)w)?\.(?P<ext>\w+)$')
+
+# Formats Pillow can resize without losing animation or vector data.
+RESIZABLE_FORMATS = {'jpg', 'jpeg', 'png', 'bmp', 'webp'}
+
+
+def image_folder():
+    return os.path.join(settings.MEDIA_ROOT, settings.MDEDITOR_CONFIGS['default']['image_folder'])
+
+
+def image_url(name):
+    return f"{settings.MEDIA_URL}{settings.MDEDITOR_CONFIGS['default']['image_folder']}/{name}"
+
+
+def store_upload(upload, extension):
+    """
+    Write `upload` under its content hash and return the file name. An
+    identical earlier upload is reused instead of written again.
+    """
+    folder = image_folder()
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=folder, delete=False) as temp:
+        for chunk in upload.chunks():
+            digest.update(chunk)
+            temp.write(chunk)
+
+    name = f'{digest.hexdigest()[:HASH_LENGTH]}.{extension.lower()}'
+    path = os.path.join(folder, name)
+    if os.path.exists(path):
+        os.remove(temp.name)
+    else:
+        os.replace(temp.name, path)
+    return name
+
+
+def variant_name(name, width, extension=None):
+    stem, ext = name.rsplit('.', 1)
+    return f'{stem}-{width}w.{extension or ext}'
+
+
+def webp_name(name):
+    return name.rsplit('.', 1)[0] + '.webp'
+
+
+def generate_variants(name):
+    """
+    Create downscaled copies for every configured width below the original
+    width, plus WebP versions of the original and each copy. Existing files
+    are kept, so running this twice is cheap.
+    """
+    folder = image_folder()
+    extension = name.rsplit('.', 1)[1].lower()
+    if extension not in RESIZABLE_FORMATS:
+        return []
+
+    created = []
+    with Image.open(os.path.join(folder, name)) as original:
+        image = ImageOps.exif_transpose(original)
+        targets = [(webp_name(name), None)]
+        for width in settings.IMAGE_VARIANT_WIDTHS:
+            if width < image.width:
+                targets.append((variant_name(name, width), width))
+                targets.append((variant_name(name, width, 'webp'), width))
+
+        for target, width in targets:
+            path = os.path.join(folder, target)
+            if os.path.exists(path):
+                continue
+            resized = image
+            if width is not None:
+                resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            save_image(resized, path, target.rsplit('.', 1)[1].lower())
+            created.append(target)
+    return created
+
+
+def save_image(image, path, extension):
+    if extension in ('jpg', 'jpeg') and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    options = {'quality': settings.IMAGE_QUALITY} if extension in ('jpg', 'jpeg', 'webp') else {'optimize': True}
+    # Write to a temporary name first so readers never see a partial file.
+    temp = f'{path}.tmp'
+    image.save(temp, format='JPEG' if extension == 'jpg' else extension.upper(), **options)
+    os.replace(temp, path)
+
+
+def available_variants(name):
+    """
+    Describe the variants of `name` found on disk as `(width, sizes, webp)`:
+    the original width, the widths of the downscaled copies and whether WebP
+    versions exist. Returns None when nothing has been generated yet.
+    """
+    folder = image_folder()
+    webp = os.path.exists(os.path.join(folder, webp_name(name)))
+    sizes = [
+        width for width in settings.IMAGE_VARIANT_WIDTHS
+        if os.path.exists(os.path.join(folder, variant_name(name, width)))
+    ]
+    if not (webp or sizes):
+        return None
+    # Only the header is read here, not the pixel data.
+    with Image.open(os.path.join(folder, name)) as image:
+        return image.width, sizes, webp
+
+
+def srcset(name, width, sizes, extension=None):
+    candidates = [(variant_name(name, size, extension), size) for size in sizes]
+    candidates.append((webp_name(name) if extension else name, width))
+    if not sizes:
+        return image_url(candidates[0][0])
+    return ', '.join(f'{image_url(candidate)} {size}w' for candidate, size in candidates)
+
+
+def referenced_images(content):
+    """
+    Names of the uploaded images `content` links to.
+    """
+    prefix = re.escape(image_url(''))
+    return {match['name'] for match in re.finditer(rf'{prefix}(?P<name>[0-9a-f]{{{HASH_LENGTH}}}\.\w+)', content or '')}
+
+
+def record_references(changes):
+    """
+    Keep `PostImage` in step with `(post, old_content)` pairs, `old_content`
+    is '' for new posts and None when unknown. Posts that embed the same
+    images as before cost no query.
+    """
+    from core.models import PostImage
+
+    stale, rows = [], []
+    for post, old_content in changes:
+        names = referenced_images(post.content)
+        old_names = referenced_images(old_content) if old_content is not None else None
+        if names == old_names:
+            continue
+        if old_names != set():
+            stale.append(post.pk)
+        rows.extend(PostImage(post=post, name=name) for name in names)
+    if stale:
+        PostImage.objects.filter(post__in=stale).delete()
+    if rows:
+        PostImage.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def process_upload(name):
+    """
+    Background part of an upload: build the variants, then re-render the
+    posts that already embed the image so they pick the variants up.
+    """
+    from core.models import Post
+
+    if not generate_variants(name):
+        return
+    for post in Post.objects.filter(images__name=name).iterator():
+        post.refresh_html(force=True)
+        # A new `updated_at` (and blog version) for clients and the response cache.
+        post.save(update_fields=['content_html', 'content_hash', 'updated_at'])
+
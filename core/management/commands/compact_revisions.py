@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core import revisions
+from core.models import PostRevision
+
+
+class Command(BaseCommand):
+    help = 'Squash old post revisions beyond the latest ones of each post into a single snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=settings.REVISION_KEEP, help='Revisions always kept per post.')
+        parser.add_argument(
+            '--older-than', type=int, default=settings.REVISION_COMPACT_AFTER_DAYS,
+            help='Only squash revisions older than this many days.',
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help='Posts compacted per transaction.')
+
+    def handle(self, *args, keep=None, older_than=None, batch_size=100, **options):
+        keep = settings.REVISION_KEEP if keep is None else keep
+        older_than = settings.REVISION_COMPACT_AFTER_DAYS if older_than is None else older_than
+        before = timezone.now() - timedelta(days=older_than)
+
+        post_pks = list(
+            PostRevision.objects.values('post').annotate(total=Count('pk')).filter(total__gt=max(keep, 1))
+            .order_by('post').values_list('post', flat=True)
+        )
+        removed = 0
+        for start in range(0, len(post_pks), batch_size):
+            with transaction.atomic():
+                for post_pk in post_pks[start:start + batch_size]:
+                    removed += revisions.compact(post_pk, keep, before)
+
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} revision(s) from {len(post_pks)} post(s) checked.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import EXPORTERS, export_blog
+from core.models import Blog
+
+
+class Command(BaseCommand):
+    help = 'Export every post of a blog, drafts included, as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('blog', type=int, help='Primary key of the blog.')
+        parser.add_argument('--type', dest='export_type', choices=sorted(EXPORTERS), default='ndjson')
+        parser.add_argument('--output', help='File to write to, defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, blog, export_type='ndjson', output=None, chunk_size=2000, **options):
+        if not Blog.objects.filter(pk=blog).exists():
+            raise CommandError(f'Blog {blog} does not exist.')
+
+        lines = export_blog(blog, export_type, chunk_size=chunk_size, include_drafts=True)
+        if output is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(output, 'w', newline='', encoding='utf-8') as file:
+            file.writelines(lines)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import publishing
+
+
+class Command(BaseCommand):
+    help = 'Publish scheduled posts whose publish_at is due.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Posts published per transaction.')
+
+    def handle(self, *args, batch_size=500, **options):
+        published = publishing.publish_due(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Published {published} scheduled post(s).'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size=500, **options):
+        indexed = search.rebuild_index(batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} post(s).'))
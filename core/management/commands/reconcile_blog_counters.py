@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from core.models import Blog, Post
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized post aggregates of every blog and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report blogs that drifted.')
+
+    def handle(self, *args, batch_size=500, dry_run=False, **options):
+        published = Q(posts__status=Post.PUBLISHED)
+        blogs = Blog.objects.only('pk', 'post_count', 'word_count', 'last_post_at', 'updated_at').annotate(
+            real_post_count=Count('posts', filter=published),
+            real_word_count=Sum('posts__word_count', filter=published),
+            real_last_post_at=Max('posts__created_at', filter=published),
+        ).order_by('pk')
+
+        drifted = 0
+        batch = []
+        for blog in blogs.iterator(chunk_size=batch_size):
+            real = (blog.real_post_count, blog.real_word_count or 0, blog.real_last_post_at)
+            if (blog.post_count, blog.word_count, blog.last_post_at) == real:
+                continue
+            drifted += 1
+            self.stdout.write(f'Blog {blog.pk}: {blog.post_count} posts, {blog.word_count} words -> {real[0]}, {real[1]}')
+            blog.post_count, blog.word_count, blog.last_post_at = real
+            blog.updated_at = timezone.now()
+            batch.append(blog)
+            if len(batch) == batch_size:
+                self.flush(batch, dry_run)
+                batch = []
+        self.flush(batch, dry_run)
+
+        self.stdout.write(self.style.SUCCESS(f'{drifted} blog(s) drifted.'))
+
+    def flush(self, batch, dry_run):
+        if not dry_run:
+            Blog.objects.bulk_update(batch, ['post_count', 'word_count', 'last_post_at', 'updated_at'])
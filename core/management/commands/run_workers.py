@@ -0,0 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tasks
+
+
+def worker(burst, poll_interval):
+    django.setup()
+    return tasks.work(burst=burst, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the queue in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None, help='Defaults to JOB_WORKERS.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--poll-interval', type=float, default=None, help='Seconds to sleep while idle.')
+
+    def handle(self, *args, processes=None, burst=False, poll_interval=None, **options):
+        processes = processes or settings.JOB_WORKERS
+        if processes == 1:
+            processed = tasks.work(burst=burst, poll_interval=poll_interval)
+        else:
+            # Children must open their own connections, never share the parent's.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(worker, burst, poll_interval) for _ in range(processes)]
+                processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} job(s).'))
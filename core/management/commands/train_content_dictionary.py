@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import compression
+from core.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Train a compression dictionary on the newest posts and store it under the next id in '
+        'CONTENT_DICTIONARY_DIR. New content uses it once every server has the file and restarts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=2000, help='Number of posts to train on.')
+        parser.add_argument('--size', type=int, default=compression.MAX_ZLIB_DICTIONARY, help='Dictionary size in bytes.')
+        parser.add_argument('--algorithm', choices=sorted(compression.ALGORITHMS))
+
+    def handle(self, *args, samples=2000, size=compression.MAX_ZLIB_DICTIONARY, algorithm=None, **options):
+        algorithm = algorithm or settings.CONTENT_COMPRESSION or 'zlib'
+        contents = list(Post.objects.order_by('-pk').values_list('content', flat=True)[:samples])
+        if not contents:
+            raise CommandError('There are no posts to train on.')
+
+        dictionary = compression.train_dictionary(contents, size=size, algorithm=algorithm)
+        dictionary_id = compression.write_dictionary(settings.CONTENT_DICTIONARY_DIR, dictionary)
+        compression.reset_codec()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote dictionary {dictionary_id} ({len(dictionary)} bytes) from {len(contents)} post(s).'
+        ))
@@ -0,0 +1,252 @@
+"""
+Per-request performance metrics.
+
+`InstrumentationMiddleware` opens a `RequestMetrics` for every request in a
+context variable. Database queries (through an execute wrapper installed on
+every connection) and serializers (`TimedSerializerMixin`) add their time
+to it, also from the threads async views run ORM calls in. When the request
+ends the totals go into the `Server-Timing` header, a structured log line
+and the in-process histograms served at `/metrics`.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+logger = logging.getLogger('core.metrics')
+slow_query_logger = logging.getLogger('core.metrics.slow_queries')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.slow_queries = 0
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def add_query(self, duration):
+        with self.lock:
+            self.queries += 1
+            self.query_time += duration
+
+    def add_timing(self, stage, duration):
+        with self.lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + duration
+
+
+class Histogram:
+    """
+    Cumulative Prometheus-style histogram, `counts[i]` observations were at
+    most `buckets[i]`.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class Registry:
+    """
+    Histograms and counters keyed by metric name and label values.
+    """
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def export(self, gauges=()):
+        """
+        The Prometheus text exposition format, `gauges` are extra
+        `(name, labels, value)` samples.
+        """
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        seen = set()
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {count}')
+            lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+            lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum}')
+            lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        for name, labels, value in gauges:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name}{format_labels(tuple(sorted(labels.items())))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+registry = Registry()
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """
+    Collect the metrics of the code run inside, yields the `RequestMetrics`.
+    """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(stage):
+    """
+    Add the time spent inside to `stage` of the current request, if any.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_timing(stage, time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper timing every query of an instrumented request, queries
+    slower than METRICS_SLOW_QUERY_MS are logged.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        metrics.add_query(duration)
+        if duration * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+            metrics.slow_queries += 1
+            slow_query_logger.warning(
+                json.dumps({
+                    'event': 'slow_query',
+                    'duration_ms': round(duration * 1000, 3),
+                    'database': context['connection'].alias,
+                    'sql': sql,
+                    'many': many,
+                })
+            )
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Wrappers survive reconnects, the signal fires on every one of them.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+def finish(request, response, metrics):
+    """
+    Record the request in the histograms and log, and add `Server-Timing`.
+    """
+    total = time.perf_counter() - metrics.start
+    labels = {'endpoint': endpoint_name(request), 'method': request.method}
+    size = len(response.content) if not response.streaming else None
+
+    registry.observe(
+        'http_request_duration_seconds', {**labels, 'status': str(response.status_code)}, total, LATENCY_BUCKETS
+    )
+    registry.observe('http_request_db_queries', labels, metrics.queries, QUERY_BUCKETS)
+    registry.observe('http_request_db_duration_seconds', labels, metrics.query_time, LATENCY_BUCKETS)
+    for stage, duration in metrics.timings.items():
+        registry.observe(f'http_request_{stage}_duration_seconds', labels, duration, LATENCY_BUCKETS)
+    if size is not None:
+        registry.observe('http_response_size_bytes', labels, size, SIZE_BUCKETS)
+    if metrics.slow_queries:
+        registry.increment('db_slow_queries_total', labels, metrics.slow_queries)
+
+    timings = [
+        f'total;dur={total * 1000:.3f}',
+        f'db;dur={metrics.query_time * 1000:.3f};desc="{metrics.queries} queries"',
+    ]
+    timings.extend(f'{stage};dur={duration * 1000:.3f}' for stage, duration in sorted(metrics.timings.items()))
+    response.headers['Server-Timing'] = ', '.join(timings)
+
+    if not logger.isEnabledFor(logging.INFO):
+        return response
+    logger.info(json.dumps({
+        'event': 'request',
+        **labels,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(total * 1000, 3),
+        'db_queries': metrics.queries,
+        'db_ms': round(metrics.query_time * 1000, 3),
+        **{f'{stage}_ms': round(duration * 1000, 3) for stage, duration in metrics.timings.items()},
+        'response_bytes': size,
+    }))
+    return response
@@ -0,0 +1,138 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from core import content_encoding, metrics
+from core.db_routers import pin_to_primary
+
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinningMiddleware:
+    """
+    Read-your-writes for replicated databases: a write request and the
+    requests that follow it within `DB_REPLICA_PIN_SECONDS` (tracked by a
+    cookie) read from the primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.should_pin(request):
+            return self.get_response(request)
+        with pin_to_primary():
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        if not self.should_pin(request):
+            return await self.get_response(request)
+        with pin_to_primary():
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def should_pin(self, request):
+        return bool(settings.DATABASE_REPLICAS) and (
+            request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        )
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DB_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Times every request with its database queries and serializers, see
+    `core.metrics`. First in `MIDDLEWARE` so that it covers the others.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        with metrics.collect() as collected:
+            response = self.get_response(request)
+        return metrics.finish(request, response, collected)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        with metrics.collect() as collected:
+            response = await self.get_response(request)
+        return metrics.finish(request, response, collected)
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli for API responses, see `core.content_encoding`. Responses
+    the response cache already compressed pass through unchanged.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        encoding = response.get('Content-Encoding')
+        if encoding is None:
+            encoding = self.compress(request, response)
+        if encoding in content_encoding.ENCODINGS:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            content_encoding.mark_encoded(response, encoding)
+        return response
+
+    def compress(self, request, response):
+        size = None if response.streaming else len(response.content)
+        if not content_encoding.is_compressible(response.get('Content-Type', ''), size):
+            return None
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = content_encoding.negotiate(request)
+        if encoding is None or (response.streaming and response.is_async):
+            return None
+
+        level = settings.RESPONSE_COMPRESSION_LEVELS[encoding]
+        if response.streaming:
+            response.streaming_content = content_encoding.compress_stream(response.streaming_content, encoding, level)
+            del response.headers['Content-Length']
+            return encoding
+        compressed = content_encoding.compress(response.content, encoding, level)
+        if len(compressed) >= size:
+            return None
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        return encoding
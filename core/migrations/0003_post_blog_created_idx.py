@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_post_content'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['blog', 'created_at', 'id'], name='core_post_blog_created_idx'),
+        ),
+    ]
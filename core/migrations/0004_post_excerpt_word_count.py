@@ -0,0 +1,39 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:02
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_summaries(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    batch = []
+    for post in Post.objects.only('content').iterator(chunk_size=500):
+        words = post.content.split()
+        post.word_count = len(words)
+        post.excerpt = Truncator(' '.join(words)).chars(200)
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt', 'word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_post_blog_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
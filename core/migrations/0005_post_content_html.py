@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_post_excerpt_word_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+FORWARD_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE core_post_fts USING fts5(title, content, tokenize='unicode61')",
+        'INSERT INTO core_post_fts (rowid, title, content) SELECT id, title, content FROM core_post',
+    ],
+    'postgresql': [
+        'CREATE TABLE core_post_search ('
+        'post_id bigint PRIMARY KEY REFERENCES core_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX core_post_search_document_idx ON core_post_search USING GIN (document)',
+        'INSERT INTO core_post_search (post_id, document) '
+        "SELECT id, setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B') "
+        'FROM core_post',
+    ],
+}
+
+REVERSE_SQL = {
+    'sqlite': ['DROP TABLE core_post_fts'],
+    'postgresql': ['DROP TABLE core_post_search'],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in FORWARD_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in REVERSE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_post_content_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:17
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def fill_aggregates(apps, schema_editor):
+    Blog = apps.get_model('core', 'Blog')
+    blogs = Blog.objects.annotate(
+        real_post_count=Count('posts'),
+        real_word_count=Sum('posts__word_count'),
+        real_last_post_at=Max('posts__created_at'),
+    )
+    batch = []
+    for blog in blogs.iterator(chunk_size=500):
+        blog.post_count = blog.real_post_count
+        blog.word_count = blog.real_word_count or 0
+        blog.last_post_at = blog.real_last_post_at
+        batch.append(blog)
+        if len(batch) == 500:
+            Blog.objects.bulk_update(batch, ['post_count', 'word_count', 'last_post_at'])
+            batch = []
+    Blog.objects.bulk_update(batch, ['post_count', 'word_count', 'last_post_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_blog_updated_at_version_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_apitoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.blog')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.post')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='core.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follows', to='core.blog')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follows', to='core.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['blog', 'profile'], name='core_follow_blog_profile_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('profile', 'blog'), name='core_follow_profile_blog_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['profile', 'created_at', 'post'], name='core_timeline_profile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['profile', 'blog'], name='core_timeline_profile_blog_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('profile', 'post'), name='core_timelineentry_profile_post_uniq'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('base', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('snapshot', 'Snapshot'), ('delta', 'Delta')], max_length=10)),
+                ('title', models.CharField(max_length=100)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='core.post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postrevision',
+            constraint=models.UniqueConstraint(fields=('post', 'number'), name='core_postrevision_post_number_uniq'),
+        ),
+    ]
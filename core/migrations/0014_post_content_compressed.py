@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:10
+
+import core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    First of three steps moving `Post.content` to compressed storage: a
+    nullable column, added without rewriting the table.
+    """
+
+    dependencies = [
+        ('core', '0013_postrevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_compressed',
+            field=core.fields.CompressedTextField(null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:10
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from core.compression import backfill
+
+
+# Posts edited while a pass runs are copied again by the next one.
+MAX_PASSES = 5
+
+
+def compress_contents(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    posts = Post.objects.all()
+    for _ in range(MAX_PASSES):
+        started = timezone.now()
+        if not backfill(posts, 'content', 'content_compressed'):
+            break
+        posts = Post.objects.filter(updated_at__gte=started)
+    # Posts edited by the old code from here on are copied again by 0016.
+    ContentBackfill = apps.get_model('core', 'ContentBackfill')
+    ContentBackfill.objects.create(last_pass_at=started)
+
+
+class Migration(migrations.Migration):
+    """
+    Second step: copy the content in short batches, outside of one long
+    transaction, while the old column keeps serving reads and writes.
+    """
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_post_content_compressed'),
+    ]
+
+    operations = [
+        # Bookkeeping between this migration and the next one, which drops it.
+        migrations.CreateModel(
+            name='ContentBackfill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_pass_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(compress_contents, migrations.RunPython.noop),
+    ]
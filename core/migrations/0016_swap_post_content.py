@@ -0,0 +1,64 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:10
+
+import core.fields
+import mdeditor.fields
+from django.db import migrations
+from django.db.models import Max, Q
+
+from core.compression import backfill
+
+
+def catch_up(apps, schema_editor):
+    # Posts created or edited by the old code since the last backfill pass
+    # started, however long ago 0015 ran.
+    Post = apps.get_model('core', 'Post')
+    ContentBackfill = apps.get_model('core', 'ContentBackfill')
+    since = ContentBackfill.objects.aggregate(last_pass_at=Max('last_pass_at'))['last_pass_at']
+    posts = Post.objects.all()
+    if since is not None:
+        posts = posts.filter(Q(content_compressed__isnull=True) | Q(updated_at__gte=since))
+    backfill(posts, 'content', 'content_compressed')
+
+
+def restore_contents(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    backfill(Post.objects.all(), 'content_compressed', 'content')
+
+
+class Migration(migrations.Migration):
+    """
+    Last step: drop the plain column and give the compressed one its name.
+    """
+
+    dependencies = [
+        ('core', '0015_compress_post_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(catch_up, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='ContentBackfill',
+        ),
+        # Nullable first so that unapplying can re-add the column and copy
+        # the content back before it is required again.
+        migrations.AlterField(
+            model_name='post',
+            name='content',
+            field=mdeditor.fields.MDTextField(null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_contents),
+        migrations.RemoveField(
+            model_name='post',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='post',
+            old_name='content_compressed',
+            new_name='content',
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='content',
+            field=core.fields.CompressedTextField(),
+        ),
+    ]
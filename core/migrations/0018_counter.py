@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:08
+
+from django.db import migrations, models
+
+
+def create_counters(apps, schema_editor):
+    # `Counter.bump` creates missing rows too, this saves the first bump two queries.
+    Counter = apps.get_model('core', 'Counter')
+    Counter.objects.create(name='blogs.deleted')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_post_status_publish_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='fan_out_since',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
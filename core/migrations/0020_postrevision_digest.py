@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_blog_fan_out_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postrevision',
+            name='digest',
+            field=models.BinaryField(blank=True, max_length=8, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.images import referenced_images
+
+
+def record_images(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    PostImage = apps.get_model('core', 'PostImage')
+    batch = []
+    for pk, content in Post.objects.values_list('pk', 'content').iterator(chunk_size=500):
+        batch.extend(PostImage(post_id=pk, name=name) for name in referenced_images(content))
+        if len(batch) >= 500:
+            PostImage.objects.bulk_create(batch)
+            batch = []
+    PostImage.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_postrevision_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='core.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name'], name='core_postimage_name_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postimage',
+            constraint=models.UniqueConstraint(fields=('post', 'name'), name='core_postimage_post_name_uniq'),
+        ),
+        migrations.RunPython(record_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_postimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='counter',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
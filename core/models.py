@@ -1,24 +1,241 @@
-from django.db import models
+import hashlib
+import secrets
+
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from django.utils.text import Truncator
 
-from mdeditor.fields import MDTextField
+from core.fields import CompressedTextField
+from core.rendering import content_hash, render_markdown
 
 class User(AbstractUser):
     pass
 
 
+EXCERPT_LENGTH = 200
+
+
 class Blog(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     owner = models.ForeignKey('UserProfile', blank=False, null=False, on_delete=models.CASCADE, related_name='blogs')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Bumped on every write to one of the blog's posts, see `core.signals`.
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # Aggregates over the blog's posts, kept up to date on every post write
+    # and repaired by `manage.py reconcile_blog_counters`.
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    last_post_at = models.DateTimeField(blank=True, null=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    # Decides between fan-out on write and on read, see `core.timeline`.
+    follower_count = models.PositiveIntegerField(default=0, editable=False)
+    # Last time the blog fell back under TIMELINE_FANOUT_LIMIT followers,
+    # older posts were never fanned out and are still merged on read.
+    fan_out_since = models.DateTimeField(blank=True, null=True, editable=False)
+
+    @classmethod
+    def record_post_changes(cls, pk, posts=0, words=0, created_at=None, recount_last=False):
+        """
+        Bump the version of blog `pk` and adjust its post aggregates in a
+        single UPDATE. `created_at` is the creation time of an added post,
+        `recount_last` looks `last_post_at` up again after posts left.
+        """
+        changes = {'version': F('version') + 1, 'updated_at': timezone.now()}
+        if posts:
+            changes['post_count'] = F('post_count') + posts
+        if words:
+            changes['word_count'] = F('word_count') + words
+        if recount_last:
+            changes['last_post_at'] = Subquery(
+                Post.objects.published().filter(blog=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+            )
+        elif created_at is not None:
+            changes['last_post_at'] = Greatest(Coalesce('last_post_at', Value(created_at)), Value(created_at))
+        cls.objects.filter(pk=pk).update(**changes)
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(status=Post.PUBLISHED)
 
 
 class Post(models.Model):
+    DRAFT = 'draft'
+    SCHEDULED = 'scheduled'
+    PUBLISHED = 'published'
+    STATUSES = [(DRAFT, 'Draft'), (SCHEDULED, 'Scheduled'), (PUBLISHED, 'Published')]
+
     title = models.CharField(max_length=100)
-    content = MDTextField()
+    content = CompressedTextField()
+    # Time the post went public, so a published draft lists as the newest
+    # post rather than at the time it was started, see `refresh_publication`.
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Only published posts are visible to anyone but the blog owner and count
+    # in the blog aggregates. Scheduled posts are published once `publish_at`
+    # is due by `manage.py publish_due_posts`.
+    status = models.CharField(max_length=10, choices=STATUSES, default=PUBLISHED)
+    publish_at = models.DateTimeField(blank=True, null=True)
     blog = models.ForeignKey(Blog, blank=False, null=False, on_delete=models.CASCADE, related_name='posts')
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    content_html = models.TextField(blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    # Stored fields computed from `content` on save.
+    DERIVED_FIELDS = ('excerpt', 'word_count', 'content_html', 'content_hash')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['blog', 'created_at', 'id'], name='core_post_blog_created_idx'),
+            # Public post listings of a blog.
+            models.Index(
+                fields=['blog', 'created_at', 'id'], condition=Q(status='published'), name='core_post_blog_published_idx'
+            ),
+            # Latest posts across all blogs, e.g. the site feed.
+            models.Index(fields=['created_at', 'id'], condition=Q(status='published'), name='core_post_published_idx'),
+            # Due scheduled posts, a range scan over only the scheduled rows.
+            models.Index(fields=['publish_at', 'id'], condition=Q(status='scheduled'), name='core_post_scheduled_idx'),
+        ]
+
+    objects = PostQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_saved_state()
+        return instance
+
+    def remember_saved_state(self):
+        """
+        Keep the blog and word count as stored, the blog aggregates are
+        adjusted by the difference on the next save. Title and content are
+        kept (by reference, not copied) for the revision diff.
+        """
+        deferred = self.get_deferred_fields()
+        self.saved_state = {
+            name: getattr(self, name)
+            for name in ('blog_id', 'word_count', 'title', 'content', 'status') if name not in deferred
+        }
+
+    @property
+    def was_published(self):
+        return getattr(self, 'saved_state', {}).get('status') == self.PUBLISHED
+
+    def blog_counts(self, saved=False):
+        """
+        `(posts, words)` the post adds to its blog's aggregates, as it is now
+        or, with `saved`, as it was stored.
+        """
+        if saved:
+            if not self.was_published:
+                return 0, 0
+            return 1, self.saved_state.get('word_count', self.word_count)
+        return (1, self.word_count) if self.status == self.PUBLISHED else (0, 0)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        published = self.refresh_publication()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS}
+        if update_fields is not None and published:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'created_at', 'publish_at'}
+        # The blog aggregates are updated by a post_save receiver, keep both
+        # writes in one transaction.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+        self.remember_saved_state()
+
+    def refresh_publication(self):
+        """
+        Date a post that goes public now. Returns True when it did.
+        """
+        if self.status != self.PUBLISHED or self.was_published:
+            return False
+        self.publish_at = timezone.now()
+        if not self._state.adding:
+            self.created_at = self.publish_at
+        return True
+
+    def refresh_derived_fields(self):
+        self.refresh_summary()
+        self.refresh_html()
+
+    def refresh_summary(self):
+        """
+        Recompute the stored excerpt and word count from `content`,
+        list views serve these instead of the full Markdown body.
+        """
+        if 'content' in self.get_deferred_fields():
+            return
+        words = self.content.split()
+        self.word_count = len(words)
+        self.excerpt = Truncator(' '.join(words)).chars(EXCERPT_LENGTH)
+
+    def refresh_html(self, force=False):
+        """
+        Render `content` to `content_html` unless the content hash shows the
+        stored HTML is already up to date. Returns True when it re-rendered.
+        """
+        if 'content' in self.get_deferred_fields():
+            return False
+        digest = content_hash(self.content)
+        if not force and digest == self.content_hash:
+            return False
+        self.content_html = render_markdown(self.content)
+        self.content_hash = digest
+        return True
+
+
+class PostRevision(models.Model):
+    """
+    One saved state of a post. Snapshots store the whole content, deltas the
+    difference to the previous revision, both zlib compressed, see
+    `core.revisions`. `base` is the number of the snapshot a delta chain
+    starts from, so any revision is rebuilt from a bounded run of rows.
+    """
+    SNAPSHOT = 'snapshot'
+    DELTA = 'delta'
+    KINDS = [(SNAPSHOT, 'Snapshot'), (DELTA, 'Delta')]
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()
+    base = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=KINDS)
+    title = models.CharField(max_length=100)
+    data = models.BinaryField()
+    # Short hash of the content, a delta is only stored on top of the content
+    # it was computed from. Null for revisions written before it existed.
+    digest = models.BinaryField(max_length=8, blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'number'], name='core_postrevision_post_number_uniq'),
+        ]
+
+
+class PostImage(models.Model):
+    """
+    An uploaded image a post's content embeds, so the posts to re-render
+    once its variants exist are found without scanning every post, see
+    `core.images.record_references`.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='images')
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'name'], name='core_postimage_post_name_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['name'], name='core_postimage_name_idx'),
+        ]
 
 
 class UserProfile(models.Model):
@@ -26,3 +243,135 @@ class UserProfile(models.Model):
     first_name = models.CharField(max_length=30)
     last_name = models.CharField(max_length=30)
     nickname = models.CharField(max_length=30)
+
+
+class Follow(models.Model):
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='follows')
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='follows')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'blog'], name='core_follow_profile_blog_uniq'),
+        ]
+        indexes = [
+            # Followers of a blog, for fan-out.
+            models.Index(fields=['blog', 'profile'], name='core_follow_blog_profile_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    A post in the materialized home timeline of a profile. `created_at` is a
+    copy of the post's, so a page of the timeline is one range scan of the
+    `(profile, created_at, post)` index.
+    """
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'post'], name='core_timelineentry_profile_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['profile', 'created_at', 'post'], name='core_timeline_profile_idx'),
+            # Entries of one followed blog, dropped on unfollow.
+            models.Index(fields=['profile', 'blog'], name='core_timeline_profile_blog_idx'),
+        ]
+
+
+class ApiToken(models.Model):
+    """
+    API token of a user profile. Only the SHA-256 of the key is stored, the
+    key itself is shown once when the token is created, see `core.authentication`.
+    """
+    READ = 'read'
+    WRITE = 'write'
+    SCOPES = [(READ, 'Read'), (WRITE, 'Write')]
+
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='tokens')
+    name = models.CharField(max_length=100)
+    # First characters of the key, to tell tokens apart.
+    prefix = models.CharField(max_length=8, editable=False)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    scopes = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def generate(cls, **kwargs):
+        """
+        Unsaved token with a new random key, returned as `(token, key)`.
+        """
+        key = secrets.token_urlsafe(32)
+        return cls(prefix=key[:8], key_hash=cls.hash_key(key), **kwargs), key
+
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
+
+    def __str__(self):
+        return f'{self.name} ({self.prefix}...)'
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by `manage.py run_workers`, see `core.tasks`.
+    Finished jobs are deleted, failed ones are kept for inspection.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    # Enqueueing a job whose key matches a pending job is a no-op.
+    idempotency_key = models.CharField(max_length=200, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='core_job_status_run_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['idempotency_key'], condition=models.Q(status='pending'), name='core_job_pending_key_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+
+class Counter(models.Model):
+    """
+    Named site-wide counters for events that leave no row behind to compare,
+    such as deleted blogs.
+    """
+    BLOGS_DELETED = 'blogs.deleted'
+
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def bump(cls, name):
+        changes = {'value': F('value') + 1, 'updated_at': timezone.now()}
+        if not cls.objects.filter(name=name).update(**changes):
+            cls.objects.bulk_create([cls(name=name)], ignore_conflicts=True)
+            cls.objects.filter(name=name).update(**changes)
+
+    def __str__(self):
+        return f'{self.name} = {self.value}'
@@ -0,0 +1,45 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class BlogCursorPagination(CursorPagination):
+    """
+    Keyset pagination over blogs, `pk` is unique so every page is a plain
+    indexed range scan.
+    """
+    ordering = 'pk'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class PostCursorPagination(CursorPagination):
+    """
+    Keyset pagination over posts of a single blog, newest first.
+    Backed by the `(blog, created_at, id)` index on `Post`.
+    """
+    ordering = ('-created_at', '-pk')
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class RevisionCursorPagination(CursorPagination):
+    """
+    Revisions of a single post, newest first, over the unique
+    `(post, number)` constraint.
+    """
+    ordering = '-number'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Search results are ordered by rank, which has no stable keyset, so they
+    are paged by number instead.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
@@ -1,17 +1,42 @@
 from rest_framework import permissions
 
+from core.models import ApiToken
+
 
 class IsBlogOwnerOrReadOnly(permissions.BasePermission):
     """
     Object-level permission to only allow owner of an blog to edit it.
     Assumes the model instance has an `blog` or 'owner attribute.
+    Views nested under a blog expose `get_blog()`, which is used to check
+    ownership of the parent blog before anything is created in it.
     """
+    def has_permission(self, request, view):
+        if request.method != 'POST' or not hasattr(view, 'get_blog'):
+            return True
+
+        return view.get_blog().owner.user_id == request.user.pk
+
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
 
         if hasattr(obj, 'owner'):
-            return obj.owner.user == request.user
-        
+            return obj.owner.user_id == request.user.pk
+
         if hasattr(obj, 'blog'):
-            return obj.blog.owner.user == request.user
+            return obj.blog.owner.user_id == request.user.pk
+
+
+class HasTokenScope(permissions.BasePermission):
+    """
+    Requests authenticated with an API token need its `read` scope for safe
+    methods and its `write` scope for anything else.
+    """
+    message = 'The API token does not have the required scope.'
+
+    def has_permission(self, request, view):
+        token = request.auth
+        if not isinstance(token, ApiToken):
+            return True
+        scope = ApiToken.READ if request.method in permissions.SAFE_METHODS else ApiToken.WRITE
+        return scope in token.scopes
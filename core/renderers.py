@@ -0,0 +1,33 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` that serializes with orjson when it is installed, with
+    the same output for compact, unicode JSON. Indented output, other
+    `COMPACT_JSON` / `UNICODE_JSON` settings and a missing orjson fall back
+    to the stdlib encoder.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or not api_settings.COMPACT_JSON or not api_settings.UNICODE_JSON
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Datetimes go through DRF's encoder for its exact format, like
+        # everything else orjson does not know (lazy strings, querysets, ...).
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # Same as JSONRenderer: keep U+2028 / U+2029 escaped for JavaScript.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
@@ -0,0 +1,153 @@
+import hashlib
+import html
+import re
+import xml.etree.ElementTree as etree
+from urllib.parse import urlsplit
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AMP_SUBSTITUTE
+
+from core import images
+
+
+# Bump whenever the output of `render_markdown` changes, every post whose
+# stored hash was computed with an older version gets re-rendered by
+# `manage.py render_posts`.
+RENDERER_VERSION = 3
+
+
+class ResponsiveImageProcessor(Treeprocessor):
+    """
+    Point images uploaded through the editor at their resized variants: add a
+    `srcset` and wrap them in a `<picture>` offering the WebP versions.
+    """
+    def run(self, root):
+        prefix = images.image_url('')
+        for parent in list(root.iter()):
+            for index, child in enumerate(list(parent)):
+                src = child.get('src', '') if child.tag == 'img' else ''
+                name = src[len(prefix):]
+                if not src.startswith(prefix) or not images.HASHED_NAME_RE.match(name):
+                    continue
+                variants = images.available_variants(name)
+                if variants is None:
+                    continue
+                width, sizes, webp = variants
+                child.set('loading', 'lazy')
+                if sizes:
+                    child.set('srcset', images.srcset(name, width, sizes))
+                    child.set('sizes', f'(max-width: {width}px) 100vw, {width}px')
+                if webp:
+                    picture = etree.Element('picture')
+                    source = etree.SubElement(picture, 'source', type='image/webp')
+                    source.set('srcset', images.srcset(name, width, sizes, 'webp'))
+                    if sizes:
+                        source.set('sizes', child.get('sizes'))
+                    picture.tail, child.tail = child.tail, None
+                    parent.remove(child)
+                    picture.append(child)
+                    parent.insert(index, picture)
+
+
+class ResponsiveImageExtension(Extension):
+    def extendMarkdown(self, md):
+        md.treeprocessors.register(ResponsiveImageProcessor(md), 'responsive_images', 5)
+
+
+# Elements and attributes the Markdown extensions produce. `content_html` is
+# served and syndicated as is, so nothing else survives rendering.
+ALLOWED_TAGS = {
+    'a': {'href', 'title', 'class', 'id'},
+    'abbr': {'title'},
+    'blockquote': set(), 'br': set(), 'dd': set(), 'dl': set(), 'dt': set(), 'em': set(), 'hr': set(),
+    'h1': {'id'}, 'h2': {'id'}, 'h3': {'id'}, 'h4': {'id'}, 'h5': {'id'}, 'h6': {'id'},
+    'code': {'class'},
+    'div': {'class'},
+    'img': {'src', 'alt', 'title', 'srcset', 'sizes', 'loading', 'width', 'height'},
+    'li': {'id'},
+    'ol': {'start'},
+    'p': set(), 'pre': set(), 'strong': set(), 'ul': set(),
+    'picture': set(),
+    'source': {'srcset', 'sizes', 'type'},
+    'sup': {'id'},
+    'table': set(), 'thead': set(), 'tbody': set(), 'tr': set(),
+    'th': {'style'}, 'td': {'style'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+# Browsers ignore these inside a scheme, `java\tscript:` is still javascript.
+IGNORED_URL_CHARS_RE = re.compile(r'[\x00-\x20\x7f]')
+ALLOWED_STYLE_RE = re.compile(r'^text-align: (left|right|center);$')
+
+
+def is_safe_url(url):
+    # Entities in attributes are written out as is and decoded by the browser.
+    url = IGNORED_URL_CHARS_RE.sub('', html.unescape(url.replace(AMP_SUBSTITUTE, '&')))
+    try:
+        return urlsplit(url).scheme.lower() in URL_SCHEMES
+    except ValueError:
+        return False
+
+
+def is_safe_attribute(name, value):
+    if name in URL_ATTRIBUTES:
+        return is_safe_url(value)
+    if name == 'srcset':
+        return all(is_safe_url(candidate.split()[0]) for candidate in value.split(',') if candidate.strip())
+    if name == 'style':
+        return ALLOWED_STYLE_RE.match(value) is not None
+    return True
+
+
+class SanitizeProcessor(Treeprocessor):
+    """
+    Drop every element and attribute outside ALLOWED_TAGS, and URLs with a
+    scheme other than URL_SCHEMES, whatever `attr_list` or another extension
+    put there.
+    """
+    def run(self, root):
+        for parent in list(root.iter()):
+            for child in list(parent):
+                allowed = ALLOWED_TAGS.get(child.tag)
+                if allowed is None:
+                    self.remove(parent, child)
+                    continue
+                for name, value in list(child.attrib.items()):
+                    if name not in allowed or not is_safe_attribute(name, value):
+                        del child.attrib[name]
+
+    def remove(self, parent, child):
+        # Keep the text following the element.
+        if child.tail:
+            index = list(parent).index(child)
+            if index:
+                previous = parent[index - 1]
+                previous.tail = (previous.tail or '') + child.tail
+            else:
+                parent.text = (parent.text or '') + child.tail
+        parent.remove(child)
+
+
+class SanitizeExtension(Extension):
+    """
+    Render raw HTML in the Markdown as text instead of passing it through.
+    """
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister('html_block')
+        md.inlinePatterns.deregister('html')
+        # After `attr_list` (8) and the responsive images (5).
+        md.treeprocessors.register(SanitizeProcessor(md), 'sanitize', 1)
+
+
+# SanitizeExtension goes last, it removes what the others registered.
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', ResponsiveImageExtension(), SanitizeExtension()]
+
+
+def content_hash(content):
+    return hashlib.sha256(f'{RENDERER_VERSION}:{content}'.encode()).hexdigest()
+
+
+def render_markdown(content):
+    return markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS, output_format='html')
@@ -0,0 +1,185 @@
+"""
+Delta-compressed post revision history.
+
+Every revision stores the title and either a full snapshot of the content
+or a line diff against the previous revision, zlib compressed. A snapshot is
+written every REVISION_SNAPSHOT_INTERVAL revisions, or earlier when the diff
+would not be much smaller, so rebuilding any revision applies at most
+REVISION_SNAPSHOT_INTERVAL - 1 diffs to one snapshot, fetched in one query.
+
+History starts with the first edit, which also stores the state the post
+was created with, so posts that are never edited cost nothing. A diff is
+only written against the content the previous revision holds, checked by
+its digest: a save that started from an older state, e.g. the loser of two
+concurrent edits, stores a snapshot instead. Revision numbers are taken
+from the newest stored revision, an edit that loses the race for a number
+reads it again and retries.
+"""
+import hashlib
+import json
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+
+from core.models import PostRevision
+
+
+# Tries at numbering the revisions of one batch of edits.
+RECORD_ATTEMPTS = 3
+
+
+def compress(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode(), 9)
+
+
+def decompress(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def make_delta(old, new):
+    """
+    Line diff turning `old` into `new`: `[start, end]` copies old lines,
+    a string inserts new text.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_delta(old, ops):
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+
+def digest(content):
+    return hashlib.blake2b(content.encode(), digest_size=8).digest()
+
+
+def build_revision(post, number, previous, old_content):
+    """
+    Unsaved revision `number` of `post`. `previous` is `(number, base, digest)`
+    of the revision before it, `old_content` the content the edit started from
+    when known.
+    """
+    snapshot = compress(post.content)
+    fields = {'post': post, 'number': number, 'title': post.title, 'digest': digest(post.content)}
+    if (
+        previous is None or old_content is None
+        or previous[2] is None or bytes(previous[2]) != digest(old_content)
+        or number - previous[1] >= settings.REVISION_SNAPSHOT_INTERVAL
+    ):
+        return PostRevision(base=number, kind=PostRevision.SNAPSHOT, data=snapshot, **fields)
+    delta = compress(make_delta(old_content, post.content))
+    # A diff of a rewrite is no smaller than the content, start a new chain.
+    if len(delta) * 2 > len(snapshot):
+        return PostRevision(base=number, kind=PostRevision.SNAPSHOT, data=snapshot, **fields)
+    return PostRevision(base=previous[1], kind=PostRevision.DELTA, data=delta, **fields)
+
+
+def latest_revisions(post_pks):
+    """
+    `{post pk: (number, base, digest)}` of the newest revision of each post, one query.
+    """
+    newest = PostRevision.objects.filter(post=OuterRef('post')).order_by('-number').values('number')[:1]
+    rows = PostRevision.objects.filter(post__in=post_pks, number=Subquery(newest)).values_list(
+        'post', 'number', 'base', 'digest'
+    )
+    return {post_pk: (number, base, value) for post_pk, number, base, value in rows}
+
+
+def record(changes):
+    """
+    Store a revision for every edit `(post, old_title, old_content)` in
+    `changes`. Posts without history first get a snapshot of the state the
+    edit started from.
+    """
+    for attempt in range(1, RECORD_ATTEMPTS + 1):
+        revisions = build_revisions(changes)
+        try:
+            with transaction.atomic():
+                PostRevision.objects.bulk_create(revisions)
+            return
+        except IntegrityError:
+            # A concurrent edit stored the same revision number first.
+            if attempt == RECORD_ATTEMPTS:
+                raise
+
+
+def build_revisions(changes):
+    latest = latest_revisions([post.pk for post, _, _ in changes])
+    revisions = []
+    for post, old_title, old_content in changes:
+        previous = latest.get(post.pk)
+        if previous is None and old_content is not None:
+            revisions.append(PostRevision(
+                post=post, number=1, base=1, kind=PostRevision.SNAPSHOT, title=old_title,
+                data=compress(old_content), digest=digest(old_content),
+            ))
+            previous = (1, 1, digest(old_content))
+        number = previous[0] + 1 if previous else 1
+        revisions.append(build_revision(post, number, previous, old_content))
+    return revisions
+
+
+def has_changed(post):
+    state = getattr(post, 'saved_state', {})
+    return any(
+        name not in state or getattr(post, name) != state[name]
+        for name in ('title', 'content') if name not in post.get_deferred_fields()
+    )
+
+
+def reconstruct(post_pk, number):
+    """
+    Title and content of revision `number`, or None if there is no such
+    revision. Fetches its snapshot and the deltas up to it in one query.
+    """
+    base = PostRevision.objects.filter(post=post_pk, number=number).values('base')
+    chain = list(
+        PostRevision.objects.filter(post=post_pk, number__lte=number, number__gte=Subquery(base)).order_by('number')
+    )
+    if not chain:
+        return None
+    content = decompress(chain[0].data)
+    for revision in chain[1:]:
+        content = apply_delta(content, decompress(revision.data))
+    return chain[-1].title, content
+
+
+def compact(post_pk, keep, before):
+    """
+    Squash the revisions of a post created before `before`, except the
+    latest `keep` (at least one), into the oldest revision that remains,
+    which becomes a snapshot. Returns the number of revisions removed.
+    """
+    numbers = PostRevision.objects.filter(post=post_pk).order_by('-number').values_list('number', 'created_at')
+    old = [number for number, created_at in numbers[max(keep, 1):] if created_at < before]
+    if not old:
+        return 0
+    first_kept = max(old) + 1
+
+    kind = PostRevision.objects.filter(post=post_pk, number=first_kept).values_list('kind', flat=True).get()
+    if kind == PostRevision.DELTA:
+        _, content = reconstruct(post_pk, first_kept)
+        next_snapshot = PostRevision.objects.filter(
+            post=post_pk, number__gt=first_kept, kind=PostRevision.SNAPSHOT
+        ).order_by('number').values_list('number', flat=True).first()
+        chain = PostRevision.objects.filter(post=post_pk, number__gte=first_kept)
+        if next_snapshot is not None:
+            chain = chain.filter(number__lt=next_snapshot)
+        chain.update(base=first_kept)
+        PostRevision.objects.filter(post=post_pk, number=first_kept).update(
+            kind=PostRevision.SNAPSHOT, data=compress(content)
+        )
+    deleted, _ = PostRevision.objects.filter(post=post_pk, number__lt=first_kept).delete()
+    return deleted
@@ -0,0 +1,213 @@
+"""
+Full-text search over post titles and content.
+
+SQLite keeps an FTS5 table and Postgres a `tsvector` table with a GIN index,
+both keyed by post id and kept in sync by the signals in `core.signals`.
+Other backends fall back to an `icontains` scan of titles and the text of
+the rendered HTML.
+"""
+from html import unescape
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+from core.models import Post
+
+
+SQLITE_TABLE = 'core_post_fts'
+POSTGRES_TABLE = 'core_post_search'
+HTML_SPECIAL_CHARACTERS = frozenset('&<>"\'')
+
+
+class SqliteBackend:
+
+    def index(self, posts):
+        rows = [(post.pk, post.title, post.content) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT OR REPLACE INTO {SQLITE_TABLE} (rowid, title, content) VALUES (%s, %s, %s)', rows)
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def remove_blog(self, blog_pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN (SELECT id FROM core_post WHERE blog_id = %s)', [blog_pk]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', [self.match(query)])
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset, limit):
+        # bm25() is lower for better matches, titles weigh ten times more than content.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s '
+                f'ORDER BY bm25({SQLITE_TABLE}, 10.0, 1.0), rowid LIMIT %s OFFSET %s',
+                [self.match(query), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def match(self, query):
+        # Quote every term so user input is never parsed as FTS5 query syntax.
+        return ' '.join('"%s"' % term.replace('"', '""') for term in query.split())
+
+
+class PostgresBackend:
+    config = 'english'
+
+    def index(self, posts):
+        rows = [(post.pk, post.title, post.content) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {POSTGRES_TABLE} (post_id, document) VALUES (%s, '
+                f"setweight(to_tsvector('{self.config}', %s), 'A') || setweight(to_tsvector('{self.config}', %s), 'B')) "
+                'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE post_id = ANY(%s)', [list(pks)])
+
+    def remove_blog(self, blog_pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {POSTGRES_TABLE} WHERE post_id IN (SELECT id FROM core_post WHERE blog_id = %s)', [blog_pk]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {POSTGRES_TABLE}')
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {POSTGRES_TABLE} WHERE document @@ websearch_to_tsquery('{self.config}', %s)",
+                [query],
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT post_id FROM {POSTGRES_TABLE}, websearch_to_tsquery('{self.config}', %s) AS query "
+                'WHERE document @@ query ORDER BY ts_rank(document, query) DESC, post_id LIMIT %s OFFSET %s',
+                [query, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class FallbackBackend:
+
+    def index(self, posts):
+        pass
+
+    def remove(self, pks):
+        pass
+
+    def remove_blog(self, blog_pk):
+        pass
+
+    def clear(self):
+        pass
+
+    def queryset(self, query):
+        # `content` is stored compressed, so candidates are narrowed down on
+        # the rendered HTML. Terms that would be entity-encoded there are left
+        # to `matches()`.
+        condition = Q()
+        for term in query.split():
+            if not HTML_SPECIAL_CHARACTERS.intersection(term):
+                condition &= Q(title__icontains=term) | Q(content_html__icontains=term)
+        return Post.objects.published().filter(condition).order_by('-created_at', '-pk')
+
+    def matches(self, query):
+        # Match the text of the HTML only, so tags and attributes never do.
+        terms = [term.lower() for term in query.split()]
+        pks = []
+        for pk, title, content_html in self.queryset(query).values_list('pk', 'title', 'content_html').iterator():
+            text = f'{title}\n{unescape(strip_tags(content_html))}'.lower()
+            if all(term in text for term in terms):
+                pks.append(pk)
+        return pks
+
+    def count(self, query):
+        return len(self.matches(query))
+
+    def search(self, query, offset, limit):
+        return self.matches(query)[offset:offset + limit]
+
+
+BACKENDS = {
+    'sqlite': SqliteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, FallbackBackend)()
+
+
+def index_posts(posts):
+    get_backend().index(posts)
+
+
+def remove_posts(pks):
+    get_backend().remove(pks)
+
+
+def remove_blog_posts(blog_pk):
+    get_backend().remove_blog(blog_pk)
+
+
+def rebuild_index(batch_size=500):
+    backend = get_backend()
+    backend.clear()
+    indexed = 0
+    batch = []
+    posts = Post.objects.published().only('pk', 'title', 'content').order_by('pk')
+    for post in posts.iterator(chunk_size=batch_size):
+        batch.append(post)
+        if len(batch) == batch_size:
+            backend.index(batch)
+            indexed += len(batch)
+            batch = []
+    backend.index(batch)
+    return indexed + len(batch)
+
+
+class SearchResults:
+    """
+    Lazily evaluated, ranked search results that Django's paginator can
+    count and slice, only the requested page of posts is ever loaded.
+    """
+    def __init__(self, query):
+        self.query = query
+        self.backend = get_backend()
+
+    def count(self):
+        if not self.query.split():
+            return 0
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        if not self.query.split() or index.stop is None or index.stop <= offset:
+            return []
+        pks = self.backend.search(self.query, offset, index.stop - offset)
+        posts = Post.objects.published().defer('content', 'content_html').in_bulk(pks)
+        return [posts[pk] for pk in pks if pk in posts]
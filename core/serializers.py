@@ -1,29 +1,153 @@
+from django.utils import timezone
 from rest_framework import serializers
 
-from core.models import Blog, Post, UserProfile
+from core import metrics
+from core.models import ApiToken, Blog, Post, PostRevision
 
 
-class BlogSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """
+    Field names asked for with the `?fields=a,b` sparse fieldset parameter,
+    `None` when the parameter is absent.
+    """
+    if request is None or not request.query_params.get('fields'):
+        return None
+    return {name.strip() for name in request.query_params['fields'].split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Leaves every field not listed in the `fields` query parameter out of the
+    output. Fields in `Meta.optional_fields` are only serialized when listed
+    there. Input is still validated against all fields, so `?fields` on a
+    write never drops submitted data.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is None:
+            fields = set(self.fields) - set(getattr(self.Meta, 'optional_fields', ()))
+        self.output_fields = fields
+
+    @property
+    def _readable_fields(self):
+        # Iterated by `to_representation` for every serialized instance.
+        for field in super()._readable_fields:
+            if field.field_name in self.output_fields:
+                yield field
+
+
+class TimedSerializerMixin:
+    """
+    Counts the time spent producing `data` as the request's `serializer`
+    stage in `core.metrics`.
+    """
+    @property
+    def data(self):
+        with metrics.timed('serializer'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class BlogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Blog
-        fields = ['pk', 'name', 'description', 'owner']
-        read_only_fields = ['pk', 'owner']
+        fields = ['pk', 'name', 'description', 'owner', 'post_count', 'last_post_at', 'word_count']
+        read_only_fields = ['pk', 'owner', 'post_count', 'last_post_at', 'word_count']
+        list_serializer_class = TimedListSerializer
+
+
+class PostBulkListSerializer(TimedListSerializer):
+    """
+    Validates every item on its own so that one invalid post does not reject
+    the whole batch. Validated data is a list of `(index, data)` pairs and the
+    rejected items are kept in `item_errors` by index.
+    """
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Expected a list of items.']})
+
+        self.item_errors = {}
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append((index, self.child.run_validation(item)))
+            except serializers.ValidationError as exc:
+                self.item_errors[index] = exc.detail
+        return validated
 
-    def create(self, validated_data):
-        user_profile = UserProfile.objects.filter(user=self.context['request'].user).first()
-        validated_data['owner'] = user_profile
 
-        return super().create(validated_data)
+class PostSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Post
+        fields = ['pk', 'title', 'content', 'content_html', 'created_at', 'blog', 'status', 'publish_at']
+        read_only_fields = ['pk', 'content_html', 'created_at', 'blog']
+        optional_fields = ['content_html']
+        list_serializer_class = PostBulkListSerializer
+
+    def validate(self, attrs):
+        # Bulk PATCH items have no instance here, the view checks each one
+        # against its post instead.
+        if self.instance is None and self.partial:
+            return attrs
+        return self.check_schedule(attrs, self.instance)
 
+    def check_schedule(self, attrs, post=None):
+        """
+        Check the status and `publish_at` that `post` (a new post if None)
+        ends up with. `publish_at` is only taken for scheduled posts, others
+        are dated when they go public.
+        """
+        if 'status' not in attrs and 'publish_at' not in attrs:
+            return attrs
+        status = attrs.get('status', getattr(post, 'status', Post.PUBLISHED))
+        if status != Post.SCHEDULED:
+            attrs.pop('publish_at', None)
+            return attrs
+        publish_at = attrs.get('publish_at', getattr(post, 'publish_at', None))
+        if publish_at is None:
+            raise serializers.ValidationError({'publish_at': ['Scheduled posts need a publication time.']})
+        if publish_at <= timezone.now():
+            raise serializers.ValidationError({'publish_at': ['Must be in the future.']})
+        return attrs
 
-class PostSerializer(serializers.ModelSerializer):
+
+class PostSummarySerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Post
-        fields = ['pk', 'title', 'content', 'created_at', 'blog']
-        read_only_fields = ['pk', 'created_at', 'blog']
+        fields = ['pk', 'title', 'excerpt', 'word_count', 'created_at', 'blog', 'status']
+        read_only_fields = fields
+        list_serializer_class = TimedListSerializer
+
+
+class PostRevisionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    size = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = PostRevision
+        fields = ['number', 'kind', 'title', 'created_at', 'size']
+        read_only_fields = fields
+        list_serializer_class = TimedListSerializer
+
+
+class ApiTokenSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    scopes = serializers.ListField(child=serializers.ChoiceField(choices=ApiToken.SCOPES), default=[ApiToken.READ])
+    # Only set in the response to the request that created the token.
+    key = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = ApiToken
+        fields = ['pk', 'name', 'prefix', 'scopes', 'created_at', 'expires_at', 'key']
+        read_only_fields = ['pk', 'prefix', 'created_at']
+        list_serializer_class = TimedListSerializer
 
-    def create(self, validated_data):
-        blog_id = self.context['blog']
-        blog = Blog.objects.get(pk=blog_id)
+    def validate_scopes(self, value):
+        return sorted(set(value))
 
-        return Post.objects.create(blog=blog, **validated_data)
+    def validate_expires_at(self, value):
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError('Must be in the future.')
+        return value
@@ -0,0 +1,102 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core import images, revisions, search, tasks, timeline
+from core.authentication import get_token_cache
+from core.models import ApiToken, Blog, Counter, Post
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not {'title', 'content', 'status'} & set(update_fields)):
+        return
+    # The job indexes published posts and removes the others.
+    tasks.enqueue('search.index_posts', [instance.pk], key=f'search.index_posts:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def record_revision(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # History starts with the first edit, see `core.revisions`.
+    if raw or created or (update_fields is not None and not {'title', 'content'} & set(update_fields)):
+        return
+    if not revisions.has_changed(instance):
+        return
+    saved_state = getattr(instance, 'saved_state', {})
+    revisions.record([(instance, saved_state.get('title'), saved_state.get('content'))])
+
+
+@receiver(post_save, sender=Post)
+def record_images(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and 'content' not in update_fields):
+        return
+    old_content = '' if created else getattr(instance, 'saved_state', {}).get('content')
+    images.record_references([(instance, old_content)])
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.was_published == (instance.status == Post.PUBLISHED):
+        return
+    if instance.status == Post.PUBLISHED:
+        tasks.enqueue('timeline.fan_out', [instance.pk])
+    else:
+        timeline.remove_posts([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, origin=None, **kwargs):
+    # Posts deleted along with their blog are removed in one statement
+    # by `unindex_blog_posts`.
+    if isinstance(origin, Blog) or not instance.was_published:
+        return
+    tasks.enqueue('search.remove_posts', [instance.pk])
+
+
+@receiver(pre_delete, sender=Blog)
+def unindex_blog_posts(sender, instance, **kwargs):
+    # Inline rather than queued, the statement finds the rows to remove
+    # through the posts, which are gone once the delete commits.
+    search.remove_blog_posts(instance.pk)
+
+
+@receiver(post_delete, sender=Blog)
+def count_deleted_blog(sender, instance, **kwargs):
+    # Changes the validators of the blog listing, see `all_blogs_validators`.
+    Counter.bump(Counter.BLOGS_DELETED)
+
+
+@receiver(post_save, sender=Post)
+def update_blog_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Any post write changes the blog's post listing: bump its version so
+    conditional requests and caches keyed on it are invalidated, and adjust
+    its post aggregates.
+    """
+    if raw:
+        return
+    old_blog_id = getattr(instance, 'saved_state', {}).get('blog_id', instance.blog_id) if not created else None
+    old_posts, old_words = instance.blog_counts(saved=True)
+    posts, words = instance.blog_counts()
+
+    # Only published posts count, a post going public or private moves in
+    # or out of the aggregates like a created or deleted one.
+    if old_blog_id is not None and old_blog_id != instance.blog_id:
+        Blog.record_post_changes(old_blog_id, posts=-old_posts, words=-old_words, recount_last=bool(old_posts))
+        old_posts = old_words = 0
+    Blog.record_post_changes(
+        instance.blog_id, posts=posts - old_posts, words=words - old_words,
+        created_at=instance.created_at if posts > old_posts else None, recount_last=old_posts > posts,
+    )
+
+
+@receiver(post_delete, sender=Post)
+def update_blog_on_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Blog):
+        return
+    posts, words = instance.blog_counts(saved=True)
+    Blog.record_post_changes(instance.blog_id, posts=-posts, words=-words, recount_last=bool(posts))
+
+
+@receiver(post_delete, sender=ApiToken)
+def forget_token(sender, instance, **kwargs):
+    get_token_cache().delete(instance.key_hash)
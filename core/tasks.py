@@ -0,0 +1,165 @@
+"""
+A small database-backed job queue for work that should not block requests.
+
+Functions registered with `@task` are run by `manage.py run_workers`,
+`enqueue` stores a `Job` row in the caller's transaction so a job only
+becomes visible once the data it refers to is committed. With
+`JOBS_EAGER` (the test suite) tasks run inline instead.
+"""
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import images, search, timeline
+from core.models import Job, Post
+
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name, max_attempts=None):
+    def register(function):
+        function.task_name = name
+        function.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        TASKS[name] = function
+        return function
+    return register
+
+
+def enqueue(name, *args, key=None, delay=None):
+    """
+    Queue task `name` with JSON serialisable `args`. A job with the same
+    `key` that has not started yet already covers this call, so it is
+    skipped, a single INSERT either way.
+    """
+    function = TASKS[name]
+    if settings.JOBS_EAGER:
+        function(*args)
+        return
+    run_at = timezone.now() + timedelta(seconds=delay or 0)
+    Job.objects.bulk_create(
+        [Job(name=name, args=list(args), idempotency_key=key, max_attempts=function.max_attempts, run_at=run_at)],
+        ignore_conflicts=key is not None,
+    )
+
+
+def backoff(attempts):
+    """
+    Seconds to wait before retrying a job that failed `attempts` times:
+    exponential with full jitter, capped at JOB_RETRY_BACKOFF_MAX.
+    """
+    ceiling = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def claim_job():
+    """
+    Take the next due job, or one whose worker died while running it, and
+    mark it running. The conditional UPDATE makes this safe with several
+    workers without relying on row locks.
+    """
+    now = timezone.now()
+    due = Q(status=Job.PENDING, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    )
+    while True:
+        job = Job.objects.filter(due).order_by('run_at', 'pk').first()
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status=Job.RUNNING, locked_at=now, attempts=job.attempts + 1
+        )
+        if claimed:
+            job.status, job.locked_at, job.attempts = Job.RUNNING, now, job.attempts + 1
+            return job
+
+
+def run_job(job):
+    """
+    Run a claimed job in its own transaction. Success deletes it, failure
+    schedules a retry with backoff until `max_attempts` is reached. A retry
+    is dropped when a pending job with the same key, queued meanwhile,
+    already covers it.
+    """
+    try:
+        with transaction.atomic():
+            TASKS[job.name](*job.args)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.error('Job %s failed after %d attempts', job, job.attempts)
+        else:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        job.locked_at = None
+        try:
+            with transaction.atomic():
+                job.save(update_fields=['status', 'run_at', 'locked_at', 'last_error'])
+        except IntegrityError:
+            logger.info('Job %s superseded by a pending job with key %s', job, job.idempotency_key)
+            job.delete()
+        return False
+    job.delete()
+    return True
+
+
+def work(burst=False, poll_interval=None):
+    """
+    Worker loop: run jobs until interrupted, or until the queue is empty
+    when `burst` is set. Returns the number of jobs processed.
+    """
+    poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    processed = 0
+    while True:
+        job = claim_job()
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        try:
+            run_job(job)
+        except Exception:
+            # The job is taken over again once its lock times out.
+            logger.exception('Could not record the outcome of job %s', job)
+        processed += 1
+
+
+@task('search.index_posts')
+def index_posts(pks):
+    # Only published posts are searchable, the others are dropped from the index.
+    posts = list(Post.objects.published().filter(pk__in=pks).only('pk', 'title', 'content'))
+    search.index_posts(posts)
+    hidden = set(pks) - {post.pk for post in posts}
+    if hidden:
+        search.remove_posts(sorted(hidden))
+
+
+@task('search.remove_posts')
+def remove_posts(pks):
+    search.remove_posts(pks)
+
+
+@task('images.process_upload')
+def process_upload(name):
+    images.process_upload(name)
+
+
+@task('timeline.fan_out')
+def fan_out(pks):
+    timeline.fan_out(pks)
+
+
+@task('timeline.backfill')
+def backfill(profile_pk, blog_pk):
+    timeline.backfill(profile_pk, blog_pk)
@@ -0,0 +1,24 @@
+import pytest
+
+from core.authentication import get_credential_cache, get_token_cache
+from core.cache import get_response_cache
+from core.throttling import get_counter
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    get_response_cache().clear()
+    yield
+    get_response_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def eager_jobs(settings):
+    settings.JOBS_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def clear_throttles():
+    get_counter().clear()
+    get_credential_cache().clear()
+    get_token_cache().clear()
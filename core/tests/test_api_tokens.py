@@ -0,0 +1,167 @@
+import base64
+from datetime import timedelta
+
+import pytest
+
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.models import ApiToken, Blog, User, UserProfile
+
+
+@pytest.fixture
+def profile(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    return baker.make(UserProfile, user=User.objects.create_user('aaa', password='secret'))
+
+
+@pytest.fixture
+def make_token(profile):
+    def make(scopes=(ApiToken.READ, ApiToken.WRITE), **kwargs):
+        token, key = ApiToken.generate(profile=profile, name='ci', scopes=list(scopes), **kwargs)
+        token.save()
+        return key
+    return make
+
+
+def token_client(key, keyword='Token'):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'{keyword} {key}')
+    return client
+
+
+@pytest.mark.django_db
+class TestApiTokenAuthentication:
+    def test_token_authenticates(self, profile, make_token):
+        response = token_client(make_token()).post('/api/blogs/', data={'name': 'aaa'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Blog.objects.get().owner == profile
+
+    def test_bearer_keyword(self, make_token):
+        response = token_client(make_token(), 'Bearer').post('/api/blogs/', data={'name': 'aaa'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_only_the_key_hash_is_stored(self, make_token):
+        key = make_token()
+
+        token = ApiToken.objects.get()
+        assert token.key_hash == ApiToken.hash_key(key)
+        assert token.prefix == key[:8]
+
+    def test_invalid_token_is_rejected(self, make_token):
+        make_token()
+
+        response = token_client('wrong').get('/api/blogs/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response['WWW-Authenticate'] == 'Token'
+
+    def test_expired_token_is_rejected(self, make_token):
+        key = make_token(expires_at=timezone.now() - timedelta(seconds=1))
+
+        assert token_client(key).get('/api/blogs/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_read_scope_cannot_write(self, make_token):
+        client = token_client(make_token(scopes=[ApiToken.READ]))
+
+        assert client.get('/api/blogs/').status_code == status.HTTP_200_OK
+        assert client.post('/api/blogs/', data={'name': 'aaa'}).status_code == status.HTTP_403_FORBIDDEN
+
+    def test_write_scope_cannot_read(self, make_token):
+        client = token_client(make_token(scopes=[ApiToken.WRITE]))
+
+        assert client.get('/api/search/?q=aaa').status_code == status.HTTP_403_FORBIDDEN
+
+    def test_cached_token_needs_no_queries(self, make_token, django_assert_num_queries):
+        client = token_client(make_token())
+        client.post('/api/blogs/', data={'name': 'aaa'})
+
+        # Only the INSERT, the token, profile and user all come from the cache.
+        with django_assert_num_queries(1):
+            response = client.post('/api/blogs/', data={'name': 'bbb'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_uncached_token_is_one_query(self, make_token, django_assert_num_queries, settings):
+        settings.TOKEN_AUTH_CACHE_TTL = 0
+        client = token_client(make_token())
+
+        with django_assert_num_queries(2):
+            client.post('/api/blogs/', data={'name': 'aaa'})
+
+    def test_deleted_token_is_forgotten(self, make_token):
+        client = token_client(make_token())
+        client.get('/api/blogs/')
+
+        ApiToken.objects.get().delete()
+
+        assert client.get('/api/blogs/').status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestApiTokenEndpoints:
+    def test_create_returns_key_once(self, profile):
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+
+        response = client.post('/api/tokens/', data={'name': 'ci', 'scopes': ['write', 'read']}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['scopes'] == ['read', 'write']
+        key = response.data['key']
+        assert token_client(key).get('/api/blogs/').status_code == status.HTTP_200_OK
+        assert 'key' not in client.get(f"/api/tokens/{response.data['pk']}/").data
+
+    def test_scopes_default_to_read(self, profile):
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+
+        response = client.post('/api/tokens/', data={'name': 'ci'}, format='json')
+
+        assert response.data['scopes'] == ['read']
+
+    def test_expiry_must_be_in_the_future(self, profile):
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+
+        response = client.post('/api/tokens/', data={'name': 'ci', 'expires_at': '2000-01-01T00:00:00Z'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_only_own_tokens_are_listed(self, profile, make_token):
+        make_token()
+        baker.make(ApiToken, key_hash='other', scopes=[])
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+
+        response = client.get('/api/tokens/')
+
+        assert [token['name'] for token in response.data] == ['ci']
+
+    def test_tokens_cannot_manage_tokens(self, make_token):
+        response = token_client(make_token()).post('/api/tokens/', data={'name': 'more'}, format='json')
+
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+        assert ApiToken.objects.count() == 1
+
+    def test_basic_auth_can_manage_tokens(self, profile):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'aaa:secret').decode())
+
+        response = client.post('/api/tokens/', data={'name': 'ci'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert ApiToken.objects.get().profile == profile
+
+    def test_delete_revokes(self, profile, make_token):
+        key = make_token()
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+
+        client.delete(f'/api/tokens/{ApiToken.objects.get().pk}/')
+
+        assert token_client(key).get('/api/blogs/').status_code == status.HTTP_401_UNAUTHORIZED
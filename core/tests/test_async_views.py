@@ -0,0 +1,178 @@
+import pytest
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from rest_framework import status
+from model_bakery import baker
+
+from core.async_views import encode_cursor
+from core.models import ApiToken, Blog, Post, UserProfile
+
+
+@pytest.mark.django_db
+class TestAsyncBlogViews:
+    def test_list_pages_through_blogs(self):
+        blogs = baker.make(Blog, _quantity=3)
+        client = Client()
+
+        first = client.get('/api/async/blogs/?page_size=2').json()
+        second = client.get(first['next']).json()
+
+        pks = [blog['pk'] for blog in first['results'] + second['results']]
+        assert pks == [blog.pk for blog in blogs]
+        assert second['next'] is None
+
+    def test_detail(self):
+        blog = baker.make(Blog, name='aaa')
+
+        response = Client().get(f'/api/async/blogs/{blog.pk}/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['name'] == 'aaa'
+
+    def test_detail_not_found_return_404(self):
+        response = Client().get('/api/async/blogs/0/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize('values', [['abc'], [{'a': 1}], [None]])
+    def test_cursor_with_invalid_pk_return_404(self, values):
+        baker.make(Blog)
+
+        response = Client().get(f'/api/async/blogs/?cursor={encode_cursor(values)}')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_writes_are_not_allowed(self):
+        response = Client().post('/api/async/blogs/', data={'name': 'aaa'})
+
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    def test_served_by_asgi_handler(self):
+        blog = baker.make(Blog, name='aaa')
+
+        response = async_to_sync(AsyncClient().get)(f'/api/async/blogs/{blog.pk}/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['name'] == 'aaa'
+
+
+@pytest.mark.django_db
+class TestAsyncPostViews:
+    def test_list_returns_summaries_newest_first(self):
+        blog = baker.make(Blog)
+        posts = baker.make(Post, blog=blog, content='aaa bbb', _quantity=3)
+        client = Client()
+
+        first = client.get(f'/api/async/blogs/{blog.pk}/posts/?page_size=2').json()
+        second = client.get(first['next']).json()
+
+        pks = [post['pk'] for post in first['results'] + second['results']]
+        assert pks == [post.pk for post in reversed(posts)]
+        assert 'content' not in first['results'][0]
+        assert first['results'][0]['word_count'] == 2
+
+    def test_posts_with_same_created_at_are_not_skipped(self):
+        blog = baker.make(Blog)
+        posts = baker.make(Post, blog=blog, content='aaa', _quantity=3)
+        Post.objects.filter(blog=blog).update(created_at=posts[0].created_at)
+        client = Client()
+
+        first = client.get(f'/api/async/blogs/{blog.pk}/posts/?page_size=2').json()
+        second = client.get(first['next']).json()
+
+        assert len({post['pk'] for post in first['results'] + second['results']}) == 3
+
+    def test_list_with_content_field(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa')
+
+        response = Client().get(f'/api/async/blogs/{blog.pk}/posts/?fields=pk,content')
+
+        assert response.json()['results'][0].keys() == {'pk', 'content'}
+
+    def test_list_of_missing_blog_return_404(self):
+        response = Client().get('/api/async/blogs/0/posts/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_invalid_cursor_return_404(self):
+        blog = baker.make(Blog)
+
+        response = Client().get(f'/api/async/blogs/{blog.pk}/posts/?cursor=zzz')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize('values', [['2024-01-01T00:00:00+00:00', 'abc'], ['2024-01-01T00:00:00+00:00', [1]]])
+    def test_cursor_with_invalid_pk_return_404(self, values):
+        blog = baker.make(Blog)
+
+        response = Client().get(f'/api/async/blogs/{blog.pk}/posts/?cursor={encode_cursor(values)}')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_detail_returns_content(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='aaa')
+
+        response = Client().get(f'/api/async/blogs/{blog.pk}/posts/{post.pk}/')
+
+        assert response.json()['content'] == 'aaa'
+
+    def test_detail_of_other_blog_return_404(self):
+        post = baker.make(Post, content='aaa')
+        other_blog = baker.make(Blog)
+
+        response = Client().get(f'/api/async/blogs/{other_blog.pk}/posts/{post.pk}/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestAsyncAccess:
+    def test_owner_sees_drafts(self):
+        profile = baker.make(UserProfile)
+        blog = baker.make(Blog, owner=profile)
+        baker.make(Post, blog=blog, title='public', content='aaa')
+        draft = baker.make(Post, blog=blog, title='draft', content='aaa', status=Post.DRAFT)
+        owner, stranger = Client(), Client()
+        owner.force_login(profile.user)
+        stranger.force_login(baker.make(UserProfile).user)
+
+        def titles(client):
+            return sorted(post['title'] for post in client.get(f'/api/async/blogs/{blog.pk}/posts/').json()['results'])
+
+        assert titles(owner) == ['draft', 'public']
+        assert owner.get(f'/api/async/blogs/{blog.pk}/posts/{draft.pk}/').json()['status'] == Post.DRAFT
+        for client in (stranger, Client()):
+            assert titles(client) == ['public']
+            response = client.get(f'/api/async/blogs/{blog.pk}/posts/{draft.pk}/')
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_invalid_token_return_401(self):
+        blog = baker.make(Blog)
+
+        response = Client().get(f'/api/async/blogs/{blog.pk}/', HTTP_AUTHORIZATION='Token wrong')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response['WWW-Authenticate'] == 'Token'
+
+    def test_token_without_read_scope_return_403(self):
+        blog = baker.make(Blog)
+        token, key = ApiToken.generate(profile=blog.owner, name='ci', scopes=[ApiToken.WRITE])
+        token.save()
+
+        response = Client().get(f'/api/async/blogs/{blog.pk}/posts/', HTTP_AUTHORIZATION=f'Token {key}')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert 'scope' in response.json()['detail']
+
+    def test_owner_is_recognised_by_asgi_handler(self):
+        profile = baker.make(UserProfile)
+        draft = baker.make(Post, blog=baker.make(Blog, owner=profile), content='aaa', status=Post.DRAFT)
+        client = AsyncClient()
+        client.force_login(profile.user)
+
+        response = async_to_sync(client.get)(f'/api/async/blogs/{draft.blog_id}/posts/{draft.pk}/')
+
+        assert response.status_code == status.HTTP_200_OK
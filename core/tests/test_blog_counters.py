@@ -0,0 +1,124 @@
+import io
+
+import pytest
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from model_bakery import baker
+
+from core.models import Blog, Post, UserProfile
+
+
+def reload(blog):
+    blog.refresh_from_db()
+    return blog
+
+
+@pytest.mark.django_db
+class TestBlogCounters:
+    def test_create_updates_counters(self):
+        blog = baker.make(Blog)
+
+        first = baker.make(Post, blog=blog, content='one two')
+        second = baker.make(Post, blog=blog, content='three')
+
+        blog = reload(blog)
+        assert blog.post_count == 2
+        assert blog.word_count == 3
+        assert blog.last_post_at == second.created_at
+        assert first.created_at < blog.last_post_at
+
+    def test_content_edit_adjusts_word_count(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='one two')
+
+        post = Post.objects.get(pk=post.pk)
+        post.content = 'one two three four'
+        post.save()
+
+        assert reload(blog).word_count == 4
+        assert reload(blog).post_count == 1
+
+    def test_delete_updates_counters(self):
+        blog = baker.make(Blog)
+        first = baker.make(Post, blog=blog, content='one')
+        second = baker.make(Post, blog=blog, content='two three')
+
+        Post.objects.get(pk=second.pk).delete()
+
+        blog = reload(blog)
+        assert blog.post_count == 1
+        assert blog.word_count == 1
+        assert blog.last_post_at == first.created_at
+
+    def test_deleting_last_post_clears_last_post_at(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='one')
+
+        post.delete()
+
+        assert reload(blog).last_post_at is None
+
+    def test_move_updates_both_blogs(self):
+        old_blog, new_blog = baker.make(Blog, _quantity=2)
+        post = baker.make(Post, blog=old_blog, content='one two')
+
+        post = Post.objects.get(pk=post.pk)
+        post.blog = new_blog
+        post.save()
+
+        assert (reload(old_blog).post_count, reload(old_blog).word_count) == (0, 0)
+        assert reload(old_blog).last_post_at is None
+        assert (reload(new_blog).post_count, reload(new_blog).word_count) == (1, 2)
+        assert reload(new_blog).last_post_at == post.created_at
+
+    def test_bulk_endpoint_updates_counters(self):
+        owner_profile = baker.make(UserProfile)
+        blog = baker.make(Blog, owner=owner_profile)
+        client = APIClient()
+        client.force_authenticate(user=owner_profile.user)
+        data = [{'title': 'a', 'content': 'one two'}, {'title': 'b', 'content': 'three'}]
+
+        client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data=data, format='json')
+        pk = Post.objects.filter(blog=blog).first().pk
+        client.patch(f'/api/blogs/{blog.pk}/posts/bulk/', data=[{'pk': pk, 'content': 'x'}], format='json')
+
+        blog = reload(blog)
+        assert blog.post_count == 2
+        assert blog.word_count == sum(Post.objects.filter(blog=blog).values_list('word_count', flat=True))
+        assert blog.word_count < 3
+        assert blog.last_post_at is not None
+
+    def test_serializer_exposes_counters(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='one two')
+
+        response = APIClient().get(f'/api/blogs/{blog.pk}/')
+
+        assert response.data['post_count'] == 1
+        assert response.data['word_count'] == 2
+        assert response.data['last_post_at'] is not None
+
+
+@pytest.mark.django_db
+class TestReconcileCommand:
+    def test_fixes_drift(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='one two')
+        Blog.objects.filter(pk=blog.pk).update(post_count=7, word_count=0, last_post_at=None)
+        out = io.StringIO()
+
+        call_command('reconcile_blog_counters', stdout=out)
+
+        blog = reload(blog)
+        assert (blog.post_count, blog.word_count, blog.last_post_at) == (1, 2, post.created_at)
+        assert '1 blog(s) drifted' in out.getvalue()
+
+    def test_dry_run_does_not_write(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='one two')
+        Blog.objects.filter(pk=blog.pk).update(post_count=7)
+
+        call_command('reconcile_blog_counters', '--dry-run', stdout=io.StringIO())
+
+        assert reload(blog).post_count == 7
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+
+import pytest
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.models import Blog, Post
+
+
+@pytest.mark.django_db
+class TestBlogExport:
+    def test_ndjson_export_streams_posts_oldest_first(self):
+        blog = baker.make(Blog)
+        posts = baker.make(Post, blog=blog, content='aaa', _quantity=3)
+        baker.make(Post, content='other blog')
+
+        response = APIClient().get(f'/api/blogs/{blog.pk}/export/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)['pk'] for line in lines] == [post.pk for post in posts]
+        assert json.loads(lines[0])['content'] == 'aaa'
+
+    def test_csv_export(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, title='a,b', content='line\nbreak')
+
+        response = APIClient().get(f'/api/blogs/{blog.pk}/export/?type=csv')
+
+        assert response['Content-Type'] == 'text/csv'
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert rows[0] == ['pk', 'title', 'content', 'created_at', 'updated_at', 'status']
+        assert rows[1][1:3] == ['a,b', 'line\nbreak']
+
+    def test_invalid_type_return_400(self):
+        blog = baker.make(Blog)
+
+        response = APIClient().get(f'/api/blogs/{blog.pk}/export/?type=xml')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_blog_not_found_return_404(self):
+        response = APIClient().get('/api/blogs/0/export/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestExportBlogCommand:
+    def test_writes_ndjson_to_stdout(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa', _quantity=2)
+        out = io.StringIO()
+
+        call_command('export_blog', blog.pk, stdout=out)
+
+        assert len(out.getvalue().splitlines()) == 2
+
+    def test_writes_csv_to_file(self, tmp_path):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa')
+        output = tmp_path / 'blog.csv'
+
+        call_command('export_blog', blog.pk, '--type', 'csv', '--output', str(output))
+
+        assert len(output.read_text().splitlines()) == 2
+
+    def test_missing_blog_raises(self):
+        with pytest.raises(CommandError):
+            call_command('export_blog', 0)
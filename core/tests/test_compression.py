@@ -0,0 +1,123 @@
+import pytest
+
+from django.core.exceptions import FieldError
+from django.core.management import call_command
+from django.db import connection
+from model_bakery import baker
+
+from core import compression
+from core.compression import Codec
+from core.models import Post
+
+
+TEXT = '# Title\n\n' + 'Some *markdown* paragraph about django and python. ' * 40
+
+
+@pytest.fixture
+def dictionary_dir(settings, tmp_path):
+    settings.CONTENT_DICTIONARY_DIR = str(tmp_path)
+    return tmp_path
+
+
+def stored_content(post):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT content FROM core_post WHERE id = %s', [post.pk])
+        return bytes(cursor.fetchone()[0])
+
+
+class TestCodec:
+    def test_round_trips(self):
+        codec = Codec(min_size=16)
+
+        data = codec.compress(TEXT)
+
+        assert data[0] == compression.ZLIB
+        assert len(data) < len(TEXT) / 5
+        assert codec.decompress(data) == TEXT
+
+    def test_short_values_are_stored_raw(self):
+        codec = Codec(min_size=256)
+
+        data = codec.compress('zażółć')
+
+        assert data == bytes([compression.RAW]) + 'zażółć'.encode()
+        assert codec.decompress(data) == 'zażółć'
+
+    def test_incompressible_values_are_stored_raw(self):
+        assert Codec(min_size=16).compress('abcdefghijklmnopqrstuvwxyz')[0] == compression.RAW
+
+    def test_disabled_compression_stores_raw(self):
+        assert Codec(algorithm=None, min_size=16).compress(TEXT)[0] == compression.RAW
+
+    def test_dictionary_shrinks_values_and_old_values_stay_readable(self, tmp_path):
+        plain = Codec(min_size=16, dictionary_dir=str(tmp_path))
+        old = plain.compress(TEXT)
+        compression.write_dictionary(str(tmp_path), compression.train_dictionary([TEXT, TEXT + 'more']))
+
+        codec = Codec(min_size=16, dictionary_dir=str(tmp_path))
+        new = codec.compress(TEXT)
+
+        assert compression.HEADER.unpack_from(new) == (compression.ZLIB, 1)
+        assert len(new) < len(old)
+        assert codec.decompress(new) == TEXT
+        assert codec.decompress(old) == TEXT
+
+    def test_missing_dictionary_is_an_error(self, tmp_path):
+        compression.write_dictionary(str(tmp_path), compression.train_dictionary([TEXT, TEXT]))
+        data = Codec(min_size=16, dictionary_dir=str(tmp_path)).compress(TEXT)
+
+        with pytest.raises(ValueError):
+            Codec(min_size=16).decompress(data)
+
+    def test_zstd_round_trips(self):
+        pytest.importorskip('zstandard')
+        codec = Codec(algorithm='zstd', min_size=16)
+
+        data = codec.compress(TEXT)
+
+        assert data[0] == compression.ZSTD
+        assert codec.decompress(data) == TEXT
+
+
+@pytest.mark.django_db
+class TestCompressedContent:
+    def test_content_is_stored_compressed(self, settings):
+        settings.CONTENT_COMPRESSION_MIN_SIZE = 16
+        post = baker.make(Post, content=TEXT)
+
+        assert len(stored_content(post)) < len(TEXT) / 5
+        assert Post.objects.get(pk=post.pk).content == TEXT
+        assert Post.objects.values_list('content', flat=True).get(pk=post.pk) == TEXT
+
+    def test_bulk_update_compresses(self, settings):
+        settings.CONTENT_COMPRESSION_MIN_SIZE = 16
+        post = baker.make(Post, content='aaa')
+        post.content = TEXT
+
+        Post.objects.bulk_update([post], ['content'])
+
+        assert stored_content(post)[0] == compression.ZLIB
+        assert Post.objects.get(pk=post.pk).content == TEXT
+
+    def test_text_lookups_are_rejected(self):
+        with pytest.raises(FieldError):
+            Post.objects.filter(content__contains='a').exists()
+
+    def test_backfill_copies_in_batches(self):
+        posts = baker.make(Post, content='aaa', _quantity=5)
+        Post.objects.update(excerpt='')
+
+        copied = compression.backfill(Post.objects.all(), 'title', 'excerpt', batch_size=2)
+
+        assert copied == 5
+        assert sorted(Post.objects.values_list('excerpt', flat=True)) == sorted(post.title for post in posts)
+
+    def test_train_command_writes_next_dictionary(self, dictionary_dir):
+        baker.make(Post, content=TEXT, _quantity=3)
+
+        call_command('train_content_dictionary', samples=10, size=1024)
+        call_command('train_content_dictionary', samples=10, size=1024)
+
+        assert sorted(path.name for path in dictionary_dir.iterdir()) == ['1.dict', '2.dict']
+        assert 0 < (dictionary_dir / '1.dict').stat().st_size <= 1024
+        assert compression.get_codec().dictionary_id == 2
@@ -0,0 +1,152 @@
+from datetime import timedelta
+
+import pytest
+
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.models import Blog, Counter, Post, UserProfile
+
+
+@pytest.mark.django_db
+class TestBlogConditionalGet:
+    def test_retrieve_sets_validators(self):
+        blog = baker.make(Blog)
+
+        response = APIClient().get(f'/api/blogs/{blog.pk}/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag']
+        assert response['Last-Modified']
+
+    def test_matching_etag_return_304(self):
+        blog = baker.make(Blog)
+        client = APIClient()
+        etag = client.get(f'/api/blogs/{blog.pk}/')['ETag']
+
+        response = client.get(f'/api/blogs/{blog.pk}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_blog_update_changes_etag(self):
+        owner_profile = baker.make(UserProfile)
+        blog = baker.make(Blog, owner=owner_profile)
+        client = APIClient()
+        client.force_authenticate(user=owner_profile.user)
+        etag = client.get(f'/api/blogs/{blog.pk}/')['ETag']
+
+        client.patch(f'/api/blogs/{blog.pk}/', data={'name': 'aaa'})
+        response = client.get(f'/api/blogs/{blog.pk}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_list_etag_changes_on_delete(self):
+        blogs = baker.make(Blog, _quantity=2)
+        client = APIClient()
+        etag = client.get('/api/blogs/')['ETag']
+
+        Blog.objects.filter(pk=blogs[0].pk).delete()
+        response = client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_list_last_modified_does_not_go_back_on_delete(self):
+        older, newest = baker.make(Blog, _quantity=2)
+        Blog.objects.filter(pk=older.pk).update(updated_at=timezone.now() - timedelta(minutes=2))
+        Blog.objects.filter(pk=newest.pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+        Counter.objects.update(updated_at=timezone.now() - timedelta(minutes=3))
+        client = APIClient()
+        last_modified = client.get('/api/blogs/')['Last-Modified']
+
+        newest.delete()
+        response = client.get('/api/blogs/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [blog['pk'] for blog in response.data['results']] == [older.pk]
+
+    def test_list_etag_changes_on_blog_update(self):
+        blog = baker.make(Blog, name='aaa')
+        client = APIClient()
+        etag = client.get('/api/blogs/')['ETag']
+
+        blog.name = 'bbb'
+        blog.save()
+        response = client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_list_etag_changes_on_post_write(self):
+        blog = baker.make(Blog)
+        client = APIClient()
+        etag = client.get('/api/blogs/')['ETag']
+
+        baker.make(Post, blog=blog, content='aaa')
+        response = client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_etag_depends_on_query_string(self):
+        baker.make(Blog, _quantity=2)
+        client = APIClient()
+        etag = client.get('/api/blogs/')['ETag']
+
+        response = client.get('/api/blogs/?page_size=1', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_not_found_return_404(self):
+        response = APIClient().get('/api/blogs/a/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestPostConditionalGet:
+    def test_list_not_modified_return_304(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa')
+        client = APIClient()
+        etag = client.get(f'/api/blogs/{blog.pk}/posts/')['ETag']
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    @pytest.mark.parametrize('write', ['create', 'update', 'delete'])
+    def test_post_write_bumps_blog_version(self, write):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='aaa')
+        client = APIClient()
+        etag = client.get(f'/api/blogs/{blog.pk}/posts/')['ETag']
+
+        if write == 'create':
+            baker.make(Post, blog=blog, content='bbb')
+        elif write == 'update':
+            post.save()
+        else:
+            post.delete()
+        response = client.get(f'/api/blogs/{blog.pk}/posts/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_retrieve_not_modified_since(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='aaa')
+        client = APIClient()
+        last_modified = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/')['Last-Modified']
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_retrieve_from_other_blog_return_404(self):
+        post = baker.make(Post, content='aaa')
+        other_blog = baker.make(Blog)
+
+        response = APIClient().get(f'/api/blogs/{other_blog.pk}/posts/{post.pk}/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
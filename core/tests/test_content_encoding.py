@@ -0,0 +1,143 @@
+import gzip
+import json
+
+import pytest
+
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import content_encoding
+from core.cache import LRUCache, entry_size
+from core.models import Blog, Post
+from core.renderers import FastJSONRenderer
+
+
+@pytest.fixture
+def blog_with_posts():
+    blog = baker.make(Blog)
+    baker.make(Post, blog=blog, title='markdown post', content='# Title\n\n' + 'some text ' * 200, _quantity=10)
+    return blog
+
+
+def request_with(accept_encoding):
+    return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+
+class TestNegotiation:
+    @pytest.mark.parametrize('header, expected', [
+        ('', None),
+        ('gzip', 'gzip'),
+        ('gzip;q=0', None),
+        ('deflate, gzip;q=0.5', 'gzip'),
+        ('*', 'gzip'),
+        ('*, gzip;q=0', None),
+        ('identity', None),
+    ])
+    def test_picks_accepted_encoding(self, header, expected, monkeypatch):
+        monkeypatch.setattr(content_encoding, 'brotli', None)
+
+        assert content_encoding.negotiate(request_with(header)) == expected
+
+    def test_prefers_brotli_when_available(self, monkeypatch):
+        monkeypatch.setattr(content_encoding, 'brotli', object())
+
+        assert content_encoding.negotiate(request_with('gzip, br')) == 'br'
+        assert content_encoding.negotiate(request_with('gzip, br;q=0.5')) == 'gzip'
+
+
+class TestCachedVariants:
+    def test_variant_is_compressed_once_and_stored(self, monkeypatch):
+        cache = LRUCache()
+        entry = {'content': b'{"a": 1}' * 500, 'content_type': 'application/json'}
+        calls = []
+        compress = content_encoding.compress
+        monkeypatch.setattr(content_encoding, 'compress', lambda *args: calls.append(args) or compress(*args))
+
+        body, encoding = content_encoding.cached_body(cache, 'key', entry, request_with('gzip'), stored=False)
+        again, _ = content_encoding.cached_body(cache, 'key', cache.get('key'), request_with('gzip'))
+
+        assert encoding == 'gzip'
+        assert gzip.decompress(body) == entry['content']
+        assert again == body
+        assert len(calls) == 1
+        assert entry_size(cache.get('key')) == len(entry['content']) + len(body)
+
+    def test_small_entries_are_not_compressed(self):
+        cache = LRUCache()
+        entry = {'content': b'{}', 'content_type': 'application/json'}
+
+        assert content_encoding.cached_body(cache, 'key', entry, request_with('gzip')) == (b'{}', None)
+
+
+@pytest.mark.django_db
+class TestCompressedResponses:
+    def test_json_list_is_gzipped(self, blog_with_posts):
+        response = APIClient().get(
+            f'/api/blogs/{blog_with_posts.pk}/posts/?fields=title,content', HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert response.headers['ETag'].startswith('W/"')
+        assert int(response.headers['Content-Length']) == len(response.content)
+        assert len(json.loads(gzip.decompress(response.content))['results']) == 10
+
+    def test_cache_hit_serves_stored_variant(self, blog_with_posts):
+        client = APIClient()
+        url = f'/api/blogs/{blog_with_posts.pk}/posts/?fields=title,content'
+        first = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        second = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        plain = client.get(url)
+
+        assert (first.headers['X-Cache'], second.headers['X-Cache']) == ('MISS', 'HIT')
+        assert second.headers['Content-Encoding'] == 'gzip'
+        assert second.content == first.content
+        assert 'Content-Encoding' not in plain.headers
+        assert json.loads(plain.content) == json.loads(gzip.decompress(second.content))
+
+    def test_weak_etag_still_matches(self, blog_with_posts):
+        client = APIClient()
+        url = f'/api/blogs/{blog_with_posts.pk}/posts/?fields=title,content'
+        etag = client.get(url, HTTP_ACCEPT_ENCODING='gzip').headers['ETag']
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_small_responses_are_not_compressed(self):
+        blog = baker.make(Blog)
+
+        response = APIClient().get(f'/api/blogs/{blog.pk}/', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_streamed_export_is_gzipped(self, blog_with_posts):
+        response = APIClient().get(f'/api/blogs/{blog_with_posts.pk}/export/', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        assert len(lines) == 10
+
+
+class TestFastJSONRenderer:
+    def test_matches_stdlib_renderer(self):
+        from datetime import datetime, timezone
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+
+        data = {
+            'date': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc), 'decimal': Decimal('1.5'),
+            1: 'line separator', 'lazy': gettext_lazy('text'), 'unicode': 'zażółć', 'tuple': (1, 2),
+        }
+
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_falls_back_to_stdlib(self):
+        rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+
+        assert rendered == b'{\n  "a": 1\n}'
@@ -0,0 +1,79 @@
+import pytest
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from core.db_routers import PrimaryReplicaRouter, is_pinned, pin_to_primary
+from core.middleware import PIN_COOKIE, PrimaryPinningMiddleware
+from core.models import Post
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica0', 'replica1']
+    return settings.DATABASE_REPLICAS
+
+
+class TestPrimaryReplicaRouter:
+    def test_reads_go_to_replicas(self, replicas):
+        router = PrimaryReplicaRouter()
+
+        assert {router.db_for_read(Post) for _ in range(50)} == set(replicas)
+
+    def test_writes_go_to_primary(self, replicas):
+        assert PrimaryReplicaRouter().db_for_write(Post) == 'default'
+
+    def test_pinned_reads_go_to_primary(self, replicas):
+        with pin_to_primary():
+            assert PrimaryReplicaRouter().db_for_read(Post) == 'default'
+
+        assert is_pinned() is False
+
+    def test_without_replicas_reads_go_to_primary(self, settings):
+        settings.DATABASE_REPLICAS = []
+
+        assert PrimaryReplicaRouter().db_for_read(Post) == 'default'
+
+    def test_only_primary_is_migrated(self):
+        router = PrimaryReplicaRouter()
+
+        assert router.allow_migrate('default', 'core')
+        assert not router.allow_migrate('replica0', 'core')
+
+
+def pinned_view(request):
+    return HttpResponse(str(is_pinned()))
+
+
+class TestPrimaryPinningMiddleware:
+    def test_write_is_pinned_and_sets_cookie(self, replicas):
+        middleware = PrimaryPinningMiddleware(pinned_view)
+
+        response = middleware(RequestFactory().post('/api/blogs/'))
+
+        assert response.content == b'True'
+        assert PIN_COOKIE in response.cookies
+
+    def test_read_after_write_is_pinned(self, replicas):
+        middleware = PrimaryPinningMiddleware(pinned_view)
+        request = RequestFactory().get('/api/blogs/')
+        request.COOKIES[PIN_COOKIE] = '1'
+
+        response = middleware(request)
+
+        assert response.content == b'True'
+        assert PIN_COOKIE not in response.cookies
+
+    def test_plain_read_is_not_pinned(self, replicas):
+        middleware = PrimaryPinningMiddleware(pinned_view)
+
+        response = middleware(RequestFactory().get('/api/blogs/'))
+
+        assert response.content == b'False'
+
+    def test_failed_write_does_not_set_cookie(self, replicas):
+        middleware = PrimaryPinningMiddleware(lambda request: HttpResponse(status=400))
+
+        response = middleware(RequestFactory().post('/api/blogs/'))
+
+        assert PIN_COOKIE not in response.cookies
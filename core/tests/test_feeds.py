@@ -0,0 +1,121 @@
+import json
+import xml.etree.ElementTree as etree
+
+import pytest
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.models import Blog, Post
+
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+@pytest.fixture
+def blog():
+    blog = baker.make(Blog, name='aaa')
+    baker.make(Post, blog=blog, title='first', content='# one')
+    baker.make(Post, blog=blog, title='second', content='*two*')
+    return blog
+
+
+@pytest.mark.django_db
+class TestFeeds:
+    def test_rss(self, blog):
+        response = APIClient().get(f'/api/blogs/{blog.pk}/feeds/rss/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('application/rss+xml')
+        channel = etree.fromstring(response.content).find('channel')
+        assert channel.findtext('title') == 'aaa'
+        assert [item.findtext('title') for item in channel.iter('item')] == ['second', 'first']
+        assert channel.find('item').findtext('{http://purl.org/rss/1.0/modules/content/}encoded') == '<p><em>two</em></p>'
+
+    def test_atom(self, blog):
+        response = APIClient().get(f'/api/blogs/{blog.pk}/feeds/atom/')
+
+        assert response['Content-Type'].startswith('application/atom+xml')
+        feed = etree.fromstring(response.content)
+        assert [entry.findtext(f'{ATOM}title') for entry in feed.iter(f'{ATOM}entry')] == ['second', 'first']
+
+    def test_json_feed(self, blog):
+        response = APIClient().get(f'/api/blogs/{blog.pk}/feeds/json/')
+
+        assert response['Content-Type'].startswith('application/feed+json')
+        feed = json.loads(response.content)
+        assert feed['version'] == 'https://jsonfeed.org/version/1.1'
+        item = feed['items'][0]
+        assert item['title'] == 'second'
+        assert item['content_html'] == '<p><em>two</em></p>'
+        assert item['url'].endswith(f'/api/blogs/{blog.pk}/posts/{blog.posts.get(title="second").pk}/')
+
+    def test_site_feed_spans_blogs(self, blog):
+        baker.make(Post, title='other', content='ccc')
+
+        feed = json.loads(APIClient().get('/api/feeds/json/').content)
+
+        assert [item['title'] for item in feed['items']] == ['other', 'second', 'first']
+
+    def test_feed_size_is_limited(self, blog, settings):
+        settings.FEED_SIZE = 1
+
+        feed = json.loads(APIClient().get(f'/api/blogs/{blog.pk}/feeds/json/').content)
+
+        assert len(feed['items']) == 1
+
+    def test_unknown_blog_or_type_is_404(self, blog):
+        assert APIClient().get('/api/blogs/0/feeds/rss/').status_code == status.HTTP_404_NOT_FOUND
+        assert APIClient().get(f'/api/blogs/{blog.pk}/feeds/xml/').status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestFeedCaching:
+    def test_unchanged_feed_is_served_from_cache(self, blog, django_assert_num_queries):
+        client = APIClient()
+        first = client.get(f'/api/blogs/{blog.pk}/feeds/rss/')
+
+        with django_assert_num_queries(1):
+            second = client.get(f'/api/blogs/{blog.pk}/feeds/rss/')
+
+        assert (first['X-Cache'], second['X-Cache']) == ('MISS', 'HIT')
+        assert first.content == second.content
+
+    def test_matching_etag_returns_304(self, blog, django_assert_num_queries):
+        client = APIClient()
+        etag = client.get(f'/api/blogs/{blog.pk}/feeds/atom/')['ETag']
+
+        with django_assert_num_queries(1):
+            response = client.get(f'/api/blogs/{blog.pk}/feeds/atom/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_modified_since_returns_304(self, blog):
+        client = APIClient()
+        last_modified = client.get(f'/api/blogs/{blog.pk}/feeds/rss/')['Last-Modified']
+
+        response = client.get(f'/api/blogs/{blog.pk}/feeds/rss/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_post_change_regenerates_only_that_blog(self, blog):
+        other = baker.make(Blog)
+        client = APIClient()
+        client.get(f'/api/blogs/{blog.pk}/feeds/rss/')
+        client.get(f'/api/blogs/{other.pk}/feeds/rss/')
+
+        baker.make(Post, blog=blog, title='third', content='ccc')
+
+        response = client.get(f'/api/blogs/{blog.pk}/feeds/rss/')
+        assert response['X-Cache'] == 'MISS'
+        assert b'third' in response.content
+        assert client.get(f'/api/blogs/{other.pk}/feeds/rss/')['X-Cache'] == 'HIT'
+
+    def test_post_change_regenerates_site_feed(self, blog):
+        client = APIClient()
+        client.get('/api/feeds/rss/')
+
+        Post.objects.filter(blog=blog).first().delete()
+
+        assert client.get('/api/feeds/rss/')['X-Cache'] == 'MISS'
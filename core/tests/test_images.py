@@ -0,0 +1,184 @@
+import io
+import os
+
+import pytest
+
+from django.test import Client, RequestFactory
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+from PIL import Image
+
+from core import images, tasks
+from core.models import Blog, Post, PostImage, UserProfile
+from core.views import serve_media
+
+
+def image_file(width=2000, height=1000, image_format='PNG', name='photo.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, format=image_format)
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_VARIANT_WIDTHS = [480, 960]
+    return tmp_path
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks, 'enqueue', lambda name, *args, **kwargs: calls.append((name, args)))
+    return calls
+
+
+def upload(client, file):
+    return client.post('/mdeditor/uploads/', {'editormd-image-file': file}).json()
+
+
+@pytest.mark.django_db
+class TestImageUpload:
+    def test_upload_stores_file_under_content_hash(self, media_root, scheduled):
+        result = upload(Client(), image_file())
+
+        assert result['success'] == 1
+        name = result['url'].rsplit('/', 1)[1]
+        assert images.HASHED_NAME_RE.match(name)
+        assert (media_root / 'editor' / name).exists()
+        assert scheduled == [('images.process_upload', (name,))]
+
+    def test_identical_uploads_are_deduplicated(self, media_root, scheduled):
+        first = upload(Client(), image_file(name='a.png'))
+        second = upload(Client(), image_file(name='b.png'))
+
+        assert first['url'] == second['url']
+        assert len(os.listdir(media_root / 'editor')) == 1
+
+    def test_unsupported_format_is_rejected(self, media_root, scheduled):
+        result = upload(Client(), image_file(name='photo.exe'))
+
+        assert result['success'] == 0
+        assert scheduled == []
+
+    def test_missing_file_is_rejected(self, media_root):
+        result = Client().post('/mdeditor/uploads/').json()
+
+        assert result['success'] == 0
+
+
+@pytest.mark.django_db
+class TestImageVariants:
+    def test_variants_are_generated_below_original_width(self, media_root, scheduled):
+        name = upload(Client(), image_file(width=800, height=400))['url'].rsplit('/', 1)[1]
+
+        created = images.generate_variants(name)
+
+        stem = name.rsplit('.', 1)[0]
+        assert sorted(created) == sorted([f'{stem}.webp', f'{stem}-480w.png', f'{stem}-480w.webp'])
+        with Image.open(media_root / 'editor' / f'{stem}-480w.png') as variant:
+            assert variant.size == (480, 240)
+        assert images.generate_variants(name) == []
+
+    def test_processing_rerenders_posts_using_the_image(self, media_root, scheduled):
+        url = upload(Client(), image_file())['url']
+        post = baker.make(Post, content=f'![photo]({url})')
+        other = baker.make(Post, content='no images')
+        assert 'srcset' not in post.content_html
+
+        images.process_upload(url.rsplit('/', 1)[1])
+
+        post.refresh_from_db()
+        stem = url.rsplit('.', 1)[0]
+        assert f'{stem}-480w.png 480w' in post.content_html
+        assert f'{url} 2000w' in post.content_html
+        assert f'<source sizes="(max-width: 2000px) 100vw, 2000px" srcset="{stem}-480w.webp 480w' in post.content_html
+        assert post.content_html.startswith('<p><picture>')
+        other.refresh_from_db()
+        assert other.content_html == '<p>no images</p>'
+
+    def test_retrieve_after_processing_returns_new_html(self, media_root, scheduled):
+        url = upload(Client(), image_file())['url']
+        post = baker.make(Post, content=f'![photo]({url})')
+        client = APIClient()
+        detail_url = f'/api/blogs/{post.blog_id}/posts/{post.pk}/?fields=content_html'
+        etag = client.get(detail_url)['ETag']
+
+        images.process_upload(url.rsplit('/', 1)[1])
+
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'srcset' in response.data['content_html']
+
+    def test_foreign_images_are_left_alone(self, media_root):
+        post = baker.make(Post, content='![photo](https://example.com/photo.png)')
+
+        assert post.content_html == '<p><img alt="photo" src="https://example.com/photo.png"></p>'
+
+
+@pytest.mark.django_db
+class TestImageReferences:
+    def referenced(self, post):
+        return set(PostImage.objects.filter(post=post).values_list('name', flat=True))
+
+    def test_saves_record_embedded_images(self):
+        first, second = (images.image_url(f'{digit * images.HASH_LENGTH}.png') for digit in '12')
+        post = baker.make(Post, content=f'![a]({first}) ![b](https://example.com/{"3" * images.HASH_LENGTH}.png)')
+        assert self.referenced(post) == {f'{"1" * images.HASH_LENGTH}.png'}
+
+        post.content = f'![b]({second})'
+        post.save()
+        assert self.referenced(post) == {f'{"2" * images.HASH_LENGTH}.png'}
+
+        post.content = 'no images'
+        post.save()
+        assert self.referenced(post) == set()
+
+    def test_bulk_writes_record_embedded_images(self):
+        profile = baker.make(UserProfile)
+        blog = baker.make(Blog, owner=profile)
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+        url = f'/api/blogs/{blog.pk}/posts/bulk/'
+        name = f'{"1" * images.HASH_LENGTH}.png'
+
+        client.post(url, [{'title': 'a', 'content': f'![a]({images.image_url(name)})'}], format='json')
+        post = Post.objects.get()
+        assert self.referenced(post) == {name}
+
+        client.patch(url, [{'pk': post.pk, 'content': 'no images'}], format='json')
+        assert self.referenced(post) == set()
+
+    def test_processing_skips_posts_that_dropped_the_image(self, media_root, scheduled):
+        url = upload(Client(), image_file())['url']
+        post = baker.make(Post, content=f'![photo]({url})')
+        post.content = 'no images'
+        post.save()
+
+        images.process_upload(url.rsplit('/', 1)[1])
+
+        post.refresh_from_db()
+        assert post.content_html == '<p>no images</p>'
+
+
+@pytest.mark.django_db
+class TestServeMedia:
+    def test_hashed_files_are_immutable(self, media_root, scheduled):
+        url = upload(Client(), image_file())['url']
+
+        path = url.removeprefix('/media/')
+        response = serve_media(RequestFactory().get(url), path)
+
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    def test_other_files_are_not_marked_immutable(self, media_root):
+        (media_root / 'notes.txt').write_text('aaa')
+
+        response = serve_media(RequestFactory().get('/media/notes.txt'), 'notes.txt')
+
+        assert response.status_code == 200
+        assert 'Cache-Control' not in response.headers
@@ -0,0 +1,152 @@
+import json
+import logging
+
+import pytest
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import metrics
+from core.models import Blog, Post
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.registry.clear()
+
+
+def server_timing(response):
+    entries = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        entries[name] = dict(param.split('=', 1) for param in params)
+    return entries
+
+
+@pytest.mark.django_db
+class TestInstrumentation:
+    def test_server_timing_header(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa', _quantity=2)
+
+        response = APIClient().get(f'/api/blogs/{blog.pk}/posts/')
+
+        timing = server_timing(response)
+        assert set(timing) == {'total', 'db', 'serializer'}
+        assert timing['db']['desc'] == '"2 queries"'
+        assert float(timing['total']['dur']) >= float(timing['db']['dur'])
+
+    def test_async_views_count_queries(self):
+        blog = baker.make(Blog)
+
+        response = async_to_sync(AsyncClient().get)(f'/api/async/blogs/{blog.pk}/')
+
+        assert server_timing(response)['db']['desc'] == '"1 queries"'
+
+    def test_request_is_logged(self, caplog):
+        blog = baker.make(Blog)
+
+        with caplog.at_level(logging.INFO, logger='core.metrics'):
+            response = APIClient().get(f'/api/blogs/{blog.pk}/')
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['endpoint'] == 'blogs-detail'
+        assert record['status'] == 200
+        assert record['db_queries'] == 2
+        assert record['response_bytes'] == len(response.content)
+
+    def test_requests_are_not_logged_by_default(self, caplog):
+        APIClient().get('/api/blogs/')
+
+        assert not [record for record in caplog.records if record.name == 'core.metrics']
+
+    def test_slow_queries_are_logged(self, caplog, settings):
+        settings.METRICS_SLOW_QUERY_MS = 0
+
+        with caplog.at_level(logging.WARNING, logger='core.metrics.slow_queries'):
+            APIClient().get('/api/blogs/')
+
+        record = json.loads(caplog.records[0].getMessage())
+        assert record['event'] == 'slow_query'
+        assert 'core_blog' in record['sql']
+
+    def test_disabled(self, settings):
+        settings.METRICS_ENABLED = False
+
+        assert 'Server-Timing' not in APIClient().get('/api/blogs/')
+
+
+@pytest.fixture
+def scraper(settings):
+    settings.METRICS_TOKEN = 'secret'
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+    return client
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def test_histograms_are_exported(self, scraper):
+        client = APIClient()
+        client.get('/api/blogs/')
+        client.get('/api/blogs/')
+
+        response = scraper.get('/metrics')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        lines = response.content.decode().splitlines()
+        assert '# TYPE http_request_duration_seconds histogram' in lines
+        labels = 'endpoint="blogs-list",method="GET",status="200"'
+        assert f'http_request_duration_seconds_count{{{labels}}} 2' in lines
+        assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+        assert 'http_request_db_queries_bucket{endpoint="blogs-list",method="GET",le="0"} 0' in lines
+        assert any(line.startswith('http_request_serializer_duration_seconds_sum') for line in lines)
+        assert any(line.startswith('response_cache_misses ') for line in lines)
+
+    def test_slow_queries_are_counted(self, settings, scraper):
+        settings.METRICS_SLOW_QUERY_MS = 0
+        APIClient().get('/api/blogs/')
+
+        lines = scraper.get('/metrics').content.decode().splitlines()
+
+        assert 'db_slow_queries_total{endpoint="blogs-list",method="GET"} 2' in lines
+
+    def test_staff_users_are_allowed(self):
+        client = APIClient()
+        client.force_login(baker.make('core.User', is_staff=True))
+
+        assert client.get('/metrics').status_code == status.HTTP_200_OK
+
+    @pytest.mark.parametrize('authorization', [None, 'Bearer wrong', 'Basic secret'])
+    def test_others_are_refused_even_from_loopback(self, settings, authorization):
+        settings.METRICS_TOKEN = 'secret'
+        client = APIClient()
+        if authorization:
+            client.credentials(HTTP_AUTHORIZATION=authorization)
+
+        response = client.get('/metrics', REMOTE_ADDR='127.0.0.1')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_refused_without_configured_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ')
+
+        assert client.get('/metrics').status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((1, 5))
+        for value in (0.5, 3, 10):
+            histogram.observe(value)
+
+        assert histogram.counts == [1, 2]
+        assert (histogram.count, histogram.sum) == (3, 13.5)
+
+    def test_label_values_are_escaped(self):
+        assert metrics.format_labels((('path', 'a"b\\c'),)) == '{path="a\\"b\\\\c"}'
@@ -0,0 +1,67 @@
+import pytest
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.models import Blog, Post
+from core.pagination import PostCursorPagination
+
+
+@pytest.mark.django_db
+class TestPostPagination:
+    def test_first_page_returns_cursor_envelope(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa', _quantity=3)
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/?page_size=2')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 2
+        assert response.data['next'] is not None
+        assert response.data['previous'] is None
+
+    def test_following_next_cursor_returns_remaining_posts_newest_first(self):
+        blog = baker.make(Blog)
+        posts = baker.make(Post, blog=blog, content='aaa', _quantity=3)
+        client = APIClient()
+
+        first = client.get(f'/api/blogs/{blog.pk}/posts/?page_size=2')
+        second = client.get(first.data['next'])
+
+        pks = [p['pk'] for p in first.data['results'] + second.data['results']]
+        assert pks == [post.pk for post in reversed(posts)]
+        assert second.data['next'] is None
+
+    def test_page_size_is_capped(self, monkeypatch):
+        monkeypatch.setattr(PostCursorPagination, 'max_page_size', 2)
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa', _quantity=3)
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/?page_size=100000')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 2
+
+    def test_invalid_cursor_return_404(self):
+        blog = baker.make(Blog)
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/?cursor=zzz')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestBlogPagination:
+    def test_blogs_are_paginated(self):
+        baker.make(Blog, _quantity=3)
+        client = APIClient()
+
+        first = client.get('/api/blogs/?page_size=2')
+        second = client.get(first.data['next'])
+
+        assert len(first.data['results']) == 2
+        assert len(second.data['results']) == 1
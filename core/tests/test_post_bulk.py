@@ -0,0 +1,170 @@
+import json
+
+import pytest
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import search
+from core.models import Blog, Post, UserProfile
+
+
+@pytest.fixture
+def owner_client():
+    owner_profile = baker.make(UserProfile)
+    blog = baker.make(Blog, owner=owner_profile)
+    client = APIClient()
+    client.force_authenticate(user=owner_profile.user)
+    return client, blog
+
+
+@pytest.mark.django_db
+class TestBulkCreate:
+    def test_if_anonymous_return_401(self):
+        blog = baker.make(Blog)
+
+        response = APIClient().post(f'/api/blogs/{blog.pk}/posts/bulk/', data=[], format='json')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_not_owner_return_403(self):
+        blog = baker.make(Blog)
+        client = APIClient()
+        client.force_authenticate(user=baker.make(UserProfile).user)
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data=[{'title': 'a', 'content': 'b'}], format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not Post.objects.exists()
+
+    def test_if_not_a_list_return_400(self, owner_client):
+        client, blog = owner_client
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data={'title': 'a'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_valid_items_return_201(self, owner_client):
+        client, blog = owner_client
+        data = [{'title': f'title {i}', 'content': '# python'} for i in range(3)]
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data=data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [r['index'] for r in response.data['results']] == [0, 1, 2]
+        assert Post.objects.filter(blog=blog).count() == 3
+        post = Post.objects.get(pk=response.data['results'][0]['pk'])
+        assert post.content_html == '<h1>python</h1>'
+        assert post.word_count == 2
+        assert search.SearchResults('python').count() == 3
+
+    def test_invalid_items_are_reported_per_item(self, owner_client):
+        client, blog = owner_client
+        data = [{'title': 'aaa', 'content': 'bbb'}, {'title': 'aaa'}]
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data=data, format='json')
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        created, rejected = response.data['results']
+        assert created['status'] == status.HTTP_201_CREATED
+        assert rejected['status'] == status.HTTP_400_BAD_REQUEST
+        assert 'content' in rejected['errors']
+        assert Post.objects.count() == 1
+
+    def test_items_are_written_in_chunks(self, owner_client, settings):
+        settings.API_BULK_CHUNK_SIZE = 2
+        client, blog = owner_client
+        data = [{'title': 'aaa', 'content': 'bbb'}] * 5
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data=data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Post.objects.count() == 5
+
+    def test_too_many_items_return_400(self, owner_client, settings):
+        settings.API_MAX_BULK_SIZE = 1
+        client, blog = owner_client
+        data = [{'title': 'aaa', 'content': 'bbb'}] * 2
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data=data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_ndjson_body(self, owner_client):
+        client, blog = owner_client
+        body = '\n'.join(json.dumps({'title': 'aaa', 'content': 'bbb'}) for _ in range(2)) + '\n'
+
+        response = client.post(
+            f'/api/blogs/{blog.pk}/posts/bulk/', data=body, content_type='application/x-ndjson'
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Post.objects.count() == 2
+
+    def test_invalid_ndjson_return_400(self, owner_client):
+        client, blog = owner_client
+
+        response = client.post(
+            f'/api/blogs/{blog.pk}/posts/bulk/', data='{"title": \n', content_type='application/x-ndjson'
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_bumps_blog_version(self, owner_client):
+        client, blog = owner_client
+
+        client.post(f'/api/blogs/{blog.pk}/posts/bulk/', data=[{'title': 'a', 'content': 'b'}], format='json')
+
+        blog.refresh_from_db()
+        assert blog.version == 1
+
+
+@pytest.mark.django_db
+class TestBulkUpdate:
+    def test_updates_posts_by_pk(self, owner_client):
+        client, blog = owner_client
+        posts = baker.make(Post, blog=blog, title='aaa', content='aaa', _quantity=2)
+        data = [{'pk': posts[0].pk, 'title': 'bbb'}, {'pk': posts[1].pk, 'content': '*ccc*'}]
+
+        response = client.patch(f'/api/blogs/{blog.pk}/posts/bulk/', data=data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        posts[0].refresh_from_db()
+        posts[1].refresh_from_db()
+        assert posts[0].title == 'bbb'
+        assert posts[0].content == 'aaa'
+        assert posts[1].content_html == '<p><em>ccc</em></p>'
+
+    def test_repeated_post_return_400_items(self, owner_client):
+        client, blog = owner_client
+        posts = baker.make(Post, blog=blog, title='aaa', content='aaa', _quantity=2)
+        data = [
+            {'pk': posts[0].pk, 'content': 'aaa bbb'},
+            {'pk': posts[1].pk, 'title': 'bbb'},
+            {'pk': posts[0].pk, 'content': 'aaa bbb ccc'},
+        ]
+
+        response = client.patch(f'/api/blogs/{blog.pk}/posts/bulk/', data=data, format='json')
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert [result['status'] for result in response.data['results']] == [
+            status.HTTP_400_BAD_REQUEST, status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST
+        ]
+        posts[0].refresh_from_db()
+        assert posts[0].content == 'aaa'
+        blog.refresh_from_db()
+        assert (blog.post_count, blog.word_count) == (2, 2)
+
+    def test_post_of_other_blog_return_404_item(self, owner_client):
+        client, blog = owner_client
+        other_post = baker.make(Post, title='aaa', content='aaa')
+
+        response = client.patch(
+            f'/api/blogs/{blog.pk}/posts/bulk/', data=[{'pk': other_post.pk, 'title': 'bbb'}], format='json'
+        )
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert response.data['results'][0]['status'] == status.HTTP_404_NOT_FOUND
+        other_post.refresh_from_db()
+        assert other_post.title == 'aaa'
@@ -30,6 +30,28 @@ class TestPostCreate:
 
         assert response.status_code == status.HTTP_403_FORBIDDEN
 
+    def test_if_other_users_blog_return_403(self):
+        owner_profile = baker.make(UserProfile)
+        user_profile = baker.make(UserProfile)
+        blog = baker.make(Blog, owner=owner_profile)
+        data={'title': 'aaa', 'content': 'bbb'}
+        client = APIClient()
+        client.force_authenticate(user=user_profile.user)
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/', data=data)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not Post.objects.exists()
+
+    def test_if_blog_not_found_return_404(self):
+        owner_profile = baker.make(UserProfile)
+        client = APIClient()
+        client.force_authenticate(user=owner_profile.user)
+
+        response = client.post('/api/blogs/0/posts/', data={'title': 'aaa', 'content': 'bbb'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
     def test_if_authenticated_bad_request_return_400(self):
         owner_profile = baker.make(UserProfile)
         blog = baker.make(Blog, owner=owner_profile)
@@ -0,0 +1,121 @@
+import pytest
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import rendering
+from core.models import Blog, Post
+
+
+@pytest.mark.django_db
+class TestPostRendering:
+    def test_save_renders_html(self):
+        post = baker.make(Post, content='# aaa')
+
+        assert post.content_html == '<h1>aaa</h1>'
+        assert post.content_hash == rendering.content_hash('# aaa')
+
+    def test_unchanged_content_is_not_rendered_again(self, monkeypatch):
+        post = baker.make(Post, content='# aaa')
+        monkeypatch.setattr('core.models.render_markdown', lambda content: pytest.fail('re-rendered'))
+
+        post.title = 'bbb'
+        post.save()
+
+    def test_changed_content_is_rendered(self):
+        post = baker.make(Post, content='# aaa')
+
+        post.content = '*bbb*'
+        post.save()
+
+        post.refresh_from_db()
+        assert post.content_html == '<p><em>bbb</em></p>'
+
+    def test_render_posts_command_renders_stale_posts(self):
+        post = baker.make(Post, content='# aaa')
+        Post.objects.filter(pk=post.pk).update(content_html='', content_hash='')
+
+        call_command('render_posts')
+
+        post.refresh_from_db()
+        assert post.content_html == '<h1>aaa</h1>'
+
+    def test_render_posts_command_after_renderer_change(self, monkeypatch):
+        post = baker.make(Post, content='# aaa')
+        monkeypatch.setattr(rendering, 'RENDERER_VERSION', rendering.RENDERER_VERSION + 1)
+
+        call_command('render_posts')
+
+        post.refresh_from_db()
+        assert post.content_hash == rendering.content_hash('# aaa')
+
+    def test_retrieve_after_render_posts_returns_new_html(self, monkeypatch):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='# aaa')
+        client = APIClient()
+        url = f'/api/blogs/{blog.pk}/posts/{post.pk}/?fields=content_html'
+        etag = client.get(url)['ETag']
+        list_etag = client.get(f'/api/blogs/{blog.pk}/posts/?fields=content_html')['ETag']
+        monkeypatch.setattr(rendering, 'RENDERER_VERSION', rendering.RENDERER_VERSION + 1)
+        monkeypatch.setattr('core.models.render_markdown', lambda content: '<p>new</p>')
+
+        call_command('render_posts')
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['content_html'] == '<p>new</p>'
+        response = client.get(f'/api/blogs/{blog.pk}/posts/?fields=content_html', HTTP_IF_NONE_MATCH=list_etag)
+        assert response.data['results'][0]['content_html'] == '<p>new</p>'
+
+
+
+class TestSanitizing:
+    @pytest.mark.parametrize('content, html', [
+        ('<script>alert(1)</script>', '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>'),
+        ('a <img src=x onerror=alert(1)>', '<p>a &lt;img src=x onerror=alert(1)&gt;</p>'),
+        ('[a](javascript:alert(1))', '<p><a>a</a></p>'),
+        ('[a](&#106;avascript:alert(1))', '<p><a>a</a></p>'),
+        ('[a](http://example.com){: onclick="alert(1)" }', '<p><a href="http://example.com">a</a></p>'),
+        ('![a](data:text/html,x)', '<p><img alt="a"></p>'),
+    ])
+    def test_unsafe_markup_is_removed(self, content, html):
+        assert rendering.render_markdown(content) == html
+
+    def test_markdown_output_is_kept(self):
+        html = rendering.render_markdown('|a|\n|:-|\n|1|\n\nx[^1] <me@example.com>\n\n[^1]: note')
+
+        assert '<th style="text-align: left;">a</th>' in html
+        assert '<sup id="fnref:1"><a class="footnote-ref" href="#fn:1">1</a></sup>' in html
+        assert '<a href="&#109;&#97;&#105;' in html
+
+
+@pytest.mark.django_db
+class TestPostHtmlField:
+    def test_retrieve_omits_html_by_default(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='# aaa')
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/')
+
+        assert 'content_html' not in response.data
+
+    def test_retrieve_returns_html_when_requested(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, content='# aaa')
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/?fields=title,content_html')
+
+        assert response.data == {'title': post.title, 'content_html': '<h1>aaa</h1>'}
+
+    def test_list_returns_html_when_requested(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='# aaa')
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/?fields=content_html')
+
+        assert response.data['results'] == [{'content_html': '<h1>aaa</h1>'}]
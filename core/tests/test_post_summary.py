@@ -0,0 +1,80 @@
+import pytest
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.models import Blog, Post, UserProfile
+
+
+@pytest.mark.django_db
+class TestPostSummaryFields:
+    def test_save_stores_excerpt_and_word_count(self):
+        post = baker.make(Post, content='one  two\nthree')
+
+        assert post.word_count == 3
+        assert post.excerpt == 'one two three'
+
+    def test_excerpt_is_truncated(self):
+        post = baker.make(Post, content='word ' * 1000)
+
+        assert len(post.excerpt) <= 200
+        assert post.excerpt.endswith('…')
+
+
+@pytest.mark.django_db
+class TestPostList:
+    def test_list_returns_summary_without_content(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, title='aaa', content='bbb ccc')
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        assert response.status_code == status.HTTP_200_OK
+        item = response.data['results'][0]
+        assert 'content' not in item
+        assert item['title'] == 'aaa'
+        assert item['excerpt'] == 'bbb ccc'
+        assert item['word_count'] == 2
+
+    def test_list_with_content_in_fields_returns_content(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, title='aaa', content='bbb')
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/?fields=pk,content')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0].keys() == {'pk', 'content'}
+        assert response.data['results'][0]['content'] == 'bbb'
+
+    def test_list_with_fields_restricts_summary(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, title='aaa', content='bbb')
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/?fields=title')
+
+        assert response.data['results'][0] == {'title': 'aaa'}
+
+    def test_retrieve_returns_content(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, title='aaa', content='bbb')
+        client = APIClient()
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/')
+
+        assert response.data['content'] == 'bbb'
+
+    def test_fields_only_restricts_output_of_writes(self):
+        profile = baker.make(UserProfile)
+        blog = baker.make(Blog, owner=profile)
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+
+        response = client.post(f'/api/blogs/{blog.pk}/posts/?fields=title', data={'title': 'aaa', 'content': 'bbb'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data == {'title': 'aaa'}
+        assert Post.objects.get().content == 'bbb'
@@ -0,0 +1,244 @@
+import json
+from datetime import timedelta
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import publishing
+from core.models import Blog, Follow, Post, TimelineEntry, UserProfile
+
+
+@pytest.fixture
+def owner_client():
+    profile = baker.make(UserProfile)
+    blog = baker.make(Blog, owner=profile)
+    client = APIClient()
+    client.force_authenticate(user=profile.user)
+    return client, blog
+
+
+def titles(response):
+    return [post['title'] for post in response.data['results']]
+
+
+def search_titles(query):
+    return [item['title'] for item in APIClient().get('/api/search/', data={'q': query}).data['results']]
+
+
+def schedule(blog, title, publish_at, **kwargs):
+    return baker.make(Post, blog=blog, title=title, content='aaa bbb', status=Post.SCHEDULED, publish_at=publish_at, **kwargs)
+
+
+@pytest.mark.django_db
+class TestVisibility:
+    def test_drafts_are_hidden_from_others(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, title='public', content='aaa')
+        draft = baker.make(Post, blog=blog, title='draft', content='aaa', status=Post.DRAFT)
+        stranger = APIClient()
+        stranger.force_authenticate(user=baker.make(UserProfile).user)
+
+        for client in (APIClient(), stranger):
+            assert titles(client.get(f'/api/blogs/{blog.pk}/posts/')) == ['public']
+            response = client.get(f'/api/blogs/{blog.pk}/posts/{draft.pk}/')
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_owner_sees_drafts(self, owner_client):
+        client, blog = owner_client
+        baker.make(Post, blog=blog, title='public', content='aaa')
+        draft = baker.make(Post, blog=blog, title='draft', content='aaa', status=Post.DRAFT)
+
+        assert sorted(titles(client.get(f'/api/blogs/{blog.pk}/posts/'))) == ['draft', 'public']
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{draft.pk}/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == Post.DRAFT
+
+    def test_owner_and_public_listings_are_cached_apart(self, owner_client):
+        client, blog = owner_client
+        baker.make(Post, blog=blog, title='public', content='aaa')
+        baker.make(Post, blog=blog, title='draft', content='aaa', status=Post.DRAFT)
+
+        owner = client.get(f'/api/blogs/{blog.pk}/posts/')
+        anonymous = APIClient().get(f'/api/blogs/{blog.pk}/posts/')
+
+        assert len(owner.data['results']) == 2
+        assert titles(anonymous) == ['public']
+        assert owner['ETag'] != anonymous['ETag']
+        response = APIClient().get(f'/api/blogs/{blog.pk}/posts/', HTTP_IF_NONE_MATCH=owner['ETag'])
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_feeds_search_and_timelines_skip_drafts(self):
+        blog = baker.make(Blog)
+        reader = baker.make(UserProfile)
+        baker.make(Follow, profile=reader, blog=blog)
+        baker.make(Post, blog=blog, title='public', content='python')
+        baker.make(Post, blog=blog, title='draft', content='python', status=Post.DRAFT)
+
+        feed = json.loads(APIClient().get(f'/api/blogs/{blog.pk}/feeds/json/').content)
+        assert [item['title'] for item in feed['items']] == ['public']
+        assert search_titles('python') == ['public']
+        assert list(TimelineEntry.objects.filter(profile=reader).values_list('post__title', flat=True)) == ['public']
+
+    def test_export_includes_drafts_for_owner_only(self, owner_client):
+        client, blog = owner_client
+        baker.make(Post, blog=blog, title='public', content='aaa')
+        baker.make(Post, blog=blog, title='draft', content='aaa', status=Post.DRAFT)
+
+        def exported(client):
+            response = client.get(f'/api/blogs/{blog.pk}/export/')
+            return [json.loads(line)['title'] for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        assert exported(client) == ['public', 'draft']
+        assert exported(APIClient()) == ['public']
+
+
+@pytest.mark.django_db
+class TestPublishing:
+    def test_scheduled_post_needs_future_publish_at(self, owner_client):
+        client, blog = owner_client
+        url = f'/api/blogs/{blog.pk}/posts/'
+
+        response = client.post(url, {'title': 'a', 'content': 'b', 'status': Post.SCHEDULED})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'publish_at' in response.data
+
+        past = timezone.now() - timedelta(minutes=1)
+        response = client.post(url, {'title': 'a', 'content': 'b', 'status': Post.SCHEDULED, 'publish_at': past})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        future = timezone.now() + timedelta(hours=1)
+        response = client.post(url, {'title': 'a', 'content': 'b', 'status': Post.SCHEDULED, 'publish_at': future})
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_publish_at_is_ignored_unless_scheduled(self, owner_client):
+        client, blog = owner_client
+        future = timezone.now() + timedelta(hours=1)
+
+        response = client.post(
+            f'/api/blogs/{blog.pk}/posts/', {'title': 'a', 'content': 'b', 'status': Post.DRAFT, 'publish_at': future}
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Post.objects.get().publish_at is None
+
+    def test_bulk_patch_validates_against_the_post(self, owner_client):
+        client, blog = owner_client
+        future = timezone.now() + timedelta(hours=1)
+        scheduled = baker.make(Post, blog=blog, content='aaa', status=Post.DRAFT, publish_at=future)
+        draft = baker.make(Post, blog=blog, content='aaa', status=Post.DRAFT)
+        published = baker.make(Post, blog=blog, content='aaa')
+
+        response = client.patch(
+            f'/api/blogs/{blog.pk}/posts/bulk/',
+            data=[
+                {'pk': scheduled.pk, 'status': Post.SCHEDULED},
+                {'pk': draft.pk, 'status': Post.SCHEDULED},
+                {'pk': published.pk, 'publish_at': future.isoformat()},
+            ],
+            format='json',
+        )
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        results = response.data['results']
+        assert [result['status'] for result in results] == [
+            status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST, status.HTTP_200_OK,
+        ]
+        assert 'publish_at' in results[1]['errors']
+        scheduled.refresh_from_db()
+        assert (scheduled.status, scheduled.publish_at) == (Post.SCHEDULED, future)
+        old_publish_at = published.publish_at
+        published.refresh_from_db()
+        assert published.publish_at == old_publish_at
+
+    def test_blog_aggregates_count_published_posts(self):
+        blog = baker.make(Blog)
+        draft = baker.make(Post, blog=blog, content='aaa bbb', status=Post.DRAFT)
+
+        blog.refresh_from_db()
+        assert (blog.post_count, blog.word_count, blog.last_post_at) == (0, 0, None)
+
+        draft.status = Post.PUBLISHED
+        draft.save()
+        blog.refresh_from_db()
+        assert (blog.post_count, blog.word_count, blog.last_post_at) == (1, 2, draft.created_at)
+
+        draft.status = Post.DRAFT
+        draft.save()
+        blog.refresh_from_db()
+        assert (blog.post_count, blog.word_count, blog.last_post_at) == (0, 0, None)
+
+    def test_publishing_dates_the_post(self):
+        draft = baker.make(Post, content='aaa', status=Post.DRAFT)
+        Post.objects.filter(pk=draft.pk).update(created_at=timezone.now() - timedelta(days=3))
+        draft.refresh_from_db()
+
+        draft.status = Post.PUBLISHED
+        draft.save()
+
+        draft.refresh_from_db()
+        assert draft.created_at == draft.publish_at
+        assert draft.created_at > timezone.now() - timedelta(minutes=1)
+
+    def test_bulk_create_drafts(self, owner_client):
+        client, blog = owner_client
+
+        response = client.post(
+            f'/api/blogs/{blog.pk}/posts/bulk/',
+            data=[{'title': 'a', 'content': 'b', 'status': Post.DRAFT}, {'title': 'c', 'content': 'd'}],
+            format='json',
+        )
+
+        assert response.status_code in (status.HTTP_200_OK, status.HTTP_201_CREATED, status.HTTP_207_MULTI_STATUS)
+        blog.refresh_from_db()
+        assert blog.post_count == 1
+        assert titles(APIClient().get(f'/api/blogs/{blog.pk}/posts/')) == ['c']
+
+
+@pytest.mark.django_db
+class TestPublishDue:
+    def test_publishes_due_posts(self):
+        now = timezone.now()
+        blog, other = baker.make(Blog), baker.make(Blog)
+        due = schedule(blog, 'due', now + timedelta(minutes=5))
+        later = schedule(blog, 'later', now + timedelta(days=1))
+        waiting = schedule(other, 'waiting', now + timedelta(days=1))
+        versions = {pk: version for pk, version in Blog.objects.values_list('pk', 'version')}
+
+        assert publishing.publish_due(now + timedelta(minutes=10)) == 1
+
+        due.refresh_from_db()
+        assert due.status == Post.PUBLISHED
+        assert due.created_at == due.publish_at
+        later.refresh_from_db()
+        waiting.refresh_from_db()
+        assert later.status == waiting.status == Post.SCHEDULED
+        blog.refresh_from_db()
+        other.refresh_from_db()
+        assert blog.version == versions[blog.pk] + 1
+        assert (blog.post_count, blog.word_count, blog.last_post_at) == (1, 2, due.publish_at)
+        assert other.version == versions[other.pk]
+        assert search_titles('aaa') == ['due']
+
+    def test_publishes_in_batches(self):
+        blog = baker.make(Blog)
+        for index in range(5):
+            schedule(blog, f'post {index}', timezone.now() + timedelta(seconds=index + 1))
+
+        assert publishing.publish_due(timezone.now() + timedelta(minutes=1), batch_size=2) == 5
+
+        blog.refresh_from_db()
+        assert blog.post_count == 5
+        assert not Post.objects.filter(status=Post.SCHEDULED).exists()
+
+    def test_command(self, capsys):
+        schedule(baker.make(Blog), 'due', timezone.now() + timedelta(minutes=1))
+        Post.objects.update(publish_at=timezone.now() - timedelta(minutes=1))
+
+        call_command('publish_due_posts')
+
+        assert 'Published 1 scheduled post(s).' in capsys.readouterr().out
+        assert Post.objects.get().status == Post.PUBLISHED
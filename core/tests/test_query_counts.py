@@ -0,0 +1,154 @@
+import pytest
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.models import Blog, Post, UserProfile
+
+
+# Exact number of queries each endpoint is allowed to run, raise these only
+# together with the change that justifies it.
+QUERY_BUDGETS = {
+    'blog-list': 2,
+    'blog-retrieve': 2,
+    'blog-create': 1,
+    'blog-update': 2,
+    'blog-delete': 11,
+    'post-list': 2,
+    'post-retrieve': 2,
+    'post-create': 5,
+    'post-update': 8,
+    'post-delete': 7,
+    'blog-list-not-modified': 1,
+    'post-list-not-modified': 1,
+}
+
+
+@pytest.fixture
+def owner_client():
+    profile = baker.make(UserProfile)
+    blog = baker.make(Blog, owner=profile)
+    post = baker.make(Post, blog=blog, content='aaa')
+    baker.make(Post, blog=blog, content='bbb', _quantity=5)
+    client = APIClient()
+    client.force_authenticate(user=profile.user)
+    return client, blog, post
+
+
+@pytest.fixture
+def query_budget(django_assert_num_queries, settings):
+    # Measure the request itself, side effects are queued as background jobs.
+    settings.JOBS_EAGER = False
+
+    def check(endpoint):
+        return django_assert_num_queries(QUERY_BUDGETS[endpoint])
+    return check
+
+
+@pytest.mark.django_db
+class TestBlogQueryBudget:
+    def test_list(self, owner_client, query_budget):
+        client, blog, post = owner_client
+        baker.make(Blog, _quantity=5)
+
+        with query_budget('blog-list'):
+            response = client.get('/api/blogs/')
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_retrieve(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('blog-retrieve'):
+            response = client.get(f'/api/blogs/{blog.pk}/')
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_create(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('blog-create'):
+            response = client.post('/api/blogs/', data={'name': 'aaa'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_update(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('blog-update'):
+            response = client.patch(f'/api/blogs/{blog.pk}/', data={'name': 'aaa'})
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_delete(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('blog-delete'):
+            response = client.delete(f'/api/blogs/{blog.pk}/')
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+class TestPostQueryBudget:
+    def test_list(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('post-list'):
+            response = client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_retrieve(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('post-retrieve'):
+            response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/')
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_create(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('post-create'):
+            response = client.post(f'/api/blogs/{blog.pk}/posts/', data={'title': 'aaa', 'content': 'bbb'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_update(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('post-update'):
+            response = client.patch(f'/api/blogs/{blog.pk}/posts/{post.pk}/', data={'title': 'aaa'})
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_delete(self, owner_client, query_budget):
+        client, blog, post = owner_client
+
+        with query_budget('post-delete'):
+            response = client.delete(f'/api/blogs/{blog.pk}/posts/{post.pk}/')
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+class TestNotModifiedQueryBudget:
+    def test_blog_list(self, owner_client, query_budget):
+        client, blog, post = owner_client
+        etag = client.get('/api/blogs/')['ETag']
+
+        with query_budget('blog-list-not-modified'):
+            response = client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_post_list(self, owner_client, query_budget):
+        client, blog, post = owner_client
+        etag = client.get(f'/api/blogs/{blog.pk}/posts/')['ETag']
+
+        with query_budget('post-list-not-modified'):
+            response = client.get(f'/api/blogs/{blog.pk}/posts/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
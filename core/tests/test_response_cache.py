@@ -0,0 +1,156 @@
+import pytest
+
+from django.conf import settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core.cache import DjangoCache, LRUCache, get_response_cache
+from core.models import Blog, Post
+
+
+def entry(content):
+    return {'content': content, 'content_type': 'application/json'}
+
+
+class TestLRUCache:
+    def test_get_returns_stored_entry(self):
+        cache = LRUCache()
+
+        cache.set('a', entry(b'aaa'))
+
+        assert cache.get('a') == entry(b'aaa')
+        assert cache.get('b') is None
+        assert cache.get_stats()['hits'] == 1
+        assert cache.get_stats()['misses'] == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', entry(b'a'))
+        cache.set('b', entry(b'b'))
+        cache.get('a')
+
+        cache.set('c', entry(b'c'))
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_size_bound_is_enforced(self):
+        cache = LRUCache(max_bytes=5)
+        cache.set('a', entry(b'aaa'))
+
+        cache.set('b', entry(b'bbb'))
+
+        assert cache.get('a') is None
+        assert cache.get_stats()['bytes'] == 3
+
+    def test_entry_larger_than_bound_is_not_stored(self):
+        cache = LRUCache(max_bytes=2)
+
+        cache.set('a', entry(b'aaa'))
+
+        assert cache.get('a') is None
+
+
+class TestDjangoCache:
+    def test_stores_entries_in_cache_alias(self):
+        cache = DjangoCache(alias='default')
+        cache.clear()
+
+        cache.set('a', entry(b'aaa'))
+
+        assert cache.get('a') == entry(b'aaa')
+        assert cache.get_stats()['hits'] == 1
+
+
+@pytest.mark.django_db
+class TestCachedResponses:
+    def test_second_read_is_served_from_cache(self, django_assert_num_queries):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, content='aaa')
+        client = APIClient()
+        first = client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        with django_assert_num_queries(1):
+            second = client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        assert first['X-Cache'] == 'MISS'
+        assert second['X-Cache'] == 'HIT'
+        assert second.content == first.content
+        assert second['ETag'] == first['ETag']
+
+    def test_post_write_invalidates_blog_posts(self):
+        blog = baker.make(Blog)
+        post = baker.make(Post, blog=blog, title='aaa', content='aaa')
+        client = APIClient()
+        client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        post.title = 'bbb'
+        post.save()
+        response = client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['results'][0]['title'] == 'bbb'
+
+    def test_write_to_other_blog_keeps_entry(self):
+        blog, other_blog = baker.make(Blog, _quantity=2)
+        baker.make(Post, blog=blog, content='aaa')
+        client = APIClient()
+        client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        baker.make(Post, blog=other_blog, content='aaa')
+        response = client.get(f'/api/blogs/{blog.pk}/posts/')
+
+        assert response['X-Cache'] == 'HIT'
+
+    def test_anonymous_and_authenticated_entries_are_separate(self):
+        blog = baker.make(Blog)
+        client = APIClient()
+        client.get(f'/api/blogs/{blog.pk}/')
+        client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+
+        response = client.get(f'/api/blogs/{blog.pk}/')
+
+        assert response['X-Cache'] == 'MISS'
+
+    def test_browsable_api_is_not_cached(self):
+        blog = baker.make(Blog)
+        client = APIClient()
+        client.get(f'/api/blogs/{blog.pk}/', HTTP_ACCEPT='text/html')
+
+        response = client.get(f'/api/blogs/{blog.pk}/', HTTP_ACCEPT='text/html')
+
+        assert 'X-Cache' not in response
+        assert get_response_cache().get_stats()['entries'] == 0
+
+    def test_shared_backend_can_be_configured(self, settings):
+        settings.RESPONSE_CACHE = {'BACKEND': 'core.cache.DjangoCache', 'OPTIONS': {'alias': 'default'}}
+        blog = baker.make(Blog)
+        client = APIClient()
+        client.get(f'/api/blogs/{blog.pk}/')
+
+        response = client.get(f'/api/blogs/{blog.pk}/')
+
+        assert isinstance(get_response_cache(), DjangoCache)
+        assert response['X-Cache'] == 'HIT'
+
+
+@pytest.mark.django_db
+class TestCacheStats:
+    def test_if_not_admin_return_403(self):
+        client = APIClient()
+        client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+
+        response = client.get('/api/cache/stats/')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_admin_return_stats(self):
+        client = APIClient()
+        client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL, is_staff=True))
+
+        response = client.get('/api/cache/stats/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert {'hits', 'misses', 'evictions'} <= response.data.keys()
@@ -0,0 +1,244 @@
+from datetime import timedelta
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import revisions
+from core.models import Blog, Post, PostRevision, UserProfile
+
+
+@pytest.fixture
+def owner_client():
+    profile = baker.make(UserProfile)
+    blog = baker.make(Blog, owner=profile)
+    client = APIClient()
+    client.force_authenticate(user=profile.user)
+    return client, blog
+
+
+def edit(post, content, title=None):
+    post.content = content
+    if title is not None:
+        post.title = title
+    post.save()
+
+
+def document(lines):
+    return ''.join(f'line {index}\n' for index in lines)
+
+
+class TestDelta:
+    @pytest.mark.parametrize('old, new', [
+        ('', 'a\nb\n'),
+        ('a\nb\nc\n', 'a\nc\n'),
+        ('a\nb\nc', 'a\nB\nc\nd'),
+        ('a\nb\n', ''),
+        ('same\n', 'same\n'),
+    ])
+    def test_delta_round_trips(self, old, new):
+        assert revisions.apply_delta(old, revisions.make_delta(old, new)) == new
+
+    def test_compress_round_trips(self):
+        value = [[0, 3], 'zażółć\n']
+
+        assert revisions.decompress(revisions.compress(value)) == value
+
+
+@pytest.mark.django_db
+class TestRecording:
+    def test_create_stores_nothing(self):
+        baker.make(Post, title='t', content='aaa')
+
+        assert not PostRevision.objects.exists()
+
+    def test_first_edit_stores_created_state(self):
+        post = baker.make(Post, title='t', content='aaa')
+
+        edit(post, 'bbb')
+
+        revision = PostRevision.objects.get(post=post, number=1)
+        assert (revision.base, revision.kind) == (1, PostRevision.SNAPSHOT)
+        assert revisions.reconstruct(post.pk, 1) == ('t', 'aaa')
+        assert revisions.reconstruct(post.pk, 2) == ('t', 'bbb')
+
+    def test_small_edit_stores_delta(self):
+        post = baker.make(Post, title='t', content=document(range(50)))
+
+        edit(post, document(range(49)) + 'changed\n', title='t2')
+
+        revision = PostRevision.objects.get(post=post, number=2)
+        assert (revision.base, revision.kind) == (1, PostRevision.DELTA)
+        assert revisions.reconstruct(post.pk, 2) == ('t2', post.content)
+        assert revisions.reconstruct(post.pk, 1) == ('t', document(range(50)))
+
+    def test_rewrite_stores_snapshot(self):
+        post = baker.make(Post, content=document(range(50)))
+
+        edit(post, document(range(100, 150)))
+
+        assert PostRevision.objects.get(post=post, number=2).kind == PostRevision.SNAPSHOT
+
+    def test_unchanged_save_stores_nothing(self):
+        post = baker.make(Post, content='aaa')
+
+        edit(post, 'bbb')
+        post.save()
+
+        assert PostRevision.objects.filter(post=post).count() == 2
+
+    def test_snapshot_interval_bounds_delta_chains(self, settings):
+        settings.REVISION_SNAPSHOT_INTERVAL = 3
+        post = baker.make(Post, content=document(range(50)))
+        contents = [post.content]
+        for index in range(6):
+            edit(post, document(range(50)) + f'extra {index}\n')
+            contents.append(post.content)
+
+        kinds = list(PostRevision.objects.filter(post=post).order_by('number').values_list('kind', flat=True))
+        assert kinds == ['snapshot', 'delta', 'delta', 'snapshot', 'delta', 'delta', 'snapshot']
+        for number, content in enumerate(contents, start=1):
+            assert revisions.reconstruct(post.pk, number)[1] == content
+
+    def test_post_without_history_gets_initial_snapshot(self):
+        post = baker.make(Post, title='t', content=document(range(50)))
+        PostRevision.objects.all().delete()
+        post = Post.objects.get(pk=post.pk)
+
+        edit(post, document(range(51)))
+
+        assert revisions.reconstruct(post.pk, 1) == ('t', document(range(50)))
+        assert revisions.reconstruct(post.pk, 2) == ('t', document(range(51)))
+
+    def test_edit_of_stale_state_stores_snapshot(self):
+        post = baker.make(Post, content=document(range(50)))
+        edit(post, document(range(51)))
+        first, second = Post.objects.get(pk=post.pk), Post.objects.get(pk=post.pk)
+
+        edit(first, document(range(52)))
+        edit(second, document(range(50)) + 'other\n')
+
+        revision = PostRevision.objects.get(post=post, number=4)
+        assert (revision.base, revision.kind) == (4, PostRevision.SNAPSHOT)
+        assert revisions.reconstruct(post.pk, 3)[1] == document(range(52))
+        assert revisions.reconstruct(post.pk, 4)[1] == document(range(50)) + 'other\n'
+
+    def test_edit_losing_the_number_race_is_renumbered(self, monkeypatch):
+        post = baker.make(Post, content=document(range(50)))
+        edit(post, document(range(51)))
+        first, second = Post.objects.get(pk=post.pk), Post.objects.get(pk=post.pk)
+        latest_revisions = revisions.latest_revisions
+
+        def racing(post_pks):
+            # The other edit stores revision 3 after this one read the latest.
+            latest = latest_revisions(post_pks)
+            monkeypatch.setattr(revisions, 'latest_revisions', latest_revisions)
+            edit(first, document(range(52)))
+            return latest
+
+        monkeypatch.setattr(revisions, 'latest_revisions', racing)
+        edit(second, document(range(50)) + 'other\n')
+
+        assert revisions.reconstruct(post.pk, 3)[1] == document(range(52))
+        assert revisions.reconstruct(post.pk, 4)[1] == document(range(50)) + 'other\n'
+
+    def test_reconstruct_is_one_query(self, django_assert_num_queries):
+        post = baker.make(Post, content=document(range(50)))
+        for index in range(1, 6):
+            edit(post, document(range(50 + index)))
+
+        with django_assert_num_queries(1):
+            _, content = revisions.reconstruct(post.pk, 6)
+        assert content == document(range(55))
+
+    def test_bulk_update_records_revisions(self, owner_client):
+        client, blog = owner_client
+        post = baker.make(Post, blog=blog, content='aaa')
+
+        response = client.patch(
+            f'/api/blogs/{blog.pk}/posts/bulk/', [{'pk': post.pk, 'content': 'bbb'}], format='json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert revisions.reconstruct(post.pk, 2)[1] == 'bbb'
+
+    def test_bulk_create_stores_nothing(self, owner_client):
+        client, blog = owner_client
+
+        client.post(f'/api/blogs/{blog.pk}/posts/bulk/', [{'title': 'a', 'content': 'b'}], format='json')
+
+        assert Post.objects.exists()
+        assert not PostRevision.objects.exists()
+
+
+@pytest.mark.django_db
+class TestRevisionEndpoints:
+    def test_owner_lists_revisions_newest_first(self, owner_client):
+        client, blog = owner_client
+        post = baker.make(Post, blog=blog, content='aaa')
+        edit(post, 'bbb')
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/revisions/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [revision['number'] for revision in response.data['results']] == [2, 1]
+        assert all(revision['size'] > 0 for revision in response.data['results'])
+
+    def test_owner_reads_revision(self, owner_client):
+        client, blog = owner_client
+        post = baker.make(Post, blog=blog, title='t', content='aaa')
+        edit(post, 'bbb')
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/revisions/1/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'number': 1, 'title': 't', 'content': 'aaa'}
+
+    def test_missing_revision_returns_404(self, owner_client):
+        client, blog = owner_client
+        post = baker.make(Post, blog=blog, content='aaa')
+
+        response = client.get(f'/api/blogs/{blog.pk}/posts/{post.pk}/revisions/5/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_other_users_cannot_see_history(self):
+        post = baker.make(Post, content='aaa')
+        client = APIClient()
+        client.force_authenticate(user=baker.make(UserProfile).user)
+
+        response = client.get(f'/api/blogs/{post.blog_id}/posts/{post.pk}/revisions/')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestCompaction:
+    def make_history(self, count, days_ago):
+        post = baker.make(Post, content=document(range(50)))
+        for index in range(1, count):
+            edit(post, document(range(50 + index)))
+        PostRevision.objects.filter(post=post).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return post
+
+    def test_squashes_old_revisions_into_snapshot(self):
+        post = self.make_history(10, days_ago=100)
+
+        call_command('compact_revisions', keep=3, older_than=90)
+
+        remaining = PostRevision.objects.filter(post=post).order_by('number')
+        assert [revision.number for revision in remaining] == [8, 9, 10]
+        assert remaining[0].kind == PostRevision.SNAPSHOT
+        for revision in remaining:
+            assert revisions.reconstruct(post.pk, revision.number)[1] == document(range(50 + revision.number - 1))
+
+    def test_keeps_recent_revisions(self):
+        post = self.make_history(10, days_ago=10)
+
+        call_command('compact_revisions', keep=3, older_than=90)
+
+        assert PostRevision.objects.filter(post=post).count() == 10
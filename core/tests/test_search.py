@@ -0,0 +1,113 @@
+import pytest
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import search
+from core.models import Blog, Post
+
+
+def search_titles(query, **params):
+    response = APIClient().get('/api/search/', data={'q': query, **params})
+    assert response.status_code == status.HTTP_200_OK
+    return [item['title'] for item in response.data['results']]
+
+
+@pytest.mark.django_db
+class TestSearch:
+    def test_empty_query_returns_no_results(self):
+        baker.make(Post, title='aaa', content='bbb')
+
+        response = APIClient().get('/api/search/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 0
+        assert response.data['results'] == []
+
+    def test_matches_title_and_content(self):
+        baker.make(Post, title='python tips', content='aaa')
+        baker.make(Post, title='bbb', content='all about python')
+        baker.make(Post, title='ccc', content='ddd')
+
+        assert sorted(search_titles('python')) == ['bbb', 'python tips']
+
+    def test_title_matches_rank_first(self):
+        baker.make(Post, title='bbb', content='python python')
+        baker.make(Post, title='python', content='aaa')
+
+        assert search_titles('python') == ['python', 'bbb']
+
+    def test_all_terms_must_match(self):
+        baker.make(Post, title='django tips', content='python')
+        baker.make(Post, title='flask tips', content='python')
+
+        assert search_titles('python django') == ['django tips']
+
+    def test_query_syntax_is_escaped(self):
+        baker.make(Post, title='aaa', content='bbb')
+
+        assert search_titles('"aaa OR NEAR(') == []
+
+    def test_results_are_paginated(self):
+        baker.make(Post, title='python', content='aaa', _quantity=3)
+
+        response = APIClient().get('/api/search/', data={'q': 'python', 'page_size': 2})
+
+        assert response.data['count'] == 3
+        assert len(response.data['results']) == 2
+        assert response.data['next'] is not None
+
+    def test_updated_post_is_reindexed(self):
+        post = baker.make(Post, title='aaa', content='bbb')
+
+        post.content = 'python'
+        post.save()
+
+        assert search_titles('python') == ['aaa']
+        assert search_titles('bbb') == []
+
+    def test_deleted_post_is_removed(self):
+        post = baker.make(Post, title='python', content='aaa')
+
+        post.delete()
+
+        assert search_titles('python') == []
+
+    def test_posts_of_deleted_blog_are_removed(self):
+        blog = baker.make(Blog)
+        baker.make(Post, blog=blog, title='python', content='aaa', _quantity=2)
+
+        blog.delete()
+
+        assert search.SearchResults('python').count() == 0
+
+    def test_rebuild_command_reindexes_posts(self):
+        baker.make(Post, title='python', content='aaa')
+        search.get_backend().clear()
+
+        call_command('rebuild_search_index')
+
+        assert search_titles('python') == ['python']
+
+
+@pytest.mark.django_db
+class TestFallbackBackend:
+    def test_search_with_icontains(self):
+        baker.make(Post, title='Python tips', content='aaa')
+        baker.make(Post, title='bbb', content='ccc')
+        backend = search.FallbackBackend()
+
+        assert backend.count('python') == 1
+        assert len(backend.search('python', 0, 10)) == 1
+
+    def test_markup_does_not_match(self):
+        baker.make(Post, title='aaa', content='[link](https://example.com) **bold** & co')
+        backend = search.FallbackBackend()
+
+        for query in ('href', 'strong', 'example', 'amp'):
+            assert backend.count(query) == 0
+        assert backend.count('bold') == 1
+        assert backend.count('link &') == 1
+        assert backend.search('link', 0, 10) == [Post.objects.get().pk]
@@ -0,0 +1,70 @@
+import pytest
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from core.backends.sqlite3.base import DatabaseWrapper
+
+
+@pytest.fixture(autouse=True)
+def unblocked_db(django_db_blocker):
+    # These tests open their own connections to a scratch file, not the test database.
+    with django_db_blocker.unblock():
+        yield
+
+
+def make_wrapper(tmp_path, **options):
+    settings_dict = {
+        **connections['default'].settings_dict,
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': str(tmp_path / 'tuned.sqlite3'),
+        'OPTIONS': options,
+    }
+    return DatabaseWrapper(settings_dict, alias='tuned')
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+class TestTunedSqliteBackend:
+    def test_init_command_runs_on_each_connection(self, tmp_path):
+        wrapper = make_wrapper(tmp_path, init_command='PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL')
+        try:
+            assert pragma(wrapper, 'journal_mode') == 'wal'
+            assert pragma(wrapper, 'synchronous') == 1
+            assert pragma(wrapper, 'foreign_keys') == 1
+        finally:
+            wrapper.close()
+
+    def test_transactions_begin_immediate(self, tmp_path):
+        wrapper = make_wrapper(tmp_path, transaction_mode='immediate')
+        wrapper.force_debug_cursor = True
+        try:
+            wrapper.ensure_connection()
+            wrapper._start_transaction_under_autocommit()
+            wrapper.connection.rollback()
+
+            assert wrapper.queries_log[-1]['sql'] == 'BEGIN IMMEDIATE'
+        finally:
+            wrapper.close()
+
+    def test_default_transaction_mode(self, tmp_path):
+        wrapper = make_wrapper(tmp_path)
+        wrapper.force_debug_cursor = True
+        try:
+            wrapper.ensure_connection()
+            wrapper._start_transaction_under_autocommit()
+            wrapper.connection.rollback()
+
+            assert wrapper.queries_log[-1]['sql'] == 'BEGIN'
+        finally:
+            wrapper.close()
+
+    def test_invalid_transaction_mode_raises(self, tmp_path):
+        wrapper = make_wrapper(tmp_path, transaction_mode='LATER')
+
+        with pytest.raises(ImproperlyConfigured):
+            wrapper.ensure_connection()
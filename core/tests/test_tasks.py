@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+from model_bakery import baker
+
+from core import tasks
+from core.models import Job, Post
+from core.search import SearchResults
+
+
+@pytest.fixture
+def queued(settings):
+    settings.JOBS_EAGER = False
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    calls = []
+
+    def fail(*args):
+        calls.append(args)
+        raise ValueError('boom')
+
+    monkeypatch.setitem(tasks.TASKS, 'test.fail', fail)
+    fail.max_attempts = 2
+    return calls
+
+
+@pytest.mark.django_db
+class TestJobQueue:
+    def test_post_save_enqueues_indexing(self, queued):
+        post = baker.make(Post, title='aaa', content='ccc')
+
+        job = Job.objects.get(name='search.index_posts')
+        assert (job.args, job.status) == ([[post.pk]], Job.PENDING)
+        assert list(SearchResults('aaa')[0:10]) == []
+
+    def test_pending_job_with_same_key_is_not_duplicated(self, queued):
+        post = baker.make(Post, title='aaa', content='ccc')
+        post.title = 'bbb'
+        post.save()
+
+        assert Job.objects.filter(name='search.index_posts').count() == 1
+
+    def test_workers_run_due_jobs(self, queued):
+        post = baker.make(Post, title='aaa', content='ccc')
+
+        call_command('run_workers', processes=1, burst=True)
+
+        assert not Job.objects.exists()
+        assert list(SearchResults('aaa')[0:10]) == [post]
+
+    def test_delayed_jobs_wait(self, queued):
+        tasks.enqueue('search.remove_posts', [1], delay=60)
+
+        assert tasks.work(burst=True) == 0
+        assert Job.objects.get().attempts == 0
+
+    def test_failed_job_is_retried_with_backoff(self, queued, flaky):
+        tasks.enqueue('test.fail', 1)
+
+        tasks.work(burst=True)
+
+        job = Job.objects.get()
+        assert (job.status, job.attempts) == (Job.PENDING, 1)
+        assert 'ValueError: boom' in job.last_error
+        assert job.run_at > timezone.now() + timedelta(seconds=0.5)
+
+    def test_job_fails_after_max_attempts(self, queued, flaky):
+        tasks.enqueue('test.fail', 1)
+
+        for _ in range(2):
+            Job.objects.update(run_at=timezone.now())
+            tasks.work(burst=True)
+
+        job = Job.objects.get()
+        assert (job.status, job.attempts) == (Job.FAILED, 2)
+        assert flaky == [(1,), (1,)]
+
+    def test_retry_is_dropped_when_same_key_is_pending(self, queued, flaky):
+        tasks.enqueue('test.fail', 1, key='same')
+        job = tasks.claim_job()
+        tasks.enqueue('test.fail', 1, key='same')
+
+        assert tasks.run_job(job) is False
+
+        pending = Job.objects.get()
+        assert (pending.status, pending.attempts) == (Job.PENDING, 0)
+        assert pending.pk != job.pk
+
+    def test_worker_survives_bookkeeping_errors(self, queued, monkeypatch):
+        def broken(job):
+            raise RuntimeError('database gone')
+
+        tasks.enqueue('search.remove_posts', [1])
+        monkeypatch.setattr(tasks, 'run_job', broken)
+
+        assert tasks.work(burst=True) == 1
+        assert Job.objects.get().status == Job.RUNNING
+
+    def test_abandoned_running_job_is_taken_over(self, queued, settings):
+        post = baker.make(Post, title='aaa', content='ccc')
+        Job.objects.update(status=Job.RUNNING, attempts=1, locked_at=timezone.now() - timedelta(hours=1))
+
+        assert tasks.work(burst=True) == 2
+        assert list(SearchResults('aaa')[0:10]) == [post]
+
+    def test_backoff_grows_and_is_capped(self, settings):
+        settings.JOB_RETRY_BACKOFF, settings.JOB_RETRY_BACKOFF_MAX = 2, 10
+
+        assert 1 <= tasks.backoff(1) <= 2
+        assert 4 <= tasks.backoff(3) <= 8
+        assert 5 <= tasks.backoff(10) <= 10
+
+    def test_eager_mode_runs_inline(self):
+        post = baker.make(Post, title='aaa', content='ccc')
+
+        assert not Job.objects.exists()
+        assert list(SearchResults('aaa')[0:10]) == [post]
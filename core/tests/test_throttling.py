@@ -0,0 +1,228 @@
+import base64
+
+import pytest
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import throttling
+from core.models import Blog, User, UserProfile
+
+
+@pytest.fixture
+def rates(settings):
+    def configure(**rates):
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}
+    return configure
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [600.0]
+    monkeypatch.setattr(throttling.time, 'time', lambda: now[0])
+    return now
+
+
+def basic_auth(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+
+@pytest.fixture
+def hash_checks(monkeypatch):
+    calls = []
+    verify = PBKDF2PasswordHasher.verify
+
+    def counting_verify(self, password, encoded):
+        calls.append(password)
+        return verify(self, password, encoded)
+
+    monkeypatch.setattr(PBKDF2PasswordHasher, 'verify', counting_verify)
+    return calls
+
+
+@pytest.fixture
+def user(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.PBKDF2PasswordHasher']
+    user = User.objects.create_user('aaa', password='secret')
+    baker.make(UserProfile, user=user)
+    return user
+
+
+class TestSlidingWindowCounters:
+    def test_previous_window_is_weighted_by_overlap(self, clock):
+        counter = throttling.LocalCounter()
+        for _ in range(10):
+            counter.incr('key', 60)
+
+        clock[0] += 75
+        counter.incr('key', 60)
+
+        # A quarter of the way into the next window, 3/4 of the old count remains.
+        assert counter.get('key', 60) == pytest.approx(10 * 0.75 + 1)
+
+    def test_counts_expire_after_two_windows(self, clock):
+        counter = throttling.LocalCounter()
+        counter.incr('key', 60)
+
+        clock[0] += 120
+
+        assert counter.get('key', 60) == 0
+
+    def test_idle_keys_are_pruned(self, clock):
+        counter = throttling.LocalCounter(max_keys=2)
+        counter.incr('a', 60)
+        counter.incr('b', 60)
+        clock[0] += 120
+
+        counter.incr('c', 60)
+
+        assert set(counter.windows) == {'c'}
+
+    def test_cache_counter(self, clock):
+        counter = throttling.CacheCounter()
+        counter.clear()
+        counter.incr('key', 60)
+        counter.incr('key', 60)
+
+        clock[0] += 90
+
+        assert counter.get('key', 60) == pytest.approx(1)
+
+
+@pytest.mark.django_db
+class TestThrottles:
+    def test_reads_over_the_rate_are_rejected(self, rates):
+        rates(read_anon='2/min')
+        client = APIClient()
+
+        responses = [client.get('/api/blogs/') for _ in range(3)]
+
+        assert [response.status_code for response in responses] == [200, 200, 429]
+        assert int(responses[2]['Retry-After']) <= 60
+
+    def test_reads_and_writes_have_separate_buckets(self, rates, user):
+        rates(read_user='1/min', write_user='5/min')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.get('/api/blogs/')
+
+        assert client.post('/api/blogs/', data={'name': 'aaa'}).status_code == status.HTTP_201_CREATED
+        assert client.get('/api/blogs/').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_users_are_throttled_separately_from_anonymous_clients(self, rates, user):
+        rates(read_anon='1/min', read_user='5/min')
+        APIClient().get('/api/blogs/')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        assert APIClient().get('/api/blogs/').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert client.get('/api/blogs/').status_code == status.HTTP_200_OK
+
+    def test_clients_are_throttled_by_address(self, rates):
+        rates(read_anon='1/min')
+        APIClient().get('/api/blogs/', REMOTE_ADDR='10.0.0.1')
+
+        assert APIClient().get('/api/blogs/', REMOTE_ADDR='10.0.0.2').status_code == status.HTTP_200_OK
+
+    def test_spoofed_forwarded_for_does_not_reset_the_bucket(self, rates):
+        rates(read_anon='2/min')
+        client = APIClient()
+
+        statuses = [
+            client.get('/api/blogs/', HTTP_X_FORWARDED_FOR=f'10.0.0.{index}').status_code for index in range(3)
+        ]
+
+        assert statuses == [200, 200, 429]
+
+    def test_forwarded_for_is_used_behind_proxies(self, rates, settings):
+        rates(read_anon='1/min')
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+        APIClient().get('/api/blogs/', HTTP_X_FORWARDED_FOR='10.0.0.1')
+
+        assert APIClient().get('/api/blogs/', HTTP_X_FORWARDED_FOR='10.0.0.2').status_code == status.HTTP_200_OK
+        assert APIClient().get('/api/blogs/', HTTP_X_FORWARDED_FOR='10.0.0.1').status_code == 429
+
+    def test_async_reads_share_the_read_bucket(self, rates):
+        rates(read_anon='2/min')
+        client = APIClient()
+        client.get('/api/blogs/')
+
+        assert client.get('/api/async/blogs/').status_code == status.HTTP_200_OK
+        response = client.get('/api/async/blogs/')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response['Retry-After']) <= 60
+
+    def test_scope_without_rate_is_not_throttled(self, rates):
+        rates()
+        client = APIClient()
+
+        assert all(client.get('/api/blogs/').status_code == 200 for _ in range(5))
+
+
+@pytest.mark.django_db
+class TestCachedBasicAuthentication:
+    def test_verification_is_cached(self, user, hash_checks):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'secret'))
+
+        for _ in range(3):
+            assert client.post('/api/blogs/', data={'name': 'aaa'}).status_code == status.HTTP_201_CREATED
+
+        assert len(hash_checks) == 1
+        assert Blog.objects.filter(owner__user=user).count() == 3
+
+    def test_wrong_password_is_not_served_from_cache(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'secret'))
+        client.get('/api/blogs/')
+
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'wrong'))
+
+        assert client.get('/api/blogs/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_password_change_invalidates_cache(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'secret'))
+        client.get('/api/blogs/')
+
+        user.set_password('other')
+        user.save()
+
+        assert client.get('/api/blogs/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_entries_expire(self, user, hash_checks, settings):
+        settings.BASIC_AUTH_CACHE_TTL = 0
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'secret'))
+
+        client.get('/api/blogs/')
+        client.get('/api/blogs/')
+
+        assert len(hash_checks) == 2
+
+    def test_repeated_failures_are_throttled_before_hashing(self, rates, user, hash_checks):
+        rates(auth_failure='2/min')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'wrong'))
+        statuses = [client.get('/api/blogs/').status_code for _ in range(2)]
+
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'secret'))
+        response = client.get('/api/blogs/')
+
+        assert statuses == [401, 401]
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert len(hash_checks) == 2
+
+    def test_spoofed_forwarded_for_does_not_skip_failure_throttle(self, rates, user, hash_checks):
+        rates(auth_failure='2/min')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic_auth('aaa', 'wrong'))
+
+        statuses = [
+            client.get('/api/blogs/', HTTP_X_FORWARDED_FOR=f'10.0.0.{index}').status_code for index in range(3)
+        ]
+
+        assert statuses == [401, 401, 429]
+        assert len(hash_checks) == 2
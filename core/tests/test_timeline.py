@@ -0,0 +1,204 @@
+from datetime import timedelta
+
+import pytest
+
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from model_bakery import baker
+
+from core import timeline
+from core.models import Blog, Follow, Post, TimelineEntry, UserProfile
+
+
+@pytest.fixture
+def reader():
+    profile = baker.make(UserProfile)
+    client = APIClient()
+    client.force_authenticate(user=profile.user)
+    return client, profile
+
+
+def make_posts(blog, count, start=None):
+    start = start or timezone.now() - timedelta(days=1)
+    posts = []
+    for index in range(count):
+        post = baker.make(Post, blog=blog, title=f'{blog.name} {index}', content='aaa')
+        post.created_at = start + timedelta(minutes=index)
+        Post.objects.filter(pk=post.pk).update(created_at=post.created_at)
+        TimelineEntry.objects.filter(post=post).update(created_at=post.created_at)
+        posts.append(post)
+    return posts
+
+
+def titles(response):
+    return [post['title'] for post in response.data['results']]
+
+
+@pytest.mark.django_db
+class TestFollow:
+    def test_follow_and_unfollow(self, reader):
+        client, profile = reader
+        blog = baker.make(Blog)
+
+        assert client.post(f'/api/blogs/{blog.pk}/follow/').status_code == status.HTTP_201_CREATED
+        assert client.post(f'/api/blogs/{blog.pk}/follow/').status_code == status.HTTP_200_OK
+        blog.refresh_from_db()
+        assert blog.follower_count == 1
+
+        assert client.delete(f'/api/blogs/{blog.pk}/follow/').status_code == status.HTTP_204_NO_CONTENT
+        blog.refresh_from_db()
+        assert blog.follower_count == 0
+        assert not Follow.objects.exists()
+
+    def test_follow_requires_authentication(self):
+        blog = baker.make(Blog)
+
+        response = APIClient().post(f'/api/blogs/{blog.pk}/follow/')
+
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+    def test_follow_backfills_latest_posts(self, reader, settings):
+        settings.TIMELINE_LENGTH = 2
+        client, profile = reader
+        blog = baker.make(Blog, name='aaa')
+        make_posts(blog, 3)
+
+        client.post(f'/api/blogs/{blog.pk}/follow/')
+
+        assert titles(client.get('/api/timeline/')) == ['aaa 2', 'aaa 1']
+
+    def test_unfollow_removes_posts(self, reader):
+        client, profile = reader
+        blog = baker.make(Blog)
+        client.post(f'/api/blogs/{blog.pk}/follow/')
+        make_posts(blog, 2)
+
+        client.delete(f'/api/blogs/{blog.pk}/follow/')
+
+        assert not TimelineEntry.objects.exists()
+        assert titles(client.get('/api/timeline/')) == []
+
+
+@pytest.mark.django_db
+class TestTimeline:
+    def test_new_posts_are_fanned_out(self, reader):
+        client, profile = reader
+        first, second, other = baker.make(Blog, name='aaa'), baker.make(Blog, name='bbb'), baker.make(Blog, name='ccc')
+        client.post(f'/api/blogs/{first.pk}/follow/')
+        client.post(f'/api/blogs/{second.pk}/follow/')
+
+        make_posts(first, 2)
+        make_posts(second, 1, start=timezone.now() - timedelta(hours=1))
+        make_posts(other, 1)
+
+        assert TimelineEntry.objects.filter(profile=profile).count() == 3
+        assert titles(client.get('/api/timeline/')) == ['bbb 0', 'aaa 1', 'aaa 0']
+
+    def test_large_blogs_are_merged_on_read(self, reader, settings):
+        settings.TIMELINE_FANOUT_LIMIT = 0
+        client, profile = reader
+        large = baker.make(Blog, name='aaa')
+        client.post(f'/api/blogs/{large.pk}/follow/')
+
+        make_posts(large, 2)
+
+        assert not TimelineEntry.objects.exists()
+        assert titles(client.get('/api/timeline/')) == ['aaa 1', 'aaa 0']
+
+    def test_posts_from_over_the_limit_stay_after_blog_shrinks(self, reader, settings):
+        settings.TIMELINE_FANOUT_LIMIT = 1
+        client, profile = reader
+        other = APIClient()
+        other.force_authenticate(user=baker.make(UserProfile).user)
+        blog = baker.make(Blog, name='aaa')
+        client.post(f'/api/blogs/{blog.pk}/follow/')
+        other.post(f'/api/blogs/{blog.pk}/follow/')
+        make_posts(blog, 1)
+
+        other.delete(f'/api/blogs/{blog.pk}/follow/')
+        blog.name = 'bbb'
+        make_posts(blog, 1, start=timezone.now())
+
+        assert TimelineEntry.objects.filter(profile=profile).count() == 1
+        assert titles(client.get('/api/timeline/')) == ['bbb 0', 'aaa 0']
+
+    def test_fanned_out_and_merged_posts_are_interleaved(self, reader, settings):
+        client, profile = reader
+        small, large = baker.make(Blog, name='aaa'), baker.make(Blog, name='bbb', follower_count=5)
+        settings.TIMELINE_FANOUT_LIMIT = 5
+        client.post(f'/api/blogs/{small.pk}/follow/')
+        client.post(f'/api/blogs/{large.pk}/follow/')
+        start = timezone.now() - timedelta(days=1)
+
+        make_posts(small, 2, start=start)
+        make_posts(large, 2, start=start + timedelta(seconds=30))
+
+        assert titles(client.get('/api/timeline/')) == ['bbb 1', 'aaa 1', 'bbb 0', 'aaa 0']
+
+    def test_timeline_is_capped(self, reader, settings):
+        settings.TIMELINE_LENGTH = 3
+        client, profile = reader
+        blog = baker.make(Blog)
+        client.post(f'/api/blogs/{blog.pk}/follow/')
+
+        make_posts(blog, 5)
+
+        assert TimelineEntry.objects.filter(profile=profile).count() == 3
+
+    def test_cursor_pagination(self, reader, settings):
+        settings.TIMELINE_FANOUT_LIMIT = 1
+        client, profile = reader
+        small, large = baker.make(Blog, name='aaa'), baker.make(Blog, name='bbb', follower_count=1)
+        client.post(f'/api/blogs/{small.pk}/follow/')
+        client.post(f'/api/blogs/{large.pk}/follow/')
+        start = timezone.now() - timedelta(days=1)
+        make_posts(small, 3, start=start)
+        make_posts(large, 3, start=start + timedelta(seconds=30))
+
+        seen = []
+        response = client.get('/api/timeline/?page_size=4')
+        seen += titles(response)
+        response = client.get(response.data['next'])
+        seen += titles(response)
+
+        assert seen == ['bbb 2', 'aaa 2', 'bbb 1', 'aaa 1', 'bbb 0', 'aaa 0']
+        assert response.data['next'] is None
+
+    def test_invalid_cursor(self, reader):
+        client, profile = reader
+
+        assert client.get('/api/timeline/?cursor=aaa').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_deleted_posts_disappear(self, reader):
+        client, profile = reader
+        blog = baker.make(Blog)
+        client.post(f'/api/blogs/{blog.pk}/follow/')
+        post, = make_posts(blog, 1)
+
+        post.delete()
+
+        assert titles(client.get('/api/timeline/')) == []
+
+    def test_read_is_two_queries_whatever_is_followed(self, reader, django_assert_num_queries):
+        client, profile = reader
+        for blog in baker.make(Blog, _quantity=5):
+            client.post(f'/api/blogs/{blog.pk}/follow/')
+            make_posts(blog, 2)
+
+        with django_assert_num_queries(2):
+            response = client.get('/api/timeline/')
+
+        assert len(response.data['results']) == 10
+
+    def test_trim_keeps_latest_entries_per_profile(self, settings):
+        settings.TIMELINE_LENGTH = 1
+        blog = baker.make(Blog)
+        profiles = baker.make(UserProfile, _quantity=2)
+        posts = make_posts(blog, 2)
+        for profile in profiles:
+            timeline.write_entries([profile.pk], blog.pk, [(post.pk, post.created_at) for post in posts])
+
+        assert set(TimelineEntry.objects.values_list('profile', 'post')) == {
+            (profile.pk, posts[1].pk) for profile in profiles
+        }
@@ -0,0 +1,207 @@
+"""
+Request throttling with sliding-window counters.
+
+A window keeps only the count of the current and the previous fixed
+window, the previous one weighted by how much of it still overlaps the
+sliding window. That is O(1) memory and work per key, unlike a log of
+request timestamps, and close enough to an exact sliding window.
+
+Counters live in this process (`LocalCounter`) by default, `CacheCounter`
+shares them between processes through one of the `CACHES`.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    `'<requests>/<period>'` as in DRF, e.g. `'100/min'`, to `(requests, seconds)`.
+    """
+    if rate is None:
+        return None, None
+    requests, period = rate.split('/')
+    return int(requests), DURATIONS[period[0]]
+
+
+def estimate(current, previous, now, window):
+    overlap = 1 - (now % window) / window
+    return previous * overlap + current
+
+
+class LocalCounter:
+    """
+    In-process counters, keys idle for two windows are dropped once there
+    are more than `max_keys`.
+    """
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def current(self, key, window, now):
+        # [window index, count in that window, count in the window before]
+        index = int(now // window)
+        state = self.windows.get(key)
+        if state is None or state[0] < index - 1:
+            state = [index, 0, 0]
+        elif state[0] == index - 1:
+            state = [index, 0, state[1]]
+        self.windows[key] = state
+        return state
+
+    def get(self, key, window):
+        now = time.time()
+        with self.lock:
+            _, current, previous = self.current(key, window, now)
+        return estimate(current, previous, now, window)
+
+    def incr(self, key, window):
+        now = time.time()
+        with self.lock:
+            self.current(key, window, now)[1] += 1
+            if len(self.windows) > self.max_keys:
+                self.prune(int(now // window))
+
+    def prune(self, index):
+        self.windows = {key: state for key, state in self.windows.items() if state[0] >= index - 1}
+
+    def clear(self):
+        with self.lock:
+            self.windows.clear()
+
+
+class CacheCounter:
+    """
+    Counters in a shared cache, one key per fixed window expiring after the
+    next one, so counts hold across processes and hosts.
+    """
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def keys(self, key, window, now):
+        index = int(now // window)
+        return f'throttle:{key}:{index}', f'throttle:{key}:{index - 1}'
+
+    def get(self, key, window):
+        now = time.time()
+        current, previous = self.keys(key, window, now)
+        counts = self.cache.get_many([current, previous])
+        return estimate(counts.get(current, 0), counts.get(previous, 0), now, window)
+
+    def incr(self, key, window):
+        current, _ = self.keys(key, window, time.time())
+        self.cache.add(current, 0, timeout=2 * window)
+        try:
+            self.cache.incr(current)
+        except ValueError:
+            # Expired between add() and incr().
+            self.cache.set(current, 1, timeout=2 * window)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_counter = None
+
+
+def get_counter():
+    global _counter
+    if _counter is None:
+        config = settings.THROTTLE_COUNTER
+        _counter = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _counter
+
+
+@receiver(setting_changed)
+def reset_counter(setting, **kwargs):
+    global _counter
+    if setting == 'THROTTLE_COUNTER':
+        _counter = None
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Throttles requests of one user, or of one client address for anonymous
+    requests, in the `<prefix>user` / `<prefix>anon` rate scopes of
+    `DEFAULT_THROTTLE_RATES`. A scope without a rate is not throttled.
+    """
+    scope_prefix = None
+
+    def applies(self, request):
+        return True
+
+    def get_scope_and_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'{self.scope_prefix}user', f'user:{request.user.pk}'
+        return f'{self.scope_prefix}anon', f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if not self.applies(request):
+            return True
+        scope, ident = self.get_scope_and_ident(request)
+        self.num_requests, self.duration = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+        if self.num_requests is None:
+            return True
+        key = f'{scope}:{ident}'
+        counter = get_counter()
+        # Rejected requests are not counted, a client backing off recovers.
+        if counter.get(key, self.duration) >= self.num_requests:
+            return False
+        counter.incr(key, self.duration)
+        return True
+
+    def wait(self):
+        return self.duration - time.time() % self.duration
+
+
+class ReadThrottle(SlidingWindowThrottle):
+    scope_prefix = 'read_'
+
+    def applies(self, request):
+        return request.method in SAFE_METHODS
+
+
+class WriteThrottle(SlidingWindowThrottle):
+    scope_prefix = 'write_'
+
+    def applies(self, request):
+        return request.method not in SAFE_METHODS
+
+
+class AuthFailureThrottle:
+    """
+    Failed logins per client address, checked by the authentication classes
+    before verifying credentials so a client guessing passwords stops costing
+    a password hash per request.
+    """
+    scope = 'auth_failure'
+
+    def __init__(self, request):
+        self.key = f'{self.scope}:ip:{BaseThrottle().get_ident(request)}'
+        self.num_requests, self.duration = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(self.scope))
+
+    def allow(self):
+        return self.num_requests is None or get_counter().get(self.key, self.duration) < self.num_requests
+
+    def record_failure(self):
+        if self.num_requests is not None:
+            get_counter().incr(self.key, self.duration)
+
+    def wait(self):
+        return self.duration - time.time() % self.duration
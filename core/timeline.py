@@ -0,0 +1,148 @@
+"""
+Materialized home timelines: the latest posts of the blogs a profile follows.
+
+New posts are written into the timeline of every follower (fan-out on write)
+by a background job, unless their blog has more than TIMELINE_FANOUT_LIMIT
+followers. Posts of those few very large blogs are merged in when the
+timeline is read instead (fan-out on read), so one popular blog never
+queues millions of rows. A blog that falls back under the limit keeps
+having its older posts merged, they are in nobody's timeline. Timelines
+keep the latest TIMELINE_LENGTH entries.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import RowNumber
+from django.db.models.expressions import Window
+from django.utils import timezone
+
+from core.models import Blog, Follow, Post, TimelineEntry
+
+
+def fan_out_blog(blog_pk, posts, chunk_size=1000):
+    """
+    Add `(post pk, created_at)` pairs of blog `blog_pk` to its followers' timelines.
+    """
+    followers = Follow.objects.filter(blog=blog_pk).values_list('profile_id', flat=True).order_by('profile_id')
+    chunk = []
+    for profile_pk in followers.iterator(chunk_size=chunk_size):
+        chunk.append(profile_pk)
+        if len(chunk) == chunk_size:
+            write_entries(chunk, blog_pk, posts)
+            chunk = []
+    if chunk:
+        write_entries(chunk, blog_pk, posts)
+
+
+def write_entries(profile_pks, blog_pk, posts):
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(profile_id=profile_pk, post_id=post_pk, blog_id=blog_pk, created_at=created_at)
+            for profile_pk in profile_pks
+            for post_pk, created_at in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim(profile_pks)
+
+
+def trim(profile_pks):
+    """
+    Drop everything past the latest TIMELINE_LENGTH entries of each profile,
+    in a single statement.
+    """
+    ranked = TimelineEntry.objects.filter(profile__in=profile_pks).annotate(
+        position=Window(RowNumber(), partition_by=F('profile'), order_by=[F('created_at').desc(), F('post').desc()])
+    ).filter(position__gt=settings.TIMELINE_LENGTH).values('pk')
+    TimelineEntry.objects.filter(pk__in=ranked).delete()
+
+
+def fan_out(post_pks):
+    """
+    Write new posts into the timelines of their blogs' followers, skipping
+    blogs that are merged on read.
+    """
+    posts = Post.objects.published().filter(
+        pk__in=post_pks, blog__follower_count__lte=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list('blog_id', 'pk', 'created_at').order_by('blog_id')
+    for blog_pk, group in groupby(posts, key=lambda row: row[0]):
+        fan_out_blog(blog_pk, [(pk, created_at) for _, pk, created_at in group])
+
+
+def backfill(profile_pk, blog_pk):
+    """
+    Fill a new follow's latest posts into the timeline of the follower.
+    """
+    if Blog.objects.filter(pk=blog_pk, follower_count__gt=settings.TIMELINE_FANOUT_LIMIT).exists():
+        return
+    posts = Post.objects.published().filter(blog=blog_pk).order_by('-created_at', '-pk').values_list('pk', 'created_at')
+    write_entries([profile_pk], blog_pk, list(posts[:settings.TIMELINE_LENGTH]))
+
+
+def remove_posts(post_pks):
+    """
+    Take posts that are no longer public out of every timeline.
+    """
+    TimelineEntry.objects.filter(post__in=post_pks).delete()
+
+
+def follow(profile, blog):
+    """
+    Returns False if `profile` already followed `blog`.
+    """
+    _, created = Follow.objects.get_or_create(profile=profile, blog=blog)
+    if created:
+        Blog.objects.filter(pk=blog.pk).update(follower_count=F('follower_count') + 1)
+    return created
+
+
+def unfollow(profile, blog):
+    deleted, _ = Follow.objects.filter(profile=profile, blog=blog).delete()
+    if deleted:
+        # `When` sees the count before the update: this follow took the blog
+        # back under the limit, fan-out on write starts again from now.
+        Blog.objects.filter(pk=blog.pk).update(
+            follower_count=F('follower_count') - 1,
+            fan_out_since=Case(
+                When(follower_count=settings.TIMELINE_FANOUT_LIMIT + 1, then=Value(timezone.now())),
+                default=F('fan_out_since'),
+            ),
+        )
+        TimelineEntry.objects.filter(profile=profile, blog=blog).delete()
+    return bool(deleted)
+
+
+def after(queryset, cursor, created_at='created_at', pk='pk'):
+    if cursor is None:
+        return queryset
+    cursor_created_at, cursor_pk = cursor
+    return queryset.filter(
+        Q(**{f'{created_at}__lt': cursor_created_at}) | Q(**{created_at: cursor_created_at, f'{pk}__lt': cursor_pk})
+    )
+
+
+def read(profile, page_size, cursor=None):
+    """
+    One page of the timeline of `profile`, newest first, after the
+    `(created_at, post pk)` `cursor`. Returns the posts and whether more follow.
+    """
+    entries = after(
+        TimelineEntry.objects.filter(profile=profile, post__status=Post.PUBLISHED), cursor, pk='post'
+    ).select_related('post').defer('post__content', 'post__content_html').order_by('-created_at', '-post')
+    posts = [entry.post for entry in entries[:page_size + 1]]
+
+    # Large blogs are not fanned out, their page is merged in, and so are the
+    # posts of blogs from before they fell back under the limit. The follows
+    # are a subquery, so this is one more query whatever the number of blogs.
+    large = Q(blog__follower_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+    large_blogs = Follow.objects.filter(large | Q(blog__fan_out_since__isnull=False), profile=profile).values('blog')
+    merged = after(
+        Post.objects.published().filter(large | Q(created_at__lt=F('blog__fan_out_since')), blog__in=large_blogs),
+        cursor,
+    ).defer('content', 'content_html')
+    posts.extend(merged.order_by('-created_at', '-pk')[:page_size + 1])
+
+    unique = {post.pk: post for post in posts}
+    ordered = sorted(unique.values(), key=lambda post: (post.created_at, post.pk), reverse=True)
+    return ordered[:page_size], len(ordered) > page_size
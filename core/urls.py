@@ -1,10 +1,12 @@
 from django.urls import include, path
 from rest_framework_nested import routers
 
-from .views import BlogViewSet, PostViewSet
+from . import async_views, feeds
+from .views import ApiTokenViewSet, BlogViewSet, CacheStatsView, PostViewSet, SearchView, TimelineView
 
 router = routers.SimpleRouter()
 router.register('blogs', BlogViewSet, 'blogs')
+router.register('tokens', ApiTokenViewSet, 'tokens')
 
 posts_router = routers.NestedSimpleRouter(router, 'blogs', lookup='blog')
 posts_router.register('posts', PostViewSet, basename='blog-posts')
@@ -12,4 +14,13 @@ posts_router.register('posts', PostViewSet, basename='blog-posts')
 urlpatterns = [
     path(r'', include(router.urls)),
     path(r'', include(posts_router.urls)),
+    path(r'search/', SearchView.as_view(), name='search'),
+    path(r'timeline/', TimelineView.as_view(), name='timeline'),
+    path(r'cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path(r'feeds/<str:kind>/', feeds.site_feed, name='feed'),
+    path(r'blogs/<int:blog_pk>/feeds/<str:kind>/', feeds.blog_feed, name='blog-feed'),
+    path(r'async/blogs/', async_views.blog_list, name='async-blog-list'),
+    path(r'async/blogs/<int:pk>/', async_views.blog_detail, name='async-blog-detail'),
+    path(r'async/blogs/<int:blog_pk>/posts/', async_views.post_list, name='async-blog-posts-list'),
+    path(r'async/blogs/<int:blog_pk>/posts/<int:pk>/', async_views.post_detail, name='async-blog-posts-detail'),
 ]
@@ -1,25 +1,445 @@
-from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+import hmac
 
-from core.models import Blog, Post
-from core.permissions import IsBlogOwnerOrReadOnly
-from core.serializers import BlogSerializer, PostSerializer
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.generics import ListAPIView, get_object_or_404
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.mixins import CreateModelMixin, DestroyModelMixin, ListModelMixin, RetrieveModelMixin
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+
+from django.conf import settings
+from django.db.models import Subquery
+from django.db.models.functions import Length
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.views import generic, static
+from django.views.decorators.csrf import csrf_exempt
+
+from core import bulk, exports, images, metrics, revisions, tasks, timeline
+from core.async_views import InvalidCursor, decode_cursor, encode_cursor, get_page_size, next_url
+from core.authentication import CachedBasicAuthentication
+from core.cache import CachedResponseMixin, get_response_cache
+from core.models import ApiToken, Blog, Counter, Post, PostRevision
+from core.parsers import NDJSONParser
+from core.pagination import BlogCursorPagination, PostCursorPagination, RevisionCursorPagination, SearchPagination
+from core.permissions import HasTokenScope, IsBlogOwnerOrReadOnly
+from core.search import SearchResults
+from core.serializers import (
+    ApiTokenSerializer, BlogSerializer, PostRevisionSerializer, PostSerializer, PostSummarySerializer,
+    requested_fields,
+)
+
+
+def blog_validators(pk):
+    """
+    Version and modification time of a blog, its `version` changes with every
+    write to its posts so this also validates the blog's post listing.
+    """
+    try:
+        row = Blog.objects.filter(pk=pk).values_list('version', 'updated_at').first()
+    except (TypeError, ValueError):
+        return None
+    if row is None:
+        return None
+    version, updated_at = row
+    return f'{version}:{updated_at.timestamp()}', updated_at
+
+
+def all_blogs_validators():
+    """
+    Validators of the blog listing, and of everything derived from all posts:
+    the latest `updated_at`, read from its index, and the number of deleted
+    blogs, as deletions leave no newer `updated_at` behind. The time of the
+    last deletion keeps Last-Modified from going back when the latest
+    updated blog is deleted.
+    """
+    counter = Counter.objects.filter(name=Counter.BLOGS_DELETED)
+    row = Blog.objects.order_by('-updated_at').annotate(
+        deleted=Subquery(counter.values('value')), deleted_at=Subquery(counter.values('updated_at')),
+    ).values_list('updated_at', 'deleted', 'deleted_at').first()
+    if row is None:
+        return 'empty', None
+    updated_at, deleted, deleted_at = row
+    last_modified = max(updated_at, deleted_at or updated_at)
+    return f'{deleted or 0}:{updated_at.timestamp()}', last_modified
 
 
 # Create your views here.
-class BlogViewSet(ModelViewSet):
-    queryset = Blog.objects.all()
+class BlogViewSet(CachedResponseMixin, ModelViewSet):
     serializer_class = BlogSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly, IsBlogOwnerOrReadOnly]
+    permission_classes = [IsAuthenticatedOrReadOnly, HasTokenScope, IsBlogOwnerOrReadOnly]
+    pagination_class = BlogCursorPagination
+
+    def get_queryset(self):
+        queryset = Blog.objects.all()
+        if self.request.method not in SAFE_METHODS:
+            queryset = queryset.select_related('owner')
+        return queryset
+
+    def get_list_validators(self):
+        return all_blogs_validators()
+
+    def get_object_validators(self):
+        return blog_validators(self.kwargs['pk'])
+
+    @action(detail=True)
+    def export(self, request, *args, **kwargs):
+        """
+        Stream every post of the blog as `?type=ndjson` (default) or `?type=csv`,
+        drafts and scheduled posts included for the owner.
+        """
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in exports.EXPORTERS:
+            raise ValidationError({'type': [f'Must be one of: {", ".join(sorted(exports.EXPORTERS))}.']})
+        blog = self.get_object()
+        profile = getattr(request.user, 'profile', None)
+
+        response = StreamingHttpResponse(
+            exports.export_blog(blog.pk, export_type, include_drafts=profile is not None and profile.pk == blog.owner_id),
+            content_type=exports.CONTENT_TYPES[export_type],
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="blog-{blog.pk}.{export_type}"'
+        return response
+
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated, HasTokenScope])
+    def follow(self, request, *args, **kwargs):
+        """
+        Follow (POST) or unfollow (DELETE) the blog, its posts then show up
+        in `/api/timeline/`.
+        """
+        profile = getattr(request.user, 'profile', None)
+        if profile is None:
+            raise PermissionDenied('A user profile is required to follow a blog.')
+        blog = self.get_object()
+
+        if request.method == 'DELETE':
+            timeline.unfollow(profile, blog)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if not timeline.follow(profile, blog):
+            return Response(status=status.HTTP_200_OK)
+        tasks.enqueue('timeline.backfill', profile.pk, blog.pk, key=f'timeline.backfill:{profile.pk}:{blog.pk}')
+        return Response(status=status.HTTP_201_CREATED)
+
+    def perform_create(self, serializer):
+        profile = getattr(self.request.user, 'profile', None)
+        if profile is None:
+            raise PermissionDenied('A user profile is required to create a blog.')
+        serializer.save(owner=profile)
 
 
-class PostViewSet(ModelViewSet):
+class PostViewSet(CachedResponseMixin, ModelViewSet):
     # queryset = Post.objects.all()
     serializer_class = PostSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly, IsBlogOwnerOrReadOnly]
+    permission_classes = [IsAuthenticatedOrReadOnly, HasTokenScope, IsBlogOwnerOrReadOnly]
+    pagination_class = PostCursorPagination
+
+    # Large columns only loaded in lists when `?fields=` asks for them.
+    BODY_FIELDS = ('content', 'content_html')
 
     def get_queryset(self):
-        return Post.objects.filter(blog=self.kwargs['blog_pk'])
+        queryset = Post.objects.filter(blog=self.kwargs['blog_pk'])
+        if self.request.method in SAFE_METHODS and not self.is_blog_owner():
+            queryset = queryset.filter(status=Post.PUBLISHED)
+        if self.action == 'list':
+            fields = requested_fields(self.request) or set()
+            queryset = queryset.defer(*(name for name in self.BODY_FIELDS if name not in fields))
+        if self.request.method not in SAFE_METHODS:
+            queryset = queryset.select_related('blog__owner')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.is_summary_list():
+            return PostSummarySerializer
+        return PostSerializer
+
+    def get_list_validators(self):
+        try:
+            row = Blog.objects.filter(pk=self.kwargs['blog_pk']).values_list(
+                'version', 'updated_at', 'owner__user_id'
+            ).first()
+        except (TypeError, ValueError):
+            return None
+        if row is None:
+            return None
+        version, updated_at, self.owner_user_id = row
+        return f'{version}:{updated_at.timestamp()}', updated_at
+
+    def get_object_validators(self):
+        try:
+            row = Post.objects.filter(pk=self.kwargs['pk'], blog=self.kwargs['blog_pk']).values_list(
+                'updated_at', 'status', 'blog__owner__user_id'
+            ).first()
+        except (TypeError, ValueError):
+            return None
+        if row is None:
+            return None
+        updated_at, post_status, self.owner_user_id = row
+        if post_status != Post.PUBLISHED and not self.is_blog_owner():
+            return None
+        return updated_at.timestamp(), updated_at
+
+    def is_blog_owner(self):
+        """
+        Owners also see their drafts and scheduled posts. The owner comes
+        with the validators query on reads, so this costs no extra query.
+        """
+        if not self.request.user.is_authenticated:
+            return False
+        if getattr(self, 'owner_user_id', None) is None:
+            self.owner_user_id = self.get_blog().owner.user_id
+        return self.owner_user_id == self.request.user.pk
+
+    def get_cache_visibility(self):
+        return 'owner' if self.is_blog_owner() else super().get_cache_visibility()
+
+    def get_etag(self, version):
+        return super().get_etag(f'{version}:{self.get_cache_visibility()}')
+
+    def get_blog(self):
+        """
+        Parent blog with its owner, loaded once per request and shared by
+        the permission check and `perform_create`.
+        """
+        if not hasattr(self, '_blog'):
+            self._blog = get_object_or_404(Blog.objects.select_related('owner'), pk=self.kwargs['blog_pk'])
+        return self._blog
+
+    def perform_create(self, serializer):
+        serializer.save(blog=self.get_blog())
+
+    @action(detail=False, methods=['post', 'patch'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create (POST) or partially update (PATCH, items carry their `pk`) many
+        posts of the blog at once from a JSON array or NDJSON body. Every item
+        gets its own result, valid items are written even if others fail.
+        """
+        blog = self.get_blog()
+        self.check_object_permissions(request, blog)
+
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of posts.']})
+        if len(items) > settings.API_MAX_BULK_SIZE:
+            raise ValidationError({'non_field_errors': [f'At most {settings.API_MAX_BULK_SIZE} posts per request.']})
+
+        partial = request.method == 'PATCH'
+        serializer = self.get_serializer(data=items, many=True, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        errors = {index: (status.HTTP_400_BAD_REQUEST, detail) for index, detail in serializer.item_errors.items()}
+
+        if partial:
+            pks = {index: item.get('pk') for index, item in enumerate(items) if isinstance(item, dict)}
+            posts = Post.objects.filter(blog=blog).in_bulk([pk for pk in pks.values() if isinstance(pk, int)])
+            # Each item is applied to the post as loaded, a second item for the
+            # same post would count its changes to the blog aggregates twice.
+            seen, repeated = set(), set()
+            for pk in pks.values():
+                if isinstance(pk, int):
+                    (repeated if pk in seen else seen).add(pk)
+            valid = []
+            for index, data in serializer.validated_data:
+                post = posts.get(pks.get(index))
+                if pks.get(index) in repeated:
+                    errors[index] = (status.HTTP_400_BAD_REQUEST, {'pk': ['Post appears more than once in the batch.']})
+                elif post is None:
+                    errors[index] = (status.HTTP_404_NOT_FOUND, {'pk': ['Post not found in this blog.']})
+                else:
+                    try:
+                        valid.append((index, post, serializer.child.check_schedule(data, post)))
+                    except ValidationError as exc:
+                        errors[index] = (status.HTTP_400_BAD_REQUEST, exc.detail)
+            bulk.update_posts(blog, valid, settings.API_BULK_CHUNK_SIZE)
+            written = {index: post for index, post, _ in valid}
+            success = status.HTTP_200_OK
+        else:
+            written = bulk.create_posts(blog, serializer.validated_data, settings.API_BULK_CHUNK_SIZE)
+            success = status.HTTP_201_CREATED
+
+        results = [{'index': index, 'status': success, 'pk': post.pk} for index, post in written.items()]
+        results += [
+            {'index': index, 'status': code, 'errors': detail} for index, (code, detail) in errors.items()
+        ]
+        results.sort(key=lambda result: result['index'])
+        return Response(
+            {'results': results},
+            status=status.HTTP_207_MULTI_STATUS if errors else success,
+        )
+
+    @action(detail=True, permission_classes=[IsAuthenticated, HasTokenScope])
+    def revisions(self, request, *args, **kwargs):
+        """
+        Saved revisions of the post, newest first, with their compressed size.
+        Only the blog owner sees the history.
+        """
+        post_pk = self.get_revised_post_pk()
+        queryset = PostRevision.objects.filter(post=post_pk).defer('data').annotate(size=Length('data'))
+        paginator = RevisionCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(PostRevisionSerializer(page, many=True).data)
+
+    @action(
+        detail=True, url_path=r'revisions/(?P<number>\d+)', url_name='revision',
+        permission_classes=[IsAuthenticated, HasTokenScope],
+    )
+    def revision(self, request, *args, **kwargs):
+        """
+        Title and content of the post as of revision `number`.
+        """
+        post_pk = self.get_revised_post_pk()
+        result = revisions.reconstruct(post_pk, int(kwargs['number']))
+        if result is None:
+            raise NotFound('No such revision.')
+        title, content = result
+        return Response({'number': int(kwargs['number']), 'title': title, 'content': content})
+
+    def get_revised_post_pk(self):
+        blog = self.get_blog()
+        if blog.owner.user_id != self.request.user.pk:
+            raise PermissionDenied('Only the blog owner can see post revisions.')
+        return get_object_or_404(Post.objects.filter(blog=blog).values_list('pk', flat=True), pk=self.kwargs['pk'])
+
+    def is_summary_list(self):
+        """
+        Lists skip the post body unless `?fields=` explicitly asks for it.
+        """
+        if self.action != 'list':
+            return False
+        fields = requested_fields(self.request) or set()
+        return not fields.intersection(self.BODY_FIELDS)
+
+
+class ApiTokenViewSet(CreateModelMixin, ListModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet):
+    """
+    API tokens of the current user's profile. The key is only part of the
+    response that created the token.
+    """
+    serializer_class = ApiTokenSerializer
+    permission_classes = [IsAuthenticated]
+    # Tokens cannot be used to mint more tokens.
+    authentication_classes = [CachedBasicAuthentication, SessionAuthentication]
+
+    def get_queryset(self):
+        return ApiToken.objects.filter(profile__user=self.request.user).order_by('pk')
+
+    def perform_create(self, serializer):
+        profile = getattr(self.request.user, 'profile', None)
+        if profile is None:
+            raise PermissionDenied('A user profile is required to create a token.')
+        token, key = ApiToken.generate(profile=profile, **serializer.validated_data)
+        token.save()
+        token.key = key
+        serializer.instance = token
+
+
+class TimelineView(APIView):
+    """
+    Newest posts of the blogs the current user follows, keyset paginated
+    like the async views.
+    """
+    permission_classes = [IsAuthenticated, HasTokenScope]
+
+    def get(self, request):
+        cursor = None
+        if 'cursor' in request.query_params:
+            try:
+                created_at, pk = decode_cursor(request.query_params['cursor'])
+                cursor = (parse_datetime(created_at), int(pk))
+            except (InvalidCursor, TypeError, ValueError):
+                raise ValidationError({'cursor': ['Invalid cursor.']})
+            if cursor[0] is None:
+                raise ValidationError({'cursor': ['Invalid cursor.']})
+
+        profile = getattr(request.user, 'profile', None)
+        posts, more = timeline.read(profile, get_page_size(request), cursor) if profile else ([], False)
+        next_page = None
+        if more:
+            next_page = next_url(request, encode_cursor([posts[-1].created_at.isoformat(), posts[-1].pk]))
+        data = PostSummarySerializer(posts, many=True, context={'request': request}).data
+        return Response({'next': next_page, 'results': data})
+
+
+class SearchView(ListAPIView):
+    """
+    Ranked full-text search over posts, `/api/search/?q=...`.
+    """
+    serializer_class = PostSummarySerializer
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        return SearchResults(self.request.query_params.get('q', ''))
+
+
+class CacheStatsView(APIView):
+    """
+    Hit, miss and eviction counters of this process' response cache.
+    """
+    permission_classes = [IsAdminUser, HasTokenScope]
+
+    def get(self, request):
+        return Response(get_response_cache().get_stats())
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ImageUploadView(generic.View):
+    """
+    Replacement for the Markdown editor's upload endpoint with the same JSON
+    contract. Files are stored under their content hash, resized and WebP
+    variants are generated in the background.
+    """
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('editormd-image-file')
+        if not upload:
+            return self.result('No image was uploaded.')
+
+        formats = settings.MDEDITOR_CONFIGS['default']['upload_image_formats']
+        extension = upload.name.rsplit('.', 1)[-1].lower() if '.' in upload.name else ''
+        if extension not in formats:
+            return self.result(f'Unsupported image format, allowed formats: {", ".join(formats)}.')
+
+        try:
+            name = images.store_upload(upload, extension)
+        except OSError as error:
+            return self.result(f'Upload failed: {error}')
+        tasks.enqueue('images.process_upload', name, key=f'images.process_upload:{name}')
+        return self.result('Upload succeeded.', images.image_url(name))
+
+    def result(self, message, url=''):
+        return JsonResponse({'success': int(bool(url)), 'message': message, 'url': url})
+
+
+def serve_media(request, path):
+    """
+    Development server for uploads. Content-hashed names never change, so
+    they may be cached forever.
+    """
+    response = static.serve(request, path, document_root=settings.MEDIA_ROOT)
+    if images.HASHED_NAME_RE.match(path.rsplit('/', 1)[-1]):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def has_metrics_token(request):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if not settings.METRICS_TOKEN or scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(token.strip().encode(), settings.METRICS_TOKEN.encode())
+
 
-    def get_serializer_context(self):
-        return {'blog': self.kwargs['blog_pk']}
+def metrics_view(request):
+    """
+    Request histograms and response cache statistics in the Prometheus text
+    format, for staff users and scrapers sending the METRICS_TOKEN.
+    """
+    if not (request.user.is_staff or has_metrics_token(request)):
+        return HttpResponse(status=403)
+    gauges = [
+        (f'response_cache_{name}', {}, value) for name, value in sorted(get_response_cache().get_stats().items())
+    ]
+    return HttpResponse(metrics.registry.export(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')